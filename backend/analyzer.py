@@ -1,8 +1,7 @@
-import pandas as pd
-import numpy as np
 import numpy_financial as npf
 import sys
 from datetime import datetime
+from report_generation import generate_investment_report
 
 # --------------- Creating Functions for Loan Calculation ---------------
 def calculate_cumipmt(rate, nper, pv, start_period, end_period, when=0):
@@ -313,232 +312,76 @@ def main():
                 'cum_cash_flow': cum_cash_flow
             }
 
-        # Output Generation
-        address = f"{street}, {city}, {state} {zip_code}"
-        initial_cash = total_cash_invested
-        arv = purchase_price + initial_improvements
-
-        # Header and Summary
-        print(f"\n{'Investment Analysis for ' + address:^{80}}\n")
-        print(f"{address:^{80}}")
-        print(f"{'Investment Property - Rental':^{80}}\n")
-        print(f"{property_type}   ·   {total_beds} Beds   ·   {total_baths} Baths   ·   {sqft:,.0f} Sq.Ft.\n")
-        print(f"${purchase_price:,.0f} Purchase Price")
-        print(
-            f"${initial_cash:,.0f} Cash Needed   ·   ${yearly_data[1]['cash_flow_before_tax'] / 12:,.0f}/mo Cash Flow   ·   {yearly_data[1]['cap_rate_annual'] * 100:.1f}% Cap Rate   ·   {yearly_data[1]['cash_on_cash_return'] * 100:.1f}% COC\n")
-
-        print(f"{'Property Description':^{80}}\n")
-        print(f"ADDRESS".ljust(20))
-        print(f"{street}".ljust(20))
-        print(f"{city}".ljust(20))
-        print(f"{state} {zip_code}".ljust(20) + "\n")
-        print("DESCRIPTION")
-        print(f"Property Type:".ljust(20) + f"\t{property_type:>15}")
-        print(f"Square Footage:".ljust(20) + f"\t{sqft:>15,.0f}")
-        print(f"Beds:".ljust(20) + f"\t{total_beds:>15}")
-        print(f"Baths:".ljust(20) + f"\t{total_baths:>15}")
-        print(f"Year Built:".ljust(20) + f"\t{year_built:>15}")
-        print(f"Parking:".ljust(20) + f"\t{parking:>15}")
-        print(f"Lot Size:".ljust(20) + f"\t{lot_size:>15.2f}\n")
-        print("\t\t\tClick for Map\n")
-
-        # Purchase Analysis & Return
-        print("Purchase Analysis & Return")
-        print("\tPURCHASE & REHAB".ljust(43) + "\t" + "FINANCING (PURCHASE)".ljust(30))
-        print(f"Purchase Price:".ljust(30) + f"\t${purchase_price:>12,.0f}" + "\t" + f"Loan Type:".ljust(30) + f"\t{'Amortizing' if not interest_only else 'Interest Only'}, {loan_term_years} Year".rjust(15))
-        print(f"Amount Financed:".ljust(30) + f"\t-${loan_amount:>12,.0f}" + "\t" + f"Interest Rate:".ljust(30) + f"\t{interest_rate * 100:>12.2f}%".rjust(15))
-        print(f"Down Payment:".ljust(30) + f"\t=${down_payment:>12,.0f}" + "\t" + f"Percent Down:".ljust(30) + f"\t{percent_down * 100:>12.2f}%".rjust(15))
-        print(f"Purchase Cost:".ljust(30) + f"\t+${closing_cost:>12,.0f}" + "\t" + f"Loan Amount:".ljust(30) + f"\t${loan_amount:>12,.0f}".rjust(15))
-        print(f"Rehab Cost:".ljust(30) + f"\t+${initial_improvements:>12,.0f}" + "\t" + f"Loan Payment:".ljust(30) + f"\t${mortgage_monthly:>12,.0f} Per Month".rjust(15))
-        print(f"Total Cash Needed:".ljust(30) + f"\t=${initial_cash:>12,.0f}" + "\t" + "".ljust(30) + f"\t${mortgage_monthly * 12:>12,.0f} Per Year".rjust(15))
-        print(f"\nAfter Repair Value:".ljust(30) + f"\t${arv:>12,.0f}")
-        print(f"ARV per Square Foot:".ljust(30) + f"\t${arv / sqft:>12,.1f}")
-        print(f"Price per Square Foot:".ljust(30) + f"\t${purchase_price / sqft:>12,.1f}\n")
-
-        print("RETURNS & RATIOS (Year 1)".ljust(45) + "\t" + "ASSUMPTIONS & PROJECTIONS".ljust(30))
-        print(f"Cap Rate:".ljust(30) + f"\t{yearly_data[1]['cap_rate_annual'] * 100:>12.1f}%" + "\t" + f"Purchase Date:".ljust(30) + f"\t{purchase_date_str:>15}".rjust(15))
-        print(f"Cash on Cash Return:".ljust(30) + f"\t{yearly_data[1]['cash_on_cash_return'] * 100:>12.1f}%" + "\t" + f"Initial Improvements:".ljust(30) + f"\t${initial_improvements:>12,.0f}".rjust(15))
-        print(f"Return on Equity:".ljust(30) + f"\t{yearly_data[1]['return_on_equity'] * 100:>12.1f}%" + "\t" + f"Purchase Cost:".ljust(30) + f"\t${closing_cost:>12,.0f}".rjust(15))
-        print(f"Return on Investment:".ljust(30) + f"\t{yearly_data[1]['roi_pre_tax'] * 100:>12.1f}%" + "\t" + f"Vacancy Rate:".ljust(30) + f"\t{vacancy_rate * 100:>12.0f}%".rjust(15))
-        print(f"Internal Rate of Return:".ljust(30) + f"\t{yearly_data[1]['irr_before_tax'] * 100:>12.1f}%" + "\t" + f"Appreciation:".ljust(30) + f"\t{appreciation * 100:>12.0f}%".rjust(15))
-        print("".ljust(30) + "\t" + "".rjust(15) + "\t" + f"Rent Rate Increase:".ljust(30) + f"\t{rent_rate_inc * 100:>12.0f}%".rjust(15))
-        print(f"Rent to Value:".ljust(30) + f"\t{yearly_data[1]['rent_to_value'] * 100:>12.1f}%" + "\t" + f"Property Tax Increase:".ljust(30) + f"\t{property_tax_rate_inc * 100:>12.0f}%".rjust(15))
-        print(f"Gross Rent Multiplier:".ljust(30) + f"\t{yearly_data[1]['gross_rent_multiplier']:>12.2f}" + "\t" + f"Insurance Rate Increase:".ljust(30) + f"\t{insurance_rate_inc * 100:>12.0f}%".rjust(15))
-        print(f"Equity Multiple:".ljust(30) + f"\t{yearly_data[1]['equity_multiplier']:>12.2f}" + "\t" + f"Utilities Rate Increase:".ljust(30) + f"\t{utility_rate_inc * 100:>12.0f}%".rjust(15))
-        print(f"Break Even Ratio:".ljust(30) + f"\t{yearly_data[1]['break_even_ratio'] * 100:>12.1f}%" + "\t" + f"Selling Costs:".ljust(30) + f"\t{selling_cost_percentage * 100:>12.0f}%".rjust(15))
-        print(f"Debt Coverage Ratio:".ljust(30) + f"\t{yearly_data[1]['debt_coverage_ratio']:>12.2f}" + "\t" + f"Depreciation Period:".ljust(30) + f"\t{depreciation_years:>12.1f}\tYears".rjust(15))
-        print(f"Debt Yield:".ljust(30) + f"\t{yearly_data[1]['debt_yield'] * 100:>12.1f}%" + "\t" + f"Land Value:".ljust(30) + f"\t${purchase_price * (1 - improved_value_ratio):>12,.0f}".rjust(15))
-
-        # Cash Flow (Year 1)
-        print("\nCash Flow (Year 1)\n")
-        print("\t".ljust(30) + "\t" + "Monthly".rjust(12) + "\t" + "Yearly".rjust(12))
-        print("\tCASH FLOW")
-        print(f"\tGross Rent:".ljust(30) + f"\t${rent_monthly:>12,.0f}" + f"\t${gross_rent_initial:>12,.0f}")
-        print(f"\tVacancy ({vacancy_rate * 100:.0f}%):".ljust(30) + f"\t-${vacancy_loss_initial / 12:>12,.0f}" + f"\t-${vacancy_loss_initial:>12,.0f}")
-        print(f"\tOperating Income:".ljust(30) + f"\t=${egi_initial / 12:>12,.0f}" + f"\t=${egi_initial:>12,.0f}")
-        print(f"\tOperating Expense ({op_exp_initial / egi_initial * 100 if egi_initial > 0 else 0:.0f}%):".ljust(30) + f"\t+${op_exp_initial / 12:>12,.0f}" + f"\t+${op_exp_initial:>12,.0f}")
-        print(f"\tNet Operating Income:".ljust(30) + f"\t=${noi_initial / 12:>12,.0f}" + f"\t=${noi_initial:>12,.0f}")
-        print(f"\tLoan Payments:".ljust(30) + f"\t-${mortgage_monthly:>12,.0f}" + f"\t-${yearly_data[1]['loan_payments']:>12,.0f}")
-        print(f"\tCash Flow:".ljust(30) + f"\t=${yearly_data[1]['cash_flow_before_tax'] / 12:>12,.0f}" + f"\t=${yearly_data[1]['cash_flow_before_tax']:>12,.0f}\n")
-        print("\tOPERATING EXPENSES")
-        print(f"\tProperty Taxes:".ljust(30) + f"\t${property_tax_monthly:>12,.0f}" + f"\t${property_tax_yr:>12,.0f}")
-        print(f"\tInsurance:".ljust(30) + f"\t${insurance_monthly:>12,.0f}" + f"\t${insurance_monthly * 12:>12,.0f}")
-        print(f"\tOwner Paid Utilities:".ljust(30) + f"\t${owner_paid_utilities_monthly:>12,.0f}" + f"\t${owner_paid_utilities_monthly * 12:>12,.0f}")
-        print(f"\tProperty Management ({management_rate * 100:.0f}%):".ljust(30) + f"\t${rent_monthly * management_rate:>12,.0f}" + f"\t${gross_rent_initial * management_rate:>12,.0f}")
-        print(f"\tMaintenance Reserve ({management_rate * 100:.0f}%):".ljust(30) + f"\t${rent_monthly * maintenance_rate:>12,.0f}" + f"\t${gross_rent_initial * maintenance_rate:>12,.0f}")
-        print(f"\tTotal:".ljust(30) + f"\t${op_exp_initial / 12:>12,.0f}" + f"\t${op_exp_initial:>12,.0f}")
-
-        # Buy & Hold Projections
-        proj_years = [1, 5, 10, 20, 30]
-        proj_df = pd.DataFrame(index=[
-            'Gross Rent', f'Vacancy ({vacancy_rate * 100:.0f}%)', 'Operating Income',
-            'Property Taxes', 'Insurance', 'Owner Paid Utilities',
-            f'Property Mgmt ({management_rate * 100:.0f}%)', f'Maintenance Reserve ({maintenance_rate * 100:.0f}%)',
-            'Operating Expenses', 'Net Operating Income', 'Loan Payments', 'Cash Flow',
-            'Property Value', 'Loan Balance', 'Equity', f'Selling Cost ({selling_cost_percentage * 100:.0f}%)',
-            'Sale Proceeds', 'Cumulative Operating Income', 'Cumulative Operating Expenses',
-            'Cumulative NOI', 'Cumulative Cash Flow', 'Total Cash Invested', 'Total Profit (Pre-Tax)',
-            'Operating Expenses (Tax)', 'Loan Interest', 'Depreciation', 'Total Deductions',
-            'Operating Income (Tax)', 'Taxable Income', f'Income Tax Due ({income_tax_rate * 100:.0f}%)',
-            'Original Cost Basis', 'Capital Improvements', 'Cumulative Depreciation',
-            'Selling Cost (Tax)', 'Adjusted Cost Basis', 'Sale Price', 'Capital Gain',
-            'Tax on Capital Gain (15%)', 'Recapture Tax (25%)', 'Total Profit (Pre-Tax, Sale)',
-            'Cumulative Income Tax Paid', 'Capital Gain Tax Due', 'Recapture Tax Due', 'Total Profit (Post-Tax)',
-            'Cap Rate', 'Cash on Cash Return', 'Return on Equity', 'Return on Investment',
-            'Internal Rate of Return', 'Rent to Value', 'Gross Rent Multiplier', 'Equity Multiple',
-            'Break Even Ratio', 'Debt Coverage Ratio', 'Debt Yield'
-        ], columns=[f'Year {y}' for y in proj_years])
-
-        for y in proj_years:
-            data = yearly_data[y]
-            proj_df.at['Gross Rent', f'Year {y}'] = data['gross_rent']
-            proj_df.at[f'Vacancy ({vacancy_rate * 100:.0f}%)', f'Year {y}'] = -data['vacancy_loss']
-            proj_df.at['Operating Income', f'Year {y}'] = data['effective_gross_income']
-            proj_df.at['Property Taxes', f'Year {y}'] = -data['property_taxes']
-            proj_df.at['Insurance', f'Year {y}'] = -data['insurance']
-            proj_df.at['Owner Paid Utilities', f'Year {y}'] = -data['owner_paid_utilities']
-            proj_df.at[f'Property Mgmt ({management_rate * 100:.0f}%)', f'Year {y}'] = -data['property_management']
-            proj_df.at[f'Maintenance Reserve ({maintenance_rate * 100:.0f}%)', f'Year {y}'] = -data['maintenance']
-            proj_df.at['Operating Expenses', f'Year {y}'] = -data['total_operating_expenses']
-            proj_df.at['Net Operating Income', f'Year {y}'] = data['noi']
-            proj_df.at['Loan Payments', f'Year {y}'] = -data['loan_payments']
-            proj_df.at['Cash Flow', f'Year {y}'] = data['cash_flow_before_tax']
-            proj_df.at['Property Value', f'Year {y}'] = data['property_value']
-            proj_df.at['Loan Balance', f'Year {y}'] = -data['mortgage_balance']
-            proj_df.at['Equity', f'Year {y}'] = data['equity']
-            proj_df.at[f'Selling Cost ({selling_cost_percentage * 100:.0f}%)', f'Year {y}'] = -data['selling_cost']
-            proj_df.at['Sale Proceeds', f'Year {y}'] = data['sale_proceeds']
-            proj_df.at['Cumulative Operating Income', f'Year {y}'] = data['cum_operating_income']
-            proj_df.at['Cumulative Operating Expenses', f'Year {y}'] = -data['cum_operating_expenses']
-            proj_df.at['Cumulative NOI', f'Year {y}'] = data['cum_noi']
-            proj_df.at['Cumulative Cash Flow', f'Year {y}'] = data['cum_cash_flow']
-            proj_df.at['Total Cash Invested', f'Year {y}'] = -total_cash_invested
-            proj_df.at['Total Profit (Pre-Tax)', f'Year {y}'] = data['total_profit_pre_tax']
-            proj_df.at['Operating Expenses (Tax)', f'Year {y}'] = -data['total_operating_expenses']
-            proj_df.at['Loan Interest', f'Year {y}'] = -data['interest_paid']
-            proj_df.at['Depreciation', f'Year {y}'] = -data['depreciation']
-            proj_df.at['Total Deductions', f'Year {y}'] = -(data['total_operating_expenses'] + data['interest_paid'] + data['depreciation'])
-            proj_df.at['Operating Income (Tax)', f'Year {y}'] = data['effective_gross_income']
-            proj_df.at['Taxable Income', f'Year {y}'] = data['taxable_income']
-            proj_df.at[f'Income Tax Due ({income_tax_rate * 100:.0f}%)', f'Year {y}'] = -data['income_tax_due']
-            proj_df.at['Original Cost Basis', f'Year {y}'] = data['original_cost_basis']
-            proj_df.at['Capital Improvements', f'Year {y}'] = initial_improvements
-            proj_df.at['Cumulative Depreciation', f'Year {y}'] = -data['cum_dep']
-            proj_df.at['Selling Cost (Tax)', f'Year {y}'] = data['selling_cost']
-            proj_df.at['Adjusted Cost Basis', f'Year {y}'] = -data['adjusted_cost_basis']
-            proj_df.at['Sale Price', f'Year {y}'] = data['property_value']
-            proj_df.at['Capital Gain', f'Year {y}'] = data['capital_gain']
-            proj_df.at['Tax on Capital Gain (15%)', f'Year {y}'] = -data['tax_on_capital_gain']
-            proj_df.at['Recapture Tax (25%)', f'Year {y}'] = -data['recapture_tax']
-            proj_df.at['Total Profit (Pre-Tax, Sale)', f'Year {y}'] = data['total_profit_pre_tax']
-            proj_df.at['Cumulative Income Tax Paid', f'Year {y}'] = -data['cum_income_tax']
-            proj_df.at['Capital Gain Tax Due', f'Year {y}'] = -data['tax_on_capital_gain']
-            proj_df.at['Recapture Tax Due', f'Year {y}'] = -data['recapture_tax']
-            proj_df.at['Total Profit (Post-Tax)', f'Year {y}'] = data['total_profit_post_tax']
-            proj_df.at['Cap Rate', f'Year {y}'] = data['cap_rate_annual'] * 100
-            proj_df.at['Cash on Cash Return', f'Year {y}'] = data['cash_on_cash_return'] * 100
-            proj_df.at['Return on Equity', f'Year {y}'] = data['return_on_equity'] * 100
-            proj_df.at['Return on Investment', f'Year {y}'] = data['roi_pre_tax'] * 100
-            proj_df.at['Internal Rate of Return', f'Year {y}'] = data['irr_before_tax'] * 100
-            proj_df.at['Rent to Value', f'Year {y}'] = data['rent_to_value'] * 100
-            proj_df.at['Gross Rent Multiplier', f'Year {y}'] = data['gross_rent_multiplier']
-            proj_df.at['Equity Multiple', f'Year {y}'] = data['equity_multiplier']
-            proj_df.at['Break Even Ratio', f'Year {y}'] = data['break_even_ratio'] * 100
-            proj_df.at['Debt Coverage Ratio', f'Year {y}'] = data['debt_coverage_ratio']
-            proj_df.at['Debt Yield', f'Year {y}'] = round(data['debt_yield'] * 100, 1)
-
-        # Buy & Hold Projections
-        print("\nBuy & Hold Projections")
-        print("\t" + "\t".join([
-            f"Appreciation".ljust(15),
-            f"Rent Increase".ljust(15),
-            f"Tax Increase".ljust(15),
-            f"Insurance Increase".ljust(15),
-            f"Utility Increase".ljust(15),
-            f"Selling Cost".ljust(15)
-        ]))
-        print("\t" + "\t".join([
-            f"{appreciation * 100:>15.2f}%",
-            f"{rent_rate_inc * 100:>15.2f}%",
-            f"{property_tax_rate_inc * 100:>15.2f}%",
-            f"{insurance_rate_inc * 100:>15.2f}%",
-            f"{utility_rate_inc * 100:>15.2f}%",
-            f"{selling_cost_percentage * 100:>15.2f}%"
-        ]))
-        print("\n\t\t\t\t" + "\t".join([f"Year {y}".rjust(15) for y in proj_years]))
-        print("RENTAL INCOME")
-        for idx in ['Gross Rent', f'Vacancy ({vacancy_rate * 100:.0f}%)', 'Operating Income']:
-            row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-            print("\t" + "\t".join(row))
-        print("\nOPERATING EXPENSES")
-        for idx in ['Property Taxes', 'Insurance', 'Owner Paid Utilities',
-                    f'Property Mgmt ({management_rate * 100:.0f}%)',
-                    f'Maintenance Reserve ({maintenance_rate * 100:.0f}%)', 'Operating Expenses']:
-            row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-            print("\t" + "\t".join(row))
-        print("\nCASH FLOW")
-        for idx in ['Operating Income', 'Operating Expenses', 'Net Operating Income', 'Loan Payments', 'Cash Flow']:
-            row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-            print("\t" + "\t".join(row))
-        print("\nEQUITY ACCUMULATION")
-        for idx in ['Property Value', 'Loan Balance', 'Equity']:
-            row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-            print("\t" + "\t".join(row))
-        print("\nSALE ANALYSIS (PRE-TAX)")
-        for idx in ['Equity', f'Selling Cost ({selling_cost_percentage * 100:.0f}%)', 'Sale Proceeds',
-                    'Cumulative Operating Income', 'Cumulative Operating Expenses', 'Cumulative NOI',
-                    'Cumulative Cash Flow', 'Total Cash Invested', 'Total Profit (Pre-Tax)']:
-            row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-            print("\t" + "\t".join(row))
-        print("\nTAX BENEFITS & DEDUCTIONS")
-        for idx in ['Operating Expenses (Tax)', 'Loan Interest', 'Depreciation', 'Total Deductions',
-                    'Operating Income (Tax)', 'Taxable Income', f'Income Tax Due ({income_tax_rate * 100:.0f}%)']:
-            row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-            print("\t" + "\t".join(row))
-        print("\nCAPITAL GAIN TAX")
-        for idx in ['Original Cost Basis', 'Capital Improvements', 'Cumulative Depreciation', 'Selling Cost (Tax)',
-                    'Adjusted Cost Basis', 'Sale Price', 'Capital Gain', 'Tax on Capital Gain (15%)',
-                    'Recapture Tax (25%)']:
-            row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-            print("\t" + "\t".join(row))
-        print("\nSALE ANALYSIS (POST-TAX)")
-        for idx in ['Total Profit (Pre-Tax, Sale)', 'Cumulative Income Tax Paid', 'Capital Gain Tax Due',
-                    'Recapture Tax Due', 'Total Profit (Post-Tax)']:
-            row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-            print("\t" + "\t".join(row))
-        print("\nINVESTMENT RETURNS")
-        for idx in ['Cap Rate', 'Cash on Cash Return', 'Return on Equity', 'Return on Investment',
-                    'Internal Rate of Return']:
-            row = [idx.ljust(30)] + [f"{x:>12.1f}%" for x in proj_df.loc[idx]]
-            print("\t" + "\t".join(row))
-        print("\nFINANCIAL RATIOS")
-        for idx in ['Rent to Value', 'Gross Rent Multiplier', 'Equity Multiple', 'Break Even Ratio',
-                    'Debt Coverage Ratio', 'Debt Yield']:
-            row = [idx.ljust(30)] + [
-                f"{x:>12.1f}%" if idx in ['Rent to Value', 'Break Even Ratio', 'Debt Yield']
-                else f"{x:>12.2f}" if idx in ['Gross Rent Multiplier', 'Equity Multiple', 'Debt Coverage Ratio']
-                else str(x).rjust(15) for x in proj_df.loc[idx]]
-            print("\t" + "\t".join(row))
+        # Output Generation: the report is rendered into one buffer and written once
+        analysis_data = {
+            'property_info': {
+                'property_type': property_type,
+                'street': street,
+                'city': city,
+                'state': state,
+                'zip_code': zip_code,
+                'year_built': year_built,
+                'sqft': sqft,
+                'lot_size': lot_size,
+                'parking': parking,
+                'units': units,
+                'total_beds': total_beds,
+                'total_baths': total_baths
+            },
+            'purchase_info': {
+                'rent_monthly': rent_monthly,
+                'purchase_price': purchase_price,
+                'closing_cost': closing_cost,
+                'initial_improvements': initial_improvements,
+                'purchase_date': purchase_date_str
+            },
+            'loan_info': {
+                'percent_down': percent_down,
+                'interest_rate': interest_rate,
+                'loan_term_years': loan_term_years,
+                'interest_only': interest_only
+            },
+            'expenses_info': {
+                'property_tax_yr': property_tax_yr,
+                'insurance_mo': insurance_mo,
+                'management_rate': management_rate,
+                'vacancy_rate': vacancy_rate,
+                'maintenance_rate': maintenance_rate
+            },
+            'rates': {
+                'appreciation': appreciation,
+                'rent_rate_inc': rent_rate_inc,
+                'property_tax_rate_inc': property_tax_rate_inc,
+                'insurance_rate_inc': insurance_rate_inc,
+                'utility_rate_inc': utility_rate_inc
+            },
+            'tax_info': {
+                'improved_value_ratio': improved_value_ratio,
+                'income_tax_rate': income_tax_rate,
+                'cap_gains_tax_rate': cap_gains_tax_rate,
+                'recapture_tax_rate': recapture_tax_rate,
+                'depreciation_years': depreciation_years,
+                'q1_tax': q1_tax,
+                'selling_cost_percentage': selling_cost_percentage
+            },
+            'derived_values': {
+                'down_payment': down_payment,
+                'loan_amount': loan_amount,
+                'mortgage_monthly': mortgage_monthly,
+                'property_tax_monthly': property_tax_monthly,
+                'insurance_monthly': insurance_monthly,
+                'owner_paid_utilities_monthly': owner_paid_utilities_monthly,
+                'total_cash_invested': total_cash_invested,
+                'gross_rent_initial': gross_rent_initial,
+                'vacancy_loss_initial': vacancy_loss_initial,
+                'egi_initial': egi_initial,
+                'op_exp_initial': op_exp_initial,
+                'noi_initial': noi_initial,
+                'initial_cap_rate': initial_cap_rate
+            },
+            'yearly_data': yearly_data
+        }
+        generate_investment_report(analysis_data)
 
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -546,6 +389,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
-as
-
@@ -1,45 +1,204 @@
-from flask import Flask, request, jsonify
+import json
+import mimetypes
+import os
+import time
+from flask import Flask, g, request, jsonify
 from flask_cors import CORS
-from property_analysis import analyze_property_investment
+from property_analysis import ANALYSIS_YEARS, InputError, analyze_property_inputs, analyze_property_batch, \
+    MAX_YEARS, analyze_property_monthly, parse_property_inputs, report_years
+from result_cache import ResultCache
+from loan_calculations import amortization_cache_stats
+from projection_calculations import PROJECTION_YEARS, YEARLY_METRICS, yearly_rows
+from response_formats import FORMATS, STREAM_FORMATS, FormatError, compact_analysis, compact_monthly, encode_analysis, \
+    encode_body, encode_stream, nested_analysis, negotiate_format
+from simulation import DEFAULT_PERCENTILES, simulate_property_investment
+from sensitivity import DEFAULT_DELTA, DEFAULT_METRICS, sensitivity_analysis
+import grid_sweep
+from goal_seek import goal_seek
+from document_export import ANALYSIS_CHUNK_SIZE, EXPORT_FORMATS, export_file, report_document
+from report_generation import REPORT_FORMATS, REPORT_MEDIA_TYPES
+from job_queue import JobQueue, MemoryJobStore, QueueFull, SQLiteJobStore
+from settings import env_flag, env_float, env_int, env_str
+from instrumentation import enable, finish_timings, registry, server_timing, stage, start_timings, timed_run
+from worker_pool import PoolBusy, PoolTimeout, WorkerPool
 
 app = Flask(__name__)
 CORS(app)
 
+# Every setting below can be overridden by an environment variable of the same name
+
+# Serialized /analyze responses, keyed by the parsed inputs
+ANALYZE_CACHE_SIZE = env_int('ANALYZE_CACHE_SIZE', 1024)
+ANALYZE_CACHE_TTL = env_float('ANALYZE_CACHE_TTL', 3600)
+analyze_cache = ResultCache(ANALYZE_CACHE_SIZE, ANALYZE_CACHE_TTL)
+
+# Process pool the CPU-heavy endpoints hand their work to, the calls allowed
+# to run or wait in it at once (more get 503) and the seconds a request waits
+# for its result (then 504). 0 workers runs the work in the request thread,
+# the default outside gunicorn.conf.py, which starts a pool per web worker.
+ANALYSIS_WORKERS = env_int('ANALYSIS_WORKERS', 0)
+ANALYSIS_QUEUE_DEPTH = env_int('ANALYSIS_QUEUE_DEPTH', 4 * max(ANALYSIS_WORKERS, os.cpu_count() or 1))
+ANALYSIS_TIMEOUT = env_float('ANALYSIS_TIMEOUT', 120)
+ANALYSIS_START_METHOD = env_str('ANALYSIS_START_METHOD', None)
+analysis_pool = WorkerPool(ANALYSIS_WORKERS, ANALYSIS_QUEUE_DEPTH, ANALYSIS_TIMEOUT, ANALYSIS_START_METHOD)
+
+# Per-stage timing: METRICS_ENABLED serves request counts, stage and request
+# latency histograms and cache counters at /metrics (Prometheus text format),
+# SERVER_TIMING adds a Server-Timing header with the stage durations to every
+# response. With both off nothing is timed.
+METRICS_ENABLED = env_flag('METRICS_ENABLED', False)
+SERVER_TIMING = env_flag('SERVER_TIMING', False)
+enable(METRICS_ENABLED or SERVER_TIMING)
+
+# analysis_pool.run, also recording the stages timed in the pool process
+analysis_run = timed_run(analysis_pool.run)
+
+# Largest number of Monte Carlo paths accepted by /simulate, and of paths x
+# years (every path's value of every metric is kept until the percentiles
+# are taken, so this bounds the memory a simulation uses)
+MAX_SIMULATION_PATHS = env_int('MAX_SIMULATION_PATHS', 200000)
+MAX_SIMULATION_VALUES = env_int('MAX_SIMULATION_VALUES', 6000000)
+
+# Largest grid accepted by /sweep, and the processes a grid is spread over
+MAX_GRID_POINTS = env_int('MAX_GRID_POINTS', 250000)
+GRID_SWEEP_WORKERS = env_int('GRID_SWEEP_WORKERS', 1)
+
+# Largest number of properties accepted by /export/<fmt>
+MAX_EXPORT_PROPERTIES = env_int('MAX_EXPORT_PROPERTIES', 10000)
+
+# Largest number of properties of an /analyze/batch answered in one body
+# (json, nested, msgpack, or as a job); the whole body is held in memory, about
+# 130 KB per property. Streamed batches (ndjson, sse) have no limit.
+MAX_BATCH_PROPERTIES = env_int('MAX_BATCH_PROPERTIES', 1000)
+
+# Properties analyzed per chunk of a streamed /analyze/batch; bounds the
+# analyses held in memory, whatever the size of the batch
+STREAM_CHUNK_SIZE = env_int('STREAM_CHUNK_SIZE', 64)
+
+# Background jobs (POST /jobs): jobs run at once per web worker, unfinished
+# jobs allowed at once (more get 503), seconds a finished job is kept, the
+# most finished jobs and result bytes kept (the oldest go first), seconds
+# after which a job that never finished (its worker died) is dropped, and
+# the SQLite file jobs are kept in (shared by every web worker; unset keeps
+# them in the memory of the worker that took them). Their CPU-heavy calls run
+# in a pool of their own, so they never crowd out request work.
+JOB_RUNNERS = env_int('JOB_RUNNERS', 2)
+JOB_MAX_PENDING = env_int('JOB_MAX_PENDING', 100)
+JOB_TTL = env_float('JOB_TTL', 3600)
+JOB_MAX_RESULTS = env_int('JOB_MAX_RESULTS', 1000)
+JOB_MAX_RESULT_BYTES = env_int('JOB_MAX_RESULT_BYTES', 256 * 1024 * 1024)
+JOB_MAX_AGE = env_float('JOB_MAX_AGE', 6 * 3600)
+JOB_DATABASE = env_str('JOB_DATABASE', None)
+job_pool = WorkerPool(min(ANALYSIS_WORKERS, JOB_RUNNERS), JOB_RUNNERS, None, ANALYSIS_START_METHOD)
+
+@app.errorhandler(PoolBusy)
+def pool_busy(e):
+    return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+
+@app.errorhandler(PoolTimeout)
+def pool_timeout(e):
+    return jsonify({'error': str(e)}), 504
+
+def _start_request():
+    g.request_timing = (start_timings(), time.perf_counter())
+
+def _finish_request(response):
+    """Count the request and its stages; add the Server-Timing header."""
+    token, started = g.pop('request_timing', (None, None))
+    if token is None:
+        return response
+    total = time.perf_counter() - started
+    timings = finish_timings(token)
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    registry.inc('requests_total', (('endpoint', endpoint), ('method', request.method),
+                                    ('status', str(response.status_code))))
+    registry.observe('request_duration_seconds', (('endpoint', endpoint),), total)
+    if SERVER_TIMING:
+        response.headers['Server-Timing'] = server_timing(timings, total)
+    return response
+
+# Only installed when timing is on, so requests cost nothing extra otherwise
+if METRICS_ENABLED or SERVER_TIMING:
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok'}), 200
+    return jsonify({
+        'status': 'ok',
+        'analyze_cache': analyze_cache.stats(),
+        'amortization_cache': amortization_cache_stats(),
+        'analysis_pool': analysis_pool.stats(),
+        'jobs': job_queue.stats()
+    }), 200
 
-@app.route('/analyze', methods=['POST'])
-def analyze():
-    # Get form data from request
-    form_data = request.get_json()
-    
-    # Run analysis with the form data
-    analysis = analyze_property_investment(form_data)
+def _metric_samples():
+    """Cache, pool and job queue counters read at scrape time, as (name, labels, value, type)."""
+    samples = []
+    for cache, stats in (('analyze', analyze_cache.stats()), ('amortization', amortization_cache_stats())):
+        labels = (('cache', cache),)
+        samples += [('cache_hits_total', labels, stats['hits'], 'counter'),
+                    ('cache_misses_total', labels, stats['misses'], 'counter'),
+                    ('cache_evictions_total', labels, stats['evictions'], 'counter'),
+                    ('cache_hit_ratio', labels, stats['hit_rate'], 'gauge'),
+                    ('cache_entries', labels, stats['size'], 'gauge')]
+    for pool, stats in (('analysis', analysis_pool.stats()), ('jobs', job_pool.stats())):
+        labels = (('pool', pool),)
+        samples += [('pool_pending', labels, stats['pending'], 'gauge'),
+                    ('pool_completed_total', labels, stats['completed'], 'counter'),
+                    ('pool_rejected_total', labels, stats['rejected'], 'counter'),
+                    ('pool_timeouts_total', labels, stats['timeouts'], 'counter')]
+    stats = job_queue.stats()
+    samples += [('jobs_pending', (), stats['pending'], 'gauge'),
+                ('jobs_total', (('outcome', 'succeeded'),), stats['succeeded'], 'counter'),
+                ('jobs_total', (('outcome', 'failed'),), stats['failed'], 'counter'),
+                ('jobs_total', (('outcome', 'rejected'),), stats['rejected'], 'counter')]
+    return samples
 
-    # Build frontend-compatible results object based on backend output (Year 1)
-    y1 = analysis['yearly_data'][1]
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Counters of this web worker only; each gunicorn worker keeps its own
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled; set METRICS_ENABLED=1'}), 404
+    return app.response_class(registry.render(_metric_samples()), status=200,
+                              content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# yearly_data metrics build_results reads
+RESULT_METRICS = (
+    'cash_flow_before_tax', 'roi_pre_tax', 'cap_rate_annual', 'equity', 'cash_on_cash_return',
+    'return_on_equity', 'irr_before_tax', 'rent_to_value', 'gross_rent_multiplier', 'equity_multiplier',
+    'break_even_ratio', 'debt_coverage_ratio', 'debt_yield', 'loan_payments', 'gross_rent',
+    'effective_gross_income', 'total_operating_expenses', 'noi', 'property_value'
+)
+
+def build_results(analysis):
+    """Build frontend-compatible results object based on backend output (Year 1)."""
+    # Rows of the columnar yearly_data for just the years the results use
+    yearly = analysis['yearly_data']
+    positions = [yearly['years'].index(year) for year in PROJECTION_YEARS]
+    rows = yearly_rows({name: yearly['columns'][name][positions] for name in RESULT_METRICS}, PROJECTION_YEARS)
+    y1 = rows[1]
     purchase = analysis['purchase_info']
     derived = analysis['derived_values']
 
     results = {
         'cashFlow': round(y1['cash_flow_before_tax'] / 12),
-        'roi': analysis['yearly_data'][1]['roi_pre_tax'],
-        'capRate': analysis['yearly_data'][1]['cap_rate_annual'],
-        'equityGrowth': int(analysis['yearly_data'][1]['equity']),
+        'roi': y1['roi_pre_tax'],
+        'capRate': y1['cap_rate_annual'],
+        'equityGrowth': int(y1['equity']),
         'monthlyRent': int(purchase['rent_monthly']),
         'monthlyExpenses': int((derived['op_exp_initial']) / 12),
         'netIncome': round(y1['cash_flow_before_tax'] / 12),
 
-        'cashOnCashReturn': analysis['yearly_data'][1]['cash_on_cash_return'],
-        'returnOnEquity': analysis['yearly_data'][1]['return_on_equity'],
-        'irr': analysis['yearly_data'][1]['irr_before_tax'],
-        'rentToValue': analysis['yearly_data'][1]['rent_to_value'],
-        'grossRentMultiplier': analysis['yearly_data'][1]['gross_rent_multiplier'],
-        'equityMultiple': analysis['yearly_data'][1]['equity_multiplier'],
-        'breakEvenRatio': analysis['yearly_data'][1]['break_even_ratio'],
-        'debtCoverageRatio': analysis['yearly_data'][1]['debt_coverage_ratio'],
-        'debtYield': analysis['yearly_data'][1]['debt_yield'] if analysis['yearly_data'][1]['debt_yield'] != 'N/A' else 0,
+        'cashOnCashReturn': y1['cash_on_cash_return'],
+        'returnOnEquity': y1['return_on_equity'],
+        'irr': y1['irr_before_tax'],
+        'rentToValue': y1['rent_to_value'],
+        'grossRentMultiplier': y1['gross_rent_multiplier'],
+        'equityMultiple': y1['equity_multiplier'],
+        'breakEvenRatio': y1['break_even_ratio'],
+        'debtCoverageRatio': y1['debt_coverage_ratio'],
+        'debtYield': y1['debt_yield'] if y1['debt_yield'] != 'N/A' else 0,
 
         'purchasePrice': purchase['purchase_price'],
         'downPayment': int(derived['down_payment']),
@@ -62,24 +221,494 @@ def analyze():
         'cashFlowAnnual': int(y1['cash_flow_before_tax']),
 
         'projections': {
-            'years': [1, 5, 10, 20, 30],
-            'grossRent': [int(analysis['yearly_data'][y]['gross_rent']) for y in [1,5,10,20,30]],
-            'operatingIncome': [int(analysis['yearly_data'][y]['effective_gross_income']) for y in [1,5,10,20,30]],
-            'operatingExpenses': [int(analysis['yearly_data'][y]['total_operating_expenses']) for y in [1,5,10,20,30]],
-            'noi': [int(analysis['yearly_data'][y]['noi']) for y in [1,5,10,20,30]],
-            'cashFlow': [int(analysis['yearly_data'][y]['cash_flow_before_tax']) for y in [1,5,10,20,30]],
-            'propertyValue': [int(analysis['yearly_data'][y]['property_value']) for y in [1,5,10,20,30]],
-            'equity': [int(analysis['yearly_data'][y]['equity']) for y in [1,5,10,20,30]],
-            'capRate': [float(analysis['yearly_data'][y]['cap_rate_annual'] * 100) for y in [1,5,10,20,30]],
-            'cashOnCashReturn': [float(analysis['yearly_data'][y]['cash_on_cash_return'] * 100) for y in [1,5,10,20,30]],
-            'roi': [float(analysis['yearly_data'][y]['roi_pre_tax'] * 100) for y in [1,5,10,20,30]],
-            'irr': [float(analysis['yearly_data'][y]['irr_before_tax'] * 100) for y in [1,5,10,20,30]],
+            'years': list(PROJECTION_YEARS),
+            'grossRent': [int(rows[y]['gross_rent']) for y in PROJECTION_YEARS],
+            'operatingIncome': [int(rows[y]['effective_gross_income']) for y in PROJECTION_YEARS],
+            'operatingExpenses': [int(rows[y]['total_operating_expenses']) for y in PROJECTION_YEARS],
+            'noi': [int(rows[y]['noi']) for y in PROJECTION_YEARS],
+            'cashFlow': [int(rows[y]['cash_flow_before_tax']) for y in PROJECTION_YEARS],
+            'propertyValue': [int(rows[y]['property_value']) for y in PROJECTION_YEARS],
+            'equity': [int(rows[y]['equity']) for y in PROJECTION_YEARS],
+            'capRate': [float(rows[y]['cap_rate_annual'] * 100) for y in PROJECTION_YEARS],
+            'cashOnCashReturn': [float(rows[y]['cash_on_cash_return'] * 100) for y in PROJECTION_YEARS],
+            'roi': [float(rows[y]['roi_pre_tax'] * 100) for y in PROJECTION_YEARS],
+            'irr': [float(rows[y]['irr_before_tax'] * 100) for y in PROJECTION_YEARS],
         }
     }
+    return results
 
-    return jsonify({'propertyData': analysis, 'results': results}), 200
+def _format_error(e):
+    return jsonify({'error': str(e)}), 406
 
-if __name__ == '__main__':
-    app.run(host='127.0.0.1', port=8000, debug=False)
+def _list_arg(name, convert=str):
+    """Comma-separated query parameter as a tuple, or None when absent."""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    return tuple(convert(item.strip()) for item in value.split(',') if item.strip())
+
+def _report_years_arg():
+    """Report years from ?years= or, failing that, every year up to ?horizon= (default 30)."""
+    try:
+        years = _list_arg('years', int)
+        horizon = int(request.args.get('horizon', ANALYSIS_YEARS))
+    except ValueError as e:
+        raise ValueError(f'Invalid years: {e}') from e
+    return tuple(report_years(years, horizon))
+
+def _select_yearly_data(analysis, fields, years):
+    """Keep only the requested metrics and years of columnar yearly_data; None keeps them all."""
+    yearly = analysis['yearly_data']
+    fields = yearly['columns'] if fields is None else fields
+    years = yearly['years'] if years is None else years
+    positions = [yearly['years'].index(year) for year in years]
+    columns = {name: yearly['columns'][name][positions] for name in fields}
+    return dict(analysis, yearly_data={'years': list(years), 'columns': columns})
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    # Compact columnar JSON by default; ?format=nested for {year: {metric: value}}
+    # yearly_data, msgpack / Arrow when asked for by ?format= or the Accept header
+    try:
+        fmt = negotiate_format(request.args.get('format'), request.accept_mimetypes)
+    except FormatError as e:
+        return _format_error(e)
+
+    # Optional ?fields=metric,...&years=3,7 (or ?horizon=40) selection; only
+    # what the selected metrics depend on is computed. 'results' among the
+    # fields (or no fields at all) also returns the frontend results object.
+    try:
+        fields = _list_arg('fields')
+        years = _report_years_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with_results = fields is None or 'results' in fields
+    if fields is not None:
+        fields = tuple(dict.fromkeys(name for name in fields if name != 'results'))
+        unknown = [name for name in fields if name not in YEARLY_METRICS]
+        if unknown:
+            return jsonify({'error': f"Unknown field '{unknown[0]}'"}), 400
+
+    # Get form data from request
+    form_data = request.get_json()
+    try:
+        with stage('parse'):
+            inputs = parse_property_inputs(form_data)
+    except InputError as e:
+        return jsonify({'error': str(e), 'fields': e.errors}), 400
+
+    # Identical inputs get the stored response bytes without re-running the analysis
+    key = (inputs, fmt, fields, years, with_results)
+    body = analyze_cache.get(key)
+    if body is not None:
+        return app.response_class(body, status=200, mimetype=FORMATS[fmt], headers={'X-Cache': 'HIT'})
+
+    # Run analysis with the form data, adding what the results object needs
+    compute_fields = fields
+    compute_years = years
+    if with_results and fields is not None:
+        compute_fields = tuple(dict.fromkeys(fields + RESULT_METRICS))
+    if with_results:
+        compute_years = tuple(sorted(set(years) | set(PROJECTION_YEARS)))
+    with stage('analysis'):
+        analysis = analysis_run(analyze_property_inputs, inputs, 'columns', compute_fields, compute_years)
+    with stage('results'):
+        results = build_results(analysis) if with_results else None
+    if compute_fields != fields or compute_years != years:
+        analysis = _select_yearly_data(analysis, fields, years)
+
+    with stage('encode'):
+        body = encode_analysis(analysis, results, fmt, app.json.dumps)
+    analyze_cache.put(key, body)
+    return app.response_class(body, status=200, mimetype=FORMATS[fmt], headers={'X-Cache': 'MISS'})
+
+def _batch_items(form_data_list, years, shape, run, chunk_size=None, progress=None):
+    """
+    Items of an /analyze/batch response, one per property in order, as they
+    are computed: chunk_size properties per run() call (all at once when
+    None), calling progress(done, total) after each chunk. Only one chunk of
+    analyses is held at a time.
+    """
+    # The results need PROJECTION_YEARS as well as the requested years
+    compute_years = tuple(sorted(set(years) | set(PROJECTION_YEARS)))
+    chunk_size = chunk_size or max(len(form_data_list), 1)
+    for start in range(0, len(form_data_list), chunk_size):
+        outcomes = run(analyze_property_batch, form_data_list[start:start + chunk_size], 'columns', compute_years)
+        for index, outcome in enumerate(outcomes, start):
+            if 'error' in outcome:
+                yield {'index': index, 'error': outcome['error']}
+                continue
+            try:
+                results = build_results(outcome['analysis'])
+            except (ValueError, TypeError, OverflowError) as e:
+                yield {'index': index, 'error': str(e)}
+                continue
+            analysis = outcome['analysis']
+            if compute_years != tuple(years):
+                analysis = _select_yearly_data(analysis, None, years)
+            yield {'index': index, 'propertyData': shape(analysis), 'results': results}
+        if progress is not None:
+            progress(start + len(outcomes), len(form_data_list))
+
+def _batch(form_data_list, years, shape, run, chunk_size=None, progress=None):
+    """/analyze/batch response body for form_data_list (see _batch_items)."""
+    items = list(_batch_items(form_data_list, years, shape, run, chunk_size, progress))
+    return {
+        'count': len(items),
+        'errors': sum(1 for item in items if 'error' in item),
+        'items': items
+    }
+
+def _check_batch_size(form_data_list):
+    if len(form_data_list) > MAX_BATCH_PROPERTIES:
+        raise ValueError(f'At most {MAX_BATCH_PROPERTIES} properties can be analyzed in one response; '
+                         'use ?format=ndjson or sse to stream a larger batch')
 
+def _batch_records(form_data_list, years, run):
+    """
+    (event, body) records of a streamed /analyze/batch: an 'item' per
+    property as soon as its chunk is analyzed, then a 'summary' with the
+    counts, or an 'error' if the stream had to stop (the pool was busy).
+    """
+    count = errors = 0
+    try:
+        for item in _batch_items(form_data_list, years, compact_analysis, run, STREAM_CHUNK_SIZE):
+            count += 1
+            errors += 'error' in item
+            yield 'item', item
+    except (PoolBusy, PoolTimeout) as e:
+        yield 'error', {'error': str(e), 'count': count}
+        return
+    yield 'summary', {'count': count, 'errors': errors}
 
+@app.route('/analyze/batch', methods=['POST'])
+def analyze_batch():
+    # ?format=ndjson / sse (or the Accept header) streams each property's item
+    # as soon as it is computed
+    try:
+        fmt = negotiate_format(request.args.get('format'), request.accept_mimetypes,
+                               formats=['json', 'nested', 'msgpack', 'ndjson', 'sse'])
+    except FormatError as e:
+        return _format_error(e)
+
+    # Accept either a bare list of form data or {"properties": [...]}
+    payload = request.get_json()
+    form_data_list = payload.get('properties') if isinstance(payload, dict) else payload
+    if not isinstance(form_data_list, list):
+        return jsonify({'error': 'Expected a list of properties'}), 400
+    # ?years= / ?horizon= as for /analyze
+    try:
+        years = _report_years_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if fmt in STREAM_FORMATS:
+        records = _batch_records(form_data_list, years, analysis_run)
+        return app.response_class(encode_stream(records, fmt, app.json.dumps), status=200, mimetype=FORMATS[fmt],
+                                  headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    try:
+        _check_batch_size(form_data_list)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    shape = nested_analysis if fmt == 'nested' else compact_analysis
+    body = encode_body(_batch(form_data_list, years, shape, analysis_run, ANALYSIS_CHUNK_SIZE), fmt,
+                       app.json.dumps)
+    return app.response_class(body, status=200, mimetype=FORMATS[fmt])
+
+def _export_properties(payload):
+    """Form data list of an export: one property's form data, or a list / {"properties": [...]} of them."""
+    if isinstance(payload, dict) and 'properties' not in payload:
+        return [payload]
+    form_data_list = payload.get('properties') if isinstance(payload, dict) else payload
+    if not isinstance(form_data_list, list):
+        raise ValueError('Expected a property or a list of properties')
+    if len(form_data_list) > MAX_EXPORT_PROPERTIES:
+        raise ValueError(f'At most {MAX_EXPORT_PROPERTIES} properties can be exported at once')
+    return form_data_list
+
+def _projection_years(years):
+    """Years shown in the projection tables: the requested ones, or 1, 5, 10, 20 and 30."""
+    try:
+        return report_years(years or PROJECTION_YEARS)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid years: {e}') from e
+
+@app.route('/export/<fmt>', methods=['POST'])
+def export(fmt):
+    # One property's form data, or a list / {"properties": [...]} of them for a
+    # batch; ?years= picks the projection years (default 1, 5, 10, 20, 30)
+    payload = request.get_json()
+    if isinstance(payload, dict) and 'properties' not in payload:
+        try:
+            parse_property_inputs(payload)
+        except InputError as e:
+            return jsonify({'error': str(e), 'fields': e.errors}), 400
+    try:
+        form_data_list = _export_properties(payload)
+        proj_years = _projection_years(_list_arg('years', int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # The whole document is built in the analysis pool (a full pool gets 503,
+    # ANALYSIS_TIMEOUT 504, before anything is sent), then sent from its
+    # temporary file in chunks
+    try:
+        chunks = export_file(fmt, form_data_list, proj_years, analysis_run)
+    except FormatError as e:
+        return _format_error(e)
+    return app.response_class(chunks, status=200, mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="property-analysis.{fmt}"'
+    })
+
+def _monthly(payload, run):
+    return compact_monthly(run(
+        analyze_property_monthly,
+        payload.get('form_data') or {},
+        num_months=payload.get('months', 360),
+        sale_month=payload.get('sale_month')
+    ))
+
+@app.route('/analyze/monthly', methods=['POST'])
+def analyze_monthly():
+    payload = request.get_json()
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+
+    try:
+        monthly = _monthly(payload, analysis_run)
+    except InputError as e:
+        return jsonify({'error': str(e), 'fields': e.errors}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(monthly), 200
+
+def _simulate(payload, run):
+    num_paths = int(payload.get('paths', 10000))
+    num_years = int(payload.get('years', 30))
+    if num_paths > MAX_SIMULATION_PATHS:
+        raise ValueError(f'At most {MAX_SIMULATION_PATHS} paths are allowed')
+    if not 1 <= num_years <= MAX_YEARS:
+        raise ValueError(f'Years must be between 1 and {MAX_YEARS}')
+    if num_paths * num_years > MAX_SIMULATION_VALUES:
+        raise ValueError(f'At most {MAX_SIMULATION_VALUES} paths x years are allowed')
+    return run(
+        simulate_property_investment,
+        payload.get('form_data') or {},
+        payload.get('distributions'),
+        num_paths=num_paths,
+        num_years=num_years,
+        percentiles=payload.get('percentiles', DEFAULT_PERCENTILES),
+        seed=payload.get('seed')
+    )
+
+@app.route('/simulate', methods=['POST'])
+def simulate():
+    payload = request.get_json()
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+
+    try:
+        simulation = _simulate(payload, analysis_run)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(simulation), 200
+
+def _sensitivity(payload, run):
+    return run(
+        sensitivity_analysis,
+        payload.get('form_data') or {},
+        payload.get('inputs'),
+        metrics=payload.get('metrics', DEFAULT_METRICS),
+        year=payload.get('year', 30),
+        delta=payload.get('delta', DEFAULT_DELTA),
+        mode=payload.get('mode', 'relative')
+    )
+
+@app.route('/sensitivity', methods=['POST'])
+def sensitivity():
+    payload = request.get_json()
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+
+    try:
+        analysis = _sensitivity(payload, analysis_run)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(analysis), 200
+
+def _sweep(payload, run):
+    return run(
+        grid_sweep.grid_sweep,
+        payload.get('form_data') or {},
+        payload.get('axes'),
+        metrics=payload.get('metrics', grid_sweep.DEFAULT_METRICS),
+        years=payload.get('years', [1]),
+        workers=GRID_SWEEP_WORKERS,
+        max_points=MAX_GRID_POINTS
+    )
+
+@app.route('/sweep', methods=['POST'])
+def sweep():
+    payload = request.get_json()
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+
+    try:
+        result = _sweep(payload, analysis_run)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(result), 200
+
+def _solve(payload, run):
+    for field in ('metric', 'year', 'target', 'input'):
+        if field not in payload:
+            raise ValueError(f"Missing '{field}'")
+    return run(
+        goal_seek,
+        payload.get('form_data') or {},
+        payload['metric'],
+        payload['year'],
+        payload['target'],
+        payload['input'],
+        bounds=payload.get('bounds')
+    )
+
+@app.route('/solve', methods=['POST'])
+def solve():
+    payload = request.get_json()
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+
+    try:
+        solution = _solve(payload, analysis_run)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(solution), 200
+
+# --------------- Jobs ---------------
+# Each job kind takes the parameters of its endpoint's request and returns
+# (media type, result bytes); see job_queue.JobQueue
+def _analyze_job(params, progress, run):
+    """An /analyze response for params {'form_data', 'years' or 'horizon', 'format'}."""
+    fmt = negotiate_format(params.get('format'))
+    inputs = parse_property_inputs(params.get('form_data'))
+    years = tuple(report_years(params.get('years'), params.get('horizon', ANALYSIS_YEARS)))
+    compute_years = tuple(sorted(set(years) | set(PROJECTION_YEARS)))
+    analysis = run(analyze_property_inputs, inputs, 'columns', None, compute_years)
+    results = build_results(analysis)
+    if compute_years != years:
+        analysis = _select_yearly_data(analysis, None, years)
+    return FORMATS[fmt], encode_analysis(analysis, results, fmt, app.json.dumps)
+
+def _batch_job(params, progress, run):
+    """An /analyze/batch response for params {'properties', 'years' or 'horizon', 'format'}."""
+    fmt = negotiate_format(params.get('format'), formats=['json', 'nested', 'msgpack'])
+    form_data_list = params.get('properties')
+    if not isinstance(form_data_list, list):
+        raise ValueError('Expected a list of properties')
+    _check_batch_size(form_data_list)
+    years = report_years(params.get('years'), params.get('horizon', ANALYSIS_YEARS))
+    shape = nested_analysis if fmt == 'nested' else compact_analysis
+    body = _batch(form_data_list, years, shape, run, ANALYSIS_CHUNK_SIZE, progress)
+    return FORMATS[fmt], encode_body(body, fmt, app.json.dumps)
+
+def _report_job(params, progress, run):
+    """A rendered report for params {'form_data', 'format' (one of REPORT_FORMATS), 'years'}."""
+    fmt = params.get('format', 'text')
+    if fmt not in REPORT_MEDIA_TYPES:
+        raise ValueError(f"Unknown report format '{fmt}'; expected one of {', '.join(REPORT_FORMATS)}")
+    proj_years = _projection_years(params.get('years'))
+    inputs = parse_property_inputs(params.get('form_data'))
+    return REPORT_MEDIA_TYPES[fmt], run(report_document, inputs, fmt, proj_years)
+
+def _export_job(params, progress, run):
+    """An /export/<format> document for params {'properties' or 'form_data', 'format', 'years'}."""
+    fmt = params.get('format', 'xlsx')
+    form_data_list = _export_properties(params.get('properties', params.get('form_data')))
+    proj_years = _projection_years(params.get('years'))
+    # Built in the job pool; progress only moves when the document is done
+    document = b''.join(export_file(fmt, form_data_list, proj_years, run))
+    return EXPORT_FORMATS[fmt], document
+
+def _json_job(call):
+    """Job kind of an endpoint whose call(payload, run) returns a JSON-compatible object."""
+    def job(params, progress, run):
+        return 'application/json', app.json.dumps(call(params, run)).encode('utf-8')
+    return job
+
+JOB_KINDS = {
+    'analyze': _analyze_job,
+    'batch': _batch_job,
+    'monthly': _json_job(_monthly),
+    'simulate': _json_job(_simulate),
+    'sensitivity': _json_job(_sensitivity),
+    'sweep': _json_job(_sweep),
+    'solve': _json_job(_solve),
+    'report': _report_job,
+    'export': _export_job
+}
+job_queue = JobQueue(JOB_KINDS, SQLiteJobStore(JOB_DATABASE) if JOB_DATABASE else MemoryJobStore(),
+                     JOB_RUNNERS, JOB_MAX_PENDING, JOB_TTL, timed_run(job_pool.run), max_results=JOB_MAX_RESULTS,
+                     max_result_bytes=JOB_MAX_RESULT_BYTES, max_age=JOB_MAX_AGE)
+
+# File names of downloaded job results, by kind
+_JOB_RESULT_NAMES = {'report': 'property-report', 'export': 'property-analysis'}
+
+def _job_status(job):
+    """Job record as returned by the job endpoints; a JSON result is included inline."""
+    status = {name: job[name] for name in ('id', 'kind', 'status', 'progress', 'created', 'started', 'finished',
+                                           'expires')}
+    if job['status'] == 'failed':
+        status['error'] = job['error']
+    if job['status'] == 'succeeded':
+        status['media_type'] = job['media_type']
+        status['result_url'] = f"/jobs/{job['id']}/result"
+        if job['media_type'] == 'application/json':
+            status['result'] = json.loads(job['result'])
+    return status
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    # {"kind": one of JOB_KINDS, "params": the request body of that endpoint}
+    payload = request.get_json()
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    params = payload.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'error': "'params' must be an object"}), 400
+    try:
+        job = job_queue.submit(payload.get('kind'), params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    return jsonify(_job_status(job)), 202, {'Location': f"/jobs/{job['id']}"}
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'No such job (or its result expired)'}), 404
+    return jsonify(_job_status(job)), 200
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'No such job (or its result expired)'}), 404
+    if job['status'] != 'succeeded':
+        return jsonify({'error': f"The job is {job['status']}", 'status': job['status']}), 409
+    headers = {}
+    if job['kind'] in _JOB_RESULT_NAMES:
+        extension = mimetypes.guess_extension(job['media_type'].split(';')[0]) or ''
+        headers['Content-Disposition'] = f'attachment; filename="{_JOB_RESULT_NAMES[job["kind"]]}{extension}"'
+    return app.response_class(job['result'], status=200, content_type=job['media_type'], headers=headers)
+
+if __name__ == '__main__':
+    # Development server; serve production traffic with gunicorn -c gunicorn.conf.py app:app
+    app.run(host='127.0.0.1', port=8000, debug=False, threaded=True)
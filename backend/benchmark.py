@@ -0,0 +1,281 @@
+"""
+Micro-benchmarks of the analysis engine, one stage at a time, for a few
+representative payloads. Results are written as JSON and can be compared
+against a saved baseline:
+
+    python benchmark.py --output baseline.json      # save a baseline
+    python benchmark.py --baseline baseline.json    # compare; exits 1 on a regression
+    python benchmark.py -k loan -k cash             # only the matching benchmarks
+
+Compare runs made on the same machine and Python/NumPy versions only.
+"""
+import argparse
+import copy
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+import numpy as np
+from app import app, build_results
+from data_processing import create_projection_dataframe
+from projection_calculations import PROJECTION_YEARS, project_investment
+from property_analysis import MAX_YEARS, analyze_property_batch, analyze_property_inputs, report_years
+from property_inputs import SAMPLE_FORM_DATA, parse_property_inputs
+from report_generation import render_investment_report
+from response_formats import encode_analysis
+
+# Metrics of the loan part of the calculation graph (loan_calculations)
+LOAN_METRICS = ('interest_paid', 'principal_paid', 'loan_payments', 'mortgage_balance')
+
+# Properties per call of the batch stage
+BATCH_SIZE = 100
+
+# Defaults: a change beyond THRESHOLD (relative) and MIN_DELTA_US (absolute,
+# so that sub-microsecond jitter of the fastest stages is not reported) is a
+# regression or an improvement
+THRESHOLD = 0.10
+MIN_DELTA_US = 2.0
+
+# --------------- Payloads ---------------
+
+def _payload(**sections):
+    """SAMPLE_FORM_DATA with the given fields of each section replaced."""
+    form_data = copy.deepcopy(SAMPLE_FORM_DATA)
+    for section, values in sections.items():
+        form_data[section].update(values)
+    return form_data
+
+def _units(count):
+    """A property_info.units list of count units with the sample rent spread over them."""
+    return [{'beds': 1 + i % 3, 'baths': 1 + i % 2, 'rent': 900 + 10 * (i % 50)} for i in range(count)]
+
+# name -> (form data, projection horizon in years)
+PAYLOADS = {
+    'financed': (SAMPLE_FORM_DATA, 30),
+    'cash': (_payload(loan_info={'percent_down': 1}), 30),
+    'zero_rate': (_payload(loan_info={'interest_rate': 0}), 30),
+    'long_horizon': (SAMPLE_FORM_DATA, MAX_YEARS),
+    'many_units': (_payload(property_info={'units': _units(500), 'total_beds': 1000, 'total_baths': 750},
+                            purchase_info={'rent_monthly': sum(unit['rent'] for unit in _units(500))}), 30),
+    'loan_options': (_payload(loan_info={'interest_only_years': 5, 'arm_fixed_years': 5, 'arm_reset_years': 1,
+                                         'arm_rate_step': 0.005, 'arm_rate_cap': 0.1,
+                                         'extra_principal_mo': 200}), 30)
+}
+
+def _case(form_data, horizon):
+    """Everything the stages start from for one payload, computed once up front."""
+    inputs = parse_property_inputs(form_data)
+    years = report_years(horizon=horizon)
+    # The projection table and report show every year of a long horizon
+    table_years = years if horizon > max(PROJECTION_YEARS) else list(PROJECTION_YEARS)
+    nested = analyze_property_inputs(inputs, 'nested', years=years)
+    columns = analyze_property_inputs(inputs, 'columns', years=years)
+    return {
+        'form_data': form_data,
+        'inputs': inputs,
+        'values': inputs.projection_inputs(),
+        'years': years,
+        'table_years': table_years,
+        'nested': nested,
+        'columns': columns,
+        'results': build_results(columns)
+    }
+
+# --------------- Stages ---------------
+# Each takes a case and returns the call to time
+
+def _table(case):
+    analysis = case['nested']
+    rates = {**analysis['rates'], **analysis['expenses_info']}
+    return lambda: create_projection_dataframe(analysis['yearly_data'], analysis['derived_values'], rates,
+                                               analysis['tax_info'], case['table_years'])
+
+STAGES = {
+    # Reading and validating the form data (property_inputs)
+    'parse': lambda case: lambda: parse_property_inputs(case['form_data']),
+    # Loan schedule only (loan_calculations through the calculation graph)
+    'loan': lambda case: lambda: project_investment(case['values'], metrics=LOAN_METRICS, years=case['years']),
+    # Every yearly metric over the horizon (the projection kernel)
+    'projection': lambda case: lambda: project_investment(case['values'], years=case['years']),
+    # analyze_property_inputs: projection plus the analysis dictionary
+    'analysis': lambda case: lambda: analyze_property_inputs(case['inputs'], 'columns', years=case['years']),
+    # create_projection_dataframe over the report years
+    'projection_table': _table,
+    # The /analyze results object (app.build_results)
+    'results': lambda case: lambda: build_results(case['columns']),
+    # Text report of the analysis
+    'report': lambda case: lambda: render_investment_report(case['nested'], proj_years=case['table_years']),
+    # JSON /analyze response body
+    'encode': lambda case: lambda: encode_analysis(case['columns'], case['results'], 'json', app.json.dumps),
+    # BATCH_SIZE copies of the payload through analyze_property_batch
+    'batch': lambda case: lambda: analyze_property_batch([case['form_data']] * BATCH_SIZE, 'columns',
+                                                         years=case['years'])
+}
+
+def benchmark_names():
+    """Names of every benchmark, 'stage/payload'."""
+    return [f'{stage}/{payload}' for stage in STAGES for payload in PAYLOADS]
+
+# --------------- Timing ---------------
+
+def time_call(call, repeat=5, min_time=0.05):
+    """
+    Time call() with timeit (garbage collection off while timing).
+    The loop count is raised until one repeat takes at least min_time.
+    Args:
+        call (callable): Function of no arguments.
+        repeat (int): Timed repeats of the loop.
+        min_time (float): Shortest duration of one repeat, in seconds.
+    Returns:
+        dict: 'min_us' and 'median_us' per call over the repeats, 'loops' and 'repeat'.
+    """
+    timer = timeit.Timer(call)
+    loops = 1
+    while True:
+        elapsed = timer.timeit(loops)
+        if elapsed >= min_time:
+            break
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.2))
+    times = [elapsed / loops * 1e6 for elapsed in timer.repeat(repeat, loops)]
+    return {'min_us': min(times), 'median_us': statistics.median(times), 'loops': loops, 'repeat': repeat}
+
+def run_benchmarks(patterns=None, repeat=5, min_time=0.05, progress=None):
+    """
+    Run the benchmarks whose name contains any of patterns (all when None).
+    Args:
+        patterns (list): Substrings of the benchmark names to run.
+        repeat (int): Timed repeats per benchmark.
+        min_time (float): Shortest duration of one repeat, in seconds.
+        progress (callable): Called with each name and its timings as it finishes.
+    Returns:
+        dict: 'meta' (versions and settings of the run) and 'benchmarks' (name -> timings).
+    """
+    cases = {}
+    benchmarks = {}
+    for name in benchmark_names():
+        if patterns and not any(pattern in name for pattern in patterns):
+            continue
+        stage, payload = name.split('/')
+        if payload not in cases:
+            cases[payload] = _case(*PAYLOADS[payload])
+        call = STAGES[stage](cases[payload])
+        # Warm up the caches (amortization tables, compiled templates) first
+        call()
+        gc.collect()
+        benchmarks[name] = time_call(call, repeat, min_time)
+        if progress is not None:
+            progress(name, benchmarks[name])
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'min_time': min_time
+        },
+        'benchmarks': benchmarks
+    }
+
+def compare(current, baseline, threshold=THRESHOLD, min_delta_us=MIN_DELTA_US):
+    """
+    Compare the fastest time of every benchmark in both runs.
+    Args:
+        current (dict): Results of run_benchmarks.
+        baseline (dict): Saved results of an earlier run.
+        threshold (float): Relative change beyond which a benchmark regressed or improved.
+        min_delta_us (float): Smallest absolute change, in microseconds, that counts.
+    Returns:
+        dict: name -> {'baseline_us', 'current_us', 'change' (relative) and
+        'status' ('ok', 'regression' or 'improvement')} for the benchmarks in both.
+    """
+    comparison = {}
+    for name, timings in current['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            continue
+        before = baseline['benchmarks'][name]['min_us']
+        after = timings['min_us']
+        change = after / before - 1 if before else 0.0
+        status = 'ok'
+        if abs(after - before) >= min_delta_us:
+            if change > threshold:
+                status = 'regression'
+            elif change < -threshold:
+                status = 'improvement'
+        comparison[name] = {'baseline_us': before, 'current_us': after, 'change': change, 'status': status}
+    return comparison
+
+# --------------- Command line ---------------
+
+def _print_row(name, timings, file=sys.stdout):
+    print(f"{name:<30}{timings['min_us']:>14,.1f}{timings['median_us']:>14,.1f}{timings['loops']:>9}", file=file)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the analysis engine stages for representative payloads.')
+    parser.add_argument('-k', dest='patterns', action='append', metavar='PATTERN',
+                        help='only run benchmarks whose name (stage/payload) contains PATTERN; repeatable')
+    parser.add_argument('--list', action='store_true', help='list the benchmarks and exit')
+    parser.add_argument('--repeat', type=int, default=5, help='timed repeats per benchmark (default: 5)')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='shortest duration of one repeat in seconds (default: 0.05)')
+    parser.add_argument('--output', metavar='FILE', help="write the results as JSON to FILE ('-' for stdout)")
+    parser.add_argument('--baseline', metavar='FILE', help='compare against the results saved in FILE')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f'relative slowdown that counts as a regression (default: {THRESHOLD})')
+    parser.add_argument('--min-delta', type=float, default=MIN_DELTA_US,
+                        help=f'smallest change in microseconds that counts (default: {MIN_DELTA_US})')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(benchmark_names()))
+        return 0
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    # The table goes to stderr when the JSON goes to stdout
+    out = sys.stderr if args.output == '-' else sys.stdout
+    print(f"{'Benchmark':<30}{'Min (us)':>14}{'Median (us)':>14}{'Loops':>9}", file=out)
+    current = run_benchmarks(args.patterns, args.repeat, args.min_time,
+                             lambda name, timings: _print_row(name, timings, out))
+    if not current['benchmarks']:
+        print('No benchmark matches', file=sys.stderr)
+        return 2
+
+    if args.output == '-':
+        json.dump(current, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+            f.write('\n')
+
+    if baseline is None:
+        return 0
+    for key in ('python', 'numpy', 'machine'):
+        if baseline['meta'].get(key) != current['meta'][key]:
+            print(f"Warning: baseline {key} {baseline['meta'].get(key)} differs from {current['meta'][key]}",
+                  file=sys.stderr)
+    comparison = compare(current, baseline, args.threshold, args.min_delta)
+    print(f"\n{'Benchmark':<30}{'Baseline (us)':>14}{'Now (us)':>14}{'Change':>9}  Status", file=out)
+    for name, row in comparison.items():
+        print(f"{name:<30}{row['baseline_us']:>14,.1f}{row['current_us']:>14,.1f}{row['change']:>+9.1%}  "
+              f"{row['status']}", file=out)
+    missing = sorted(set(current['benchmarks']) - set(comparison))
+    if missing:
+        print(f"Not in the baseline: {', '.join(missing)}", file=out)
+    regressions = [name for name, row in comparison.items() if row['status'] == 'regression']
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}",
+              file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,92 +1,134 @@
+import numpy as np
 import pandas as pd
+from projection_calculations import PROJECTION_YEARS
 
-def create_projection_dataframe(yearly_data, derived_values, rates, tax_info):
+# Rows of the projection table: (label, source, scale). The source is a tuple
+# of yearly_data metrics summed together, the name of a derived value (the
+# same in every year) or None for a row of zeros. Labels are formatted with
+# the rates shown in them, in percent.
+PROJECTION_ROWS = (
+    ('Gross Rent', ('gross_rent',), 1),
+    ('Vacancy ({vacancy_rate:.0f}%)', ('vacancy_loss',), -1),
+    ('Operating Income', ('effective_gross_income',), 1),
+    ('Property Taxes', ('property_taxes',), -1),
+    ('Insurance', ('insurance',), -1),
+    ('Owner Paid Utilities', ('owner_paid_utilities',), -1),
+    ('Property Mgmt ({management_rate:.0f}%)', ('property_management',), -1),
+    ('Maintenance Reserve ({maintenance_rate:.0f}%)', ('maintenance',), -1),
+    ('Operating Expenses', ('total_operating_expenses',), -1),
+    ('Net Operating Income', ('noi',), 1),
+    ('Loan Payments', ('loan_payments',), -1),
+    ('Cash Flow', ('cash_flow_before_tax',), 1),
+    ('Property Value', ('property_value',), 1),
+    ('Loan Balance', ('mortgage_balance',), -1),
+    ('Equity', ('equity',), 1),
+    ('Selling Cost ({selling_cost_percentage:.0f}%)', ('selling_cost',), -1),
+    ('Sale Proceeds', ('sale_proceeds',), 1),
+    ('Cumulative Operating Income', ('cum_operating_income',), 1),
+    ('Cumulative Operating Expenses', ('cum_operating_expenses',), -1),
+    ('Cumulative NOI', ('cum_noi',), 1),
+    ('Cumulative Cash Flow', ('cum_cash_flow',), 1),
+    ('Total Cash Invested', 'total_cash_invested', -1),
+    ('Total Profit (Pre-Tax)', ('total_profit_pre_tax',), 1),
+    ('Operating Expenses (Tax)', ('total_operating_expenses',), -1),
+    ('Loan Interest', ('interest_paid',), -1),
+    ('Depreciation', ('depreciation',), -1),
+    ('Total Deductions', ('total_operating_expenses', 'interest_paid', 'depreciation'), -1),
+    ('Operating Income (Tax)', ('effective_gross_income',), 1),
+    ('Taxable Income', ('taxable_income',), 1),
+    ('Income Tax Due ({income_tax_rate:.0f}%)', ('income_tax_due',), -1),
+    ('Original Cost Basis', ('original_cost_basis',), 1),
+    ('Capital Improvements', None, 1),  # initial_improvements
+    ('Cumulative Depreciation', ('cum_dep',), -1),
+    ('Selling Cost (Tax)', ('selling_cost',), 1),
+    ('Adjusted Cost Basis', ('adjusted_cost_basis',), -1),
+    ('Sale Price', ('property_value',), 1),
+    ('Capital Gain', ('capital_gain',), 1),
+    ('Tax on Capital Gain (15%)', ('tax_on_capital_gain',), -1),
+    ('Recapture Tax (25%)', ('recapture_tax',), -1),
+    ('Total Profit (Pre-Tax, Sale)', ('total_profit_pre_tax',), 1),
+    ('Cumulative Income Tax Paid', ('cum_income_tax',), -1),
+    ('Capital Gain Tax Due', ('tax_on_capital_gain',), -1),
+    ('Recapture Tax Due', ('recapture_tax',), -1),
+    ('Total Profit (Post-Tax)', ('total_profit_post_tax',), 1),
+    ('Cap Rate', ('cap_rate_annual',), 100),
+    ('Cash on Cash Return', ('cash_on_cash_return',), 100),
+    ('Return on Equity', ('return_on_equity',), 100),
+    ('Return on Investment', ('roi_pre_tax',), 100),
+    ('Internal Rate of Return', ('irr_before_tax',), 100),
+    ('Rent to Value', ('rent_to_value',), 100),
+    ('Gross Rent Multiplier', ('gross_rent_multiplier',), 1),
+    ('Equity Multiple', ('equity_multiplier',), 1),
+    ('Break Even Ratio', ('break_even_ratio',), 100),
+    ('Debt Coverage Ratio', ('debt_coverage_ratio',), 1),
+    ('Debt Yield', ('debt_yield',), 100)
+)
+
+# Rows rounded to a number of decimals in the table
+_ROUNDED_ROWS = {'Debt Yield': 1}
+
+def metric_columns(yearly_data, metrics, proj_years):
     """
-    Create a comprehensive projection dataframe for the analysis.
+    Values of metrics at proj_years as float arrays, with NaN for 'N/A'.
+    yearly_data may be columnar ({'years': [...], 'columns': {...}}) or
+    {year: {metric: value}} rows; every year must be in it.
     """
-    proj_years = [1, 5, 10, 20, 30]
-    vacancy_rate = rates.get('vacancy_rate', 0.04)
-    management_rate = rates.get('management_rate', 0.10)
-    maintenance_rate = rates.get('maintenance_rate', 0.10)
-    selling_cost_percentage = tax_info.get('selling_cost_percentage', 0.03)
-    income_tax_rate = tax_info.get('income_tax_rate', 0.22)
-    total_cash_invested = derived_values.get('total_cash_invested', 0)
-    
-    proj_df = pd.DataFrame(index=[
-        'Gross Rent', f'Vacancy ({vacancy_rate * 100:.0f}%)', 'Operating Income',
-        'Property Taxes', 'Insurance', 'Owner Paid Utilities',
-        f'Property Mgmt ({management_rate * 100:.0f}%)', f'Maintenance Reserve ({maintenance_rate * 100:.0f}%)',
-        'Operating Expenses', 'Net Operating Income', 'Loan Payments', 'Cash Flow',
-        'Property Value', 'Loan Balance', 'Equity', f'Selling Cost ({selling_cost_percentage * 100:.0f}%)',
-        'Sale Proceeds', 'Cumulative Operating Income', 'Cumulative Operating Expenses',
-        'Cumulative NOI', 'Cumulative Cash Flow', 'Total Cash Invested', 'Total Profit (Pre-Tax)',
-        'Operating Expenses (Tax)', 'Loan Interest', 'Depreciation', 'Total Deductions',
-        'Operating Income (Tax)', 'Taxable Income', f'Income Tax Due ({income_tax_rate * 100:.0f}%)',
-        'Original Cost Basis', 'Capital Improvements', 'Cumulative Depreciation',
-        'Selling Cost (Tax)', 'Adjusted Cost Basis', 'Sale Price', 'Capital Gain',
-        'Tax on Capital Gain (15%)', 'Recapture Tax (25%)', 'Total Profit (Pre-Tax, Sale)',
-        'Cumulative Income Tax Paid', 'Capital Gain Tax Due', 'Recapture Tax Due', 'Total Profit (Post-Tax)',
-        'Cap Rate', 'Cash on Cash Return', 'Return on Equity', 'Return on Investment',
-        'Internal Rate of Return', 'Rent to Value', 'Gross Rent Multiplier', 'Equity Multiple',
-        'Break Even Ratio', 'Debt Coverage Ratio', 'Debt Yield'
-    ], columns=[f'Year {y}' for y in proj_years])
+    if 'columns' in yearly_data:
+        years = list(yearly_data['years'])
+        positions = [years.index(year) if year in years else None for year in proj_years]
+        if None in positions:
+            raise KeyError(proj_years[positions.index(None)])
+        return {name: np.asarray(yearly_data['columns'][name], dtype=float)[positions] for name in metrics}
+    rows = [yearly_data[year] for year in proj_years]
+    return {name: np.array([np.nan if row[name] == 'N/A' else row[name] for row in rows], dtype=float)
+            for name in metrics}
 
-    for y in proj_years:
-        data = yearly_data[y]
-        proj_df.at['Gross Rent', f'Year {y}'] = data['gross_rent']
-        proj_df.at[f'Vacancy ({vacancy_rate * 100:.0f}%)', f'Year {y}'] = -data['vacancy_loss']
-        proj_df.at['Operating Income', f'Year {y}'] = data['effective_gross_income']
-        proj_df.at['Property Taxes', f'Year {y}'] = -data['property_taxes']
-        proj_df.at['Insurance', f'Year {y}'] = -data['insurance']
-        proj_df.at['Owner Paid Utilities', f'Year {y}'] = -data['owner_paid_utilities']
-        proj_df.at[f'Property Mgmt ({management_rate * 100:.0f}%)', f'Year {y}'] = -data['property_management']
-        proj_df.at[f'Maintenance Reserve ({maintenance_rate * 100:.0f}%)', f'Year {y}'] = -data['maintenance']
-        proj_df.at['Operating Expenses', f'Year {y}'] = -data['total_operating_expenses']
-        proj_df.at['Net Operating Income', f'Year {y}'] = data['noi']
-        proj_df.at['Loan Payments', f'Year {y}'] = -data['loan_payments']
-        proj_df.at['Cash Flow', f'Year {y}'] = data['cash_flow_before_tax']
-        proj_df.at['Property Value', f'Year {y}'] = data['property_value']
-        proj_df.at['Loan Balance', f'Year {y}'] = -data['mortgage_balance']
-        proj_df.at['Equity', f'Year {y}'] = data['equity']
-        proj_df.at[f'Selling Cost ({selling_cost_percentage * 100:.0f}%)', f'Year {y}'] = -data['selling_cost']
-        proj_df.at['Sale Proceeds', f'Year {y}'] = data['sale_proceeds']
-        proj_df.at['Cumulative Operating Income', f'Year {y}'] = data['cum_operating_income']
-        proj_df.at['Cumulative Operating Expenses', f'Year {y}'] = -data['cum_operating_expenses']
-        proj_df.at['Cumulative NOI', f'Year {y}'] = data['cum_noi']
-        proj_df.at['Cumulative Cash Flow', f'Year {y}'] = data['cum_cash_flow']
-        proj_df.at['Total Cash Invested', f'Year {y}'] = -total_cash_invested
-        proj_df.at['Total Profit (Pre-Tax)', f'Year {y}'] = data['total_profit_pre_tax']
-        proj_df.at['Operating Expenses (Tax)', f'Year {y}'] = -data['total_operating_expenses']
-        proj_df.at['Loan Interest', f'Year {y}'] = -data['interest_paid']
-        proj_df.at['Depreciation', f'Year {y}'] = -data['depreciation']
-        proj_df.at['Total Deductions', f'Year {y}'] = -(data['total_operating_expenses'] + data['interest_paid'] + data['depreciation'])
-        proj_df.at['Operating Income (Tax)', f'Year {y}'] = data['effective_gross_income']
-        proj_df.at['Taxable Income', f'Year {y}'] = data['taxable_income']
-        proj_df.at[f'Income Tax Due ({income_tax_rate * 100:.0f}%)', f'Year {y}'] = -data['income_tax_due']
-        proj_df.at['Original Cost Basis', f'Year {y}'] = data['original_cost_basis']
-        proj_df.at['Capital Improvements', f'Year {y}'] = 0  # initial_improvements
-        proj_df.at['Cumulative Depreciation', f'Year {y}'] = -data['cum_dep']
-        proj_df.at['Selling Cost (Tax)', f'Year {y}'] = data['selling_cost']
-        proj_df.at['Adjusted Cost Basis', f'Year {y}'] = -data['adjusted_cost_basis']
-        proj_df.at['Sale Price', f'Year {y}'] = data['property_value']
-        proj_df.at['Capital Gain', f'Year {y}'] = data['capital_gain']
-        proj_df.at['Tax on Capital Gain (15%)', f'Year {y}'] = -data['tax_on_capital_gain']
-        proj_df.at['Recapture Tax (25%)', f'Year {y}'] = -data['recapture_tax']
-        proj_df.at['Total Profit (Pre-Tax, Sale)', f'Year {y}'] = data['total_profit_pre_tax']
-        proj_df.at['Cumulative Income Tax Paid', f'Year {y}'] = -data['cum_income_tax']
-        proj_df.at['Capital Gain Tax Due', f'Year {y}'] = -data['tax_on_capital_gain']
-        proj_df.at['Recapture Tax Due', f'Year {y}'] = -data['recapture_tax']
-        proj_df.at['Total Profit (Post-Tax)', f'Year {y}'] = data['total_profit_post_tax']
-        proj_df.at['Cap Rate', f'Year {y}'] = data['cap_rate_annual'] * 100
-        proj_df.at['Cash on Cash Return', f'Year {y}'] = data['cash_on_cash_return'] * 100
-        proj_df.at['Return on Equity', f'Year {y}'] = data['return_on_equity'] * 100
-        proj_df.at['Return on Investment', f'Year {y}'] = data['roi_pre_tax'] * 100
-        proj_df.at['Internal Rate of Return', f'Year {y}'] = data['irr_before_tax'] * 100
-        proj_df.at['Rent to Value', f'Year {y}'] = data['rent_to_value'] * 100
-        proj_df.at['Gross Rent Multiplier', f'Year {y}'] = data['gross_rent_multiplier']
-        proj_df.at['Equity Multiple', f'Year {y}'] = data['equity_multiplier']
-        proj_df.at['Break Even Ratio', f'Year {y}'] = data['break_even_ratio'] * 100
-        proj_df.at['Debt Coverage Ratio', f'Year {y}'] = data['debt_coverage_ratio']
-        proj_df.at['Debt Yield', f'Year {y}'] = round(data['debt_yield'] * 100, 1) if data['debt_yield'] != 'N/A' else 'N/A'
+def projection_matrix(yearly_data, derived_values, rates, tax_info, proj_years=PROJECTION_YEARS):
+    """
+    Build the projection table as a plain float64 matrix, without pandas.
+    Each row is a whole-array expression over the years, so the table is
+    assembled in one step for any set of years (all 30 if needed).
+    Args:
+        yearly_data (dict): Columnar or {year: {metric: value}} yearly data.
+        derived_values (dict): Scenario-level derived values.
+        rates (dict): Expense rates shown in the labels (vacancy, management, maintenance).
+        tax_info (dict): Selling cost percentage and income tax rate shown in the labels.
+        proj_years (list): Years to include, one column each.
+    Returns:
+        dict: 'labels' (row labels), 'years', 'values' (float64 array of shape
+        (rows, years), with NaN where a value is 'N/A') and 'missing' (the
+        boolean mask of those NaN entries).
+    """
+    percents = {
+        'vacancy_rate': rates.get('vacancy_rate', 0.04) * 100,
+        'management_rate': rates.get('management_rate', 0.10) * 100,
+        'maintenance_rate': rates.get('maintenance_rate', 0.10) * 100,
+        'selling_cost_percentage': tax_info.get('selling_cost_percentage', 0.03) * 100,
+        'income_tax_rate': tax_info.get('income_tax_rate', 0.22) * 100
+    }
+    metrics = {name for _, source, _ in PROJECTION_ROWS if isinstance(source, tuple) for name in source}
+    columns = metric_columns(yearly_data, sorted(metrics), list(proj_years))
 
-    return proj_df
+    labels = []
+    values = np.zeros((len(PROJECTION_ROWS), len(proj_years)))
+    for row, (label, source, scale) in enumerate(PROJECTION_ROWS):
+        label = label.format(**percents)
+        labels.append(label)
+        if isinstance(source, tuple):
+            values[row] = sum(columns[name] for name in source) * scale
+        elif source is not None:
+            values[row] = derived_values.get(source, 0) * scale
+        if label in _ROUNDED_ROWS:
+            values[row] = np.round(values[row], _ROUNDED_ROWS[label])
+    # Negated zeros would print as "-0"
+    values += 0.0
+    return {'labels': labels, 'years': list(proj_years), 'values': values, 'missing': np.isnan(values)}
+
+def create_projection_dataframe(yearly_data, derived_values, rates, tax_info, proj_years=PROJECTION_YEARS):
+    """
+    Create a comprehensive projection dataframe for the analysis.
+    One float64 column per year in proj_years ('Year 1', ...), each of which
+    must be in yearly_data; 'N/A' values are NaN (see projection_matrix).
+    """
+    table = projection_matrix(yearly_data, derived_values, rates, tax_info, proj_years)
+    return pd.DataFrame(table['values'], index=table['labels'], columns=[f'Year {y}' for y in proj_years])
@@ -0,0 +1,343 @@
+import itertools
+import os
+import tempfile
+import zlib
+from data_processing import PROJECTION_ROWS, metric_columns, projection_matrix
+from property_analysis import analyze_property_batch, analyze_property_inputs
+from report_generation import render_investment_report
+from response_formats import FormatError
+
+# Optional encoder; the xlsx export is only offered when it is installed
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Export format -> media type
+EXPORT_FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf'
+}
+
+# Bytes per chunk of the response body
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Properties analyzed per vectorized batch call; bounds the analyses held at once
+ANALYSIS_CHUNK_SIZE = 256
+
+# Columns of the Summary sheet after Index and Address: (heading, section or
+# 'year_1', name, cell kind)
+SUMMARY_COLUMNS = (
+    ('Purchase Price', 'purchase_info', 'purchase_price', 'money'),
+    ('Monthly Rent', 'purchase_info', 'rent_monthly', 'money'),
+    ('Loan Amount', 'derived_values', 'loan_amount', 'money'),
+    ('Total Cash Invested', 'derived_values', 'total_cash_invested', 'money'),
+    ('Cash Flow (Year 1)', 'year_1', 'cash_flow_before_tax', 'money'),
+    ('Cap Rate', 'year_1', 'cap_rate_annual', 'percent'),
+    ('Cash on Cash Return', 'year_1', 'cash_on_cash_return', 'percent'),
+    ('Return on Equity', 'year_1', 'return_on_equity', 'percent'),
+    ('Debt Coverage Ratio', 'year_1', 'debt_coverage_ratio', 'ratio')
+)
+_YEAR_1_METRICS = tuple(name for _, section, name, _ in SUMMARY_COLUMNS if section == 'year_1')
+
+# Projection rows shown as plain ratios rather than money (rows scaled by 100 are percentages)
+_RATIO_ROWS = ('Gross Rent Multiplier', 'Equity Multiple', 'Debt Coverage Ratio')
+_CELL_FORMATS = {'money': '$#,##0', 'percent': '0.0%', 'ratio': '0.00'}
+
+# Text pages of the PDF export: landscape US Letter, in points
+_PAGE_WIDTH = 792
+_PAGE_HEIGHT = 612
+_MARGIN = 36
+_FONT_SIZE = 8
+_COURIER_WIDTH = 0.6  # Width of a Courier character, in ems
+
+def _inline(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+def available_exports():
+    """Export formats that can be produced with the installed packages."""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != 'xlsx' or xlsxwriter]
+
+def _analyses(form_data_list, years, progress=None):
+    """
+    (index, analysis or None, error or None) per property, in order. The
+    properties are analyzed ANALYSIS_CHUNK_SIZE at a time, so a large export
+    never holds more than one chunk of analyses. progress(done, total) is
+    called once each chunk has been written.
+    """
+    for start in range(0, len(form_data_list), ANALYSIS_CHUNK_SIZE):
+        outcomes = analyze_property_batch(form_data_list[start:start + ANALYSIS_CHUNK_SIZE], 'columns', years)
+        for index, outcome in enumerate(outcomes, start):
+            yield index, outcome.get('analysis'), outcome.get('error')
+        if progress is not None:
+            progress(start + len(outcomes), len(form_data_list))
+
+def _address(analysis):
+    property_info = analysis['property_info']
+    return f"{property_info['street']}, {property_info['city']}, {property_info['state']} {property_info['zip_code']}"
+
+def _file_chunks(file):
+    """Read a file from the start in EXPORT_CHUNK_SIZE chunks."""
+    file.seek(0)
+    while True:
+        chunk = file.read(EXPORT_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+def _read_and_remove(path):
+    """Read the file at path in EXPORT_CHUNK_SIZE chunks, removing it once read or when the generator is closed."""
+    try:
+        with open(path, 'rb') as file:
+            yield from _file_chunks(file)
+    finally:
+        os.unlink(path)
+
+def _chunked(pieces):
+    """Join small byte strings into chunks of about EXPORT_CHUNK_SIZE."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+# --------------- Excel ---------------
+def _write_cell(sheet, row, column, value, cell_format):
+    """Write a number, or 'N/A' where it has none (NaN)."""
+    if value != value:
+        sheet.write_string(row, column, 'N/A')
+    else:
+        sheet.write_number(row, column, value, cell_format)
+
+def _write_xlsx(file, form_data_list, proj_years, progress=None):
+    """Write the workbook of xlsx_export into an open binary file."""
+    years = sorted(set(proj_years) | {1})
+    workbook = xlsxwriter.Workbook(file, {'constant_memory': True})
+    bold = workbook.add_format({'bold': True})
+    formats = {kind: workbook.add_format({'num_format': spec}) for kind, spec in _CELL_FORMATS.items()}
+    summary = workbook.add_worksheet('Summary')
+    projections = workbook.add_worksheet('Projections')
+    summary.write_row(0, 0, ['Index', 'Address', *(heading for heading, _, _, _ in SUMMARY_COLUMNS), 'Error'], bold)
+    projections.write_row(0, 0, ['Index', 'Address', 'Item', *(f'Year {y}' for y in proj_years)], bold)
+    summary.freeze_panes(1, 2)
+    projections.freeze_panes(1, 3)
+
+    projection_row = 1
+    for index, analysis, error in _analyses(form_data_list, years, progress):
+        row = index + 1
+        summary.write_number(row, 0, index)
+        if analysis is None:
+            summary.write_string(row, len(SUMMARY_COLUMNS) + 2, error)
+            continue
+        address = _address(analysis)
+        summary.write_string(row, 1, address)
+        year_1 = metric_columns(analysis['yearly_data'], _YEAR_1_METRICS, [1])
+        for column, (_, section, name, kind) in enumerate(SUMMARY_COLUMNS, 2):
+            value = float(year_1[name][0]) if section == 'year_1' else float(analysis[section][name])
+            _write_cell(summary, row, column, value, formats[kind])
+
+        rates = dict(analysis['rates'], **analysis['expenses_info'])
+        table = projection_matrix(analysis['yearly_data'], analysis['derived_values'], rates,
+                                  analysis['tax_info'], proj_years)
+        for label, (name, _, scale), values in zip(table['labels'], PROJECTION_ROWS, table['values'].tolist()):
+            kind = 'ratio' if name in _RATIO_ROWS else 'percent' if scale == 100 else 'money'
+            projections.write_number(projection_row, 0, index)
+            projections.write_string(projection_row, 1, address)
+            projections.write_string(projection_row, 2, label)
+            for column, value in enumerate(values, 3):
+                _write_cell(projections, projection_row, column, value / 100 if kind == 'percent' else value,
+                            formats[kind])
+            projection_row += 1
+    workbook.close()
+
+def xlsx_export(form_data_list, proj_years, progress=None):
+    """
+    An Excel workbook of the properties' analyses, in chunks once it is
+    complete. The workbook is written by xlsxwriter in constant_memory mode: every row
+    is flushed to a temporary file as soon as the next one starts, so memory
+    use does not grow with the number of properties. Properties go into two
+    sheets rather than one sheet each: Summary (one row per property) and
+    Projections (the report projection table of every property, one row per
+    item). A property whose inputs cannot be read gets its error in Summary.
+    Args:
+        form_data_list (list): Form data of each property.
+        proj_years (list): Years of the Projections sheet.
+        progress (callable): Called as progress(done, total) as the properties are written.
+    Returns:
+        generator: The .xlsx file in chunks of bytes.
+    """
+    with tempfile.TemporaryFile() as file:
+        _write_xlsx(file, form_data_list, proj_years, progress)
+        yield from _file_chunks(file)
+
+# --------------- PDF ---------------
+def _pdf_text(line):
+    """A line of text as a PDF string literal in WinAnsiEncoding."""
+    text = line.encode('cp1252', 'replace')
+    return b'(' + text.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+def _report_pages(report):
+    """Split a text report into pages: (font size, lines) with the font shrunk to fit the widest line."""
+    lines = report.expandtabs(8).splitlines()
+    width = max((len(line) for line in lines), default=1)
+    size = min(_FONT_SIZE, (_PAGE_WIDTH - 2 * _MARGIN) / (width * _COURIER_WIDTH))
+    per_page = int((_PAGE_HEIGHT - 2 * _MARGIN) // (size * 1.25))
+    for start in range(0, max(len(lines), 1), per_page):
+        yield size, lines[start:start + per_page]
+
+def _page_content(size, lines):
+    """Content stream of one page of Courier text."""
+    leading = size * 1.25
+    content = [b'BT /F1 %.2f Tf %.2f TL %d %.2f Td' % (size, leading, _MARGIN, _PAGE_HEIGHT - _MARGIN + leading)]
+    content.extend(_pdf_text(line) + b" '" for line in lines)
+    content.append(b'ET')
+    return zlib.compress(b'\n'.join(content))
+
+def _pdf_document(pages):
+    """
+    Write a PDF of text pages object by object as bytes pieces.
+    Each page is written as soon as it is produced; only the byte offsets of
+    the objects and the page numbers are kept for the cross-reference table
+    and page tree at the end.
+    """
+    offsets = {}
+    position = 0
+    # Objects 1-3: catalog, page tree (written last) and font
+    header = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    position += len(header)
+
+    def write_object(number, body):
+        nonlocal position
+        offsets[number] = position
+        data = b'%d 0 obj\n' % number + body + b'\nendobj\n'
+        position += len(data)
+        return data
+
+    yield header
+    yield write_object(1, b'<< /Type /Catalog /Pages 2 0 R >>')
+    yield write_object(3, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>')
+    page_numbers = []
+    number = 3
+    for size, lines in pages:
+        content = _page_content(size, lines)
+        yield write_object(number + 1, b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(content) +
+                           content + b'\nendstream')
+        yield write_object(number + 2, b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+                                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+                           % (_PAGE_WIDTH, _PAGE_HEIGHT, number + 1))
+        page_numbers.append(number + 2)
+        number += 2
+    kids = b' '.join(b'%d 0 R' % page for page in page_numbers)
+    yield write_object(2, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(page_numbers)))
+
+    xref = position
+    entries = [b'xref\n0 %d\n0000000000 65535 f \n' % (number + 1)]
+    entries.extend(b'%010d 00000 n \n' % offsets[n] for n in range(1, number + 1))
+    entries.append(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (number + 1, xref))
+    yield b''.join(entries)
+
+def pdf_export(form_data_list, proj_years, progress=None):
+    """
+    Stream a PDF of the properties' text reports, each starting on a new page.
+    Pages are written as the reports are rendered (see _pdf_document), so
+    memory use does not grow with the number of properties. A property whose
+    inputs cannot be read gets a page with its error.
+    Args:
+        form_data_list (list): Form data of each property.
+        proj_years (list): Years shown in the Buy & Hold Projections.
+        progress (callable): Called as progress(done, total) as the properties are written.
+    Returns:
+        generator: The PDF file in chunks of bytes.
+    """
+    years = sorted(set(proj_years) | {1})
+
+    def pages():
+        for index, analysis, error in _analyses(form_data_list, years, progress):
+            if analysis is None:
+                yield _FONT_SIZE, [f'Property {index}: {error}']
+                continue
+            yield from _report_pages(render_investment_report(analysis, 'text', proj_years))
+
+    return _chunked(_pdf_document(pages()))
+
+_EXPORTERS = {'xlsx': xlsx_export, 'pdf': pdf_export}
+
+def report_document(inputs, fmt, proj_years):
+    """
+    One property's report (see render_investment_report) as UTF-8 bytes,
+    analysis included, e.g. built in a pool process.
+    Args:
+        inputs: PropertyInputs as returned by parse_property_inputs.
+        fmt (str): One of REPORT_FORMATS.
+        proj_years (list): Years shown in the Buy & Hold Projections.
+    Returns:
+        bytes: The rendered report.
+    """
+    analysis = analyze_property_inputs(inputs, 'columns', None, sorted(set(proj_years) | {1}))
+    return render_investment_report(analysis, fmt, proj_years).encode('utf-8')
+
+def _check_format(fmt):
+    if fmt not in EXPORT_FORMATS:
+        raise FormatError(f"Unknown format '{fmt}'; expected one of {', '.join(EXPORT_FORMATS)}")
+    if fmt not in available_exports():
+        raise FormatError(f"Format '{fmt}' is not available")
+
+def export_document(fmt, form_data_list, proj_years, progress=None):
+    """
+    Stream an export of the properties' analyses.
+    Args:
+        fmt (str): One of EXPORT_FORMATS.
+        form_data_list (list): Form data of each property.
+        proj_years (list): Projection years shown.
+        progress (callable): Called as progress(done, total) as the properties are written.
+    Returns:
+        generator: The document in chunks of bytes.
+    """
+    _check_format(fmt)
+    return _EXPORTERS[fmt](form_data_list, proj_years, progress)
+
+def write_export(fmt, form_data_list, proj_years, path):
+    """
+    Write an export into the existing file at path (e.g. in a pool process,
+    see export_file). Nothing is written if the file was removed meanwhile.
+    """
+    _check_format(fmt)
+    with open(path, 'r+b') as file:
+        if fmt == 'xlsx':
+            _write_xlsx(file, form_data_list, proj_years)
+        else:
+            for chunk in pdf_export(form_data_list, proj_years):
+                file.write(chunk)
+
+def export_file(fmt, form_data_list, proj_years, run=_inline):
+    """
+    Build an export with run(write_export, ...), e.g. WorkerPool.run, so the
+    analyses and the document writing happen in a pool process, then read
+    the finished document back from its temporary file. The whole document is
+    built before this returns, so errors of run (a full pool, a timeout) are
+    raised here, before any of it is sent.
+    Args:
+        fmt (str): One of EXPORT_FORMATS.
+        form_data_list (list): Form data of each property.
+        proj_years (list): Projection years shown.
+        run (callable): run(fn, *args) calling fn where the work should happen.
+    Returns:
+        iterator: The document in chunks of bytes; the file is removed once read.
+    """
+    _check_format(fmt)
+    fd, path = tempfile.mkstemp(prefix='export-', suffix=f'.{fmt}')
+    os.close(fd)
+    try:
+        run(write_export, fmt, form_data_list, proj_years, path)
+    except BaseException:
+        os.unlink(path)
+        raise
+    chunks = _read_and_remove(path)
+    # Opened (and so removed on close) before the response starts
+    return itertools.chain([next(chunks, b'')], chunks)
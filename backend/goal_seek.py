@@ -0,0 +1,117 @@
+import numpy as np
+from property_inputs import FORM_INPUT_PATHS, INTEGER_INPUTS, parse_property_inputs
+from projection_calculations import YEARLY_METRICS, project_investment
+from property_analysis import report_years
+
+# Points evaluated together per kernel call: first across the bounds to find
+# a bracket, then inside the bracket to narrow it
+SCAN_POINTS = 64
+REFINE_POINTS = 16
+
+def _default_bounds(name, base):
+    """Search range for an input when the request gives none."""
+    if name.endswith(('_rate', '_ratio', '_percentage', '_inc', 'percent_down', 'appreciation')):
+        return (min(0.0, base), max(1.0, 2 * base))
+    return (min(0.0, base), max(1.0, 4 * base))
+
+def _evaluate(base_inputs, name, candidates, metric, year):
+    """Value of metric in year for every candidate value of one input."""
+    inputs = dict(base_inputs)
+    inputs[name] = candidates
+    projection = project_investment(inputs, metrics=(metric,), years=(year,))
+    return np.broadcast_to(projection['yearly_data'][metric], (candidates.size, 1))[:, 0]
+
+def _bracket(candidates, residuals, base):
+    """
+    Indices (i, j) of neighbouring candidates whose residuals change sign (or
+    i == j where a residual is exactly zero), taking the one closest to base and
+    skipping candidates where the metric has no value. None if there is none.
+    """
+    finite = np.flatnonzero(np.isfinite(residuals))
+    exact = finite[residuals[finite] == 0]
+    if exact.size:
+        index = exact[np.argmin(np.abs(candidates[exact] - base))]
+        return index, index
+    pairs = np.flatnonzero(np.sign(residuals[finite[:-1]]) != np.sign(residuals[finite[1:]]))
+    if pairs.size == 0:
+        return None
+    lower, upper = finite[pairs], finite[pairs + 1]
+    best = np.argmin(np.abs((candidates[lower] + candidates[upper]) / 2 - base))
+    return lower[best], upper[best]
+
+def goal_seek(form_data, metric, year, target, input_path, bounds=None, xtol=1e-9, maxiter=20):
+    """
+    Find the value of one input at which a metric reaches a target, e.g. the
+    highest purchase price that still gives a year-1 DSCR of 1.25.
+    The input's range is scanned in one stacked kernel call to bracket the
+    target, then the bracket is narrowed by scanning inside it. Each call
+    projects only as far as the target year and evaluates only what the
+    metric depends on.
+    Args:
+        form_data (dict): Form data as accepted by analyze_property_investment.
+        metric (str): yearly_data metric to hit.
+        year (int): Projection year the metric is read from, between 1 and MAX_YEARS.
+        target (float): Value the metric should reach.
+        input_path (str): Form path of the input to vary, e.g. 'purchase_info.purchase_price'.
+        bounds (tuple): (low, high) range searched; defaults depend on the input.
+        xtol (float): Tolerance on the solved input, relative to its size (at least 1).
+        maxiter (int): Largest number of narrowing steps.
+    Returns:
+        dict: The solved input value, the metric value it achieves and the
+        number of kernel evaluations.
+    """
+    if metric not in YEARLY_METRICS:
+        raise ValueError(f"Unknown metric '{metric}'")
+    if input_path not in FORM_INPUT_PATHS:
+        raise ValueError(f"Unknown input path '{input_path}'")
+    name = FORM_INPUT_PATHS[input_path]
+    if name in INTEGER_INPUTS:
+        raise ValueError(f"'{input_path}' only takes whole numbers and cannot be solved for")
+    year, = report_years([year])
+    target = float(target)
+    base_inputs = parse_property_inputs(form_data).projection_inputs()
+    base = base_inputs[name]
+    low, high = (float(b) for b in bounds) if bounds is not None else _default_bounds(name, base)
+    if not low < high:
+        raise ValueError('bounds must be (low, high) with low < high')
+
+    candidates = np.linspace(low, high, SCAN_POINTS)
+    residuals = _evaluate(base_inputs, name, candidates, metric, year) - target
+    evaluations = 1
+    found = _bracket(candidates, residuals, base)
+    if found is None:
+        raise ValueError(f"'{metric}' does not reach {target:g} in year {year} for "
+                         f"{input_path} between {low:g} and {high:g}")
+    lo, hi = candidates[list(found)]
+    lo_residual, hi_residual = residuals[list(found)]
+    for _ in range(maxiter):
+        if hi - lo <= xtol * max(1.0, abs(lo)):
+            break
+        inner = np.linspace(lo, hi, REFINE_POINTS + 2)[1:-1]
+        inner_residuals = _evaluate(base_inputs, name, inner, metric, year) - target
+        evaluations += 1
+        points = np.concatenate([[lo], inner, [hi]])
+        point_residuals = np.concatenate([[lo_residual], inner_residuals, [hi_residual]])
+        found = _bracket(points, point_residuals, lo)
+        if found is None:
+            break
+        lo, hi = points[list(found)]
+        lo_residual, hi_residual = point_residuals[list(found)]
+
+    # Linear interpolation between the bracket ends
+    if lo_residual == hi_residual:
+        solution = lo
+    else:
+        solution = min(max(lo - lo_residual * (hi - lo) / (hi_residual - lo_residual), lo), hi)
+    achieved = _evaluate(base_inputs, name, np.array([solution]), metric, year)[0]
+    evaluations += 1
+
+    return {
+        'input': input_path,
+        'value': float(solution),
+        'metric': metric,
+        'year': year,
+        'target': target,
+        'achieved': float(achieved),
+        'evaluations': evaluations
+    }
@@ -0,0 +1,145 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from property_inputs import FORM_INPUT_PATHS, INTEGER_INPUTS, parse_property_inputs
+from projection_calculations import YEARLY_METRICS, project_investment
+from property_analysis import report_years
+
+DEFAULT_METRICS = ('cash_on_cash_return',)
+
+# Largest number of grid points projected per kernel call; bounds memory use
+# (the loan schedule alone is points x 12 x years values)
+CHUNK_SIZE = 4096
+
+def _parse_axes(axes, max_points=None):
+    """
+    Validate the axes of a grid sweep.
+    The size of every axis is checked, and the grid size against max_points,
+    before any axis array is built, so an oversized 'num' is rejected
+    without allocating it.
+    Args:
+        axes (list): Two or three objects {'path': form path, 'values': [...]} or
+            {'path': ..., 'start': ..., 'stop': ..., 'num': ...} (evenly spaced, inclusive).
+        max_points (int): Largest grid accepted; None for no limit.
+    Returns:
+        list: (path, input name, values array) per axis.
+    """
+    if not isinstance(axes, list) or not 2 <= len(axes) <= 3:
+        raise ValueError('A grid sweep needs two or three axes')
+    paths = []
+    sizes = []
+    for axis in axes:
+        if not isinstance(axis, dict):
+            raise ValueError('Each axis must be an object')
+        path = axis.get('path')
+        if path not in FORM_INPUT_PATHS:
+            raise ValueError(f"Unknown input path '{path}'")
+        if path in paths:
+            raise ValueError(f"Input path '{path}' is swept twice")
+        if 'values' in axis:
+            if not isinstance(axis['values'], (list, tuple)) or not axis['values']:
+                raise ValueError(f"Axis '{path}' needs a list of at least one value")
+            size = len(axis['values'])
+        elif {'start', 'stop', 'num'} <= axis.keys():
+            size = axis['num']
+            if isinstance(size, bool) or not isinstance(size, int) or size < 1:
+                raise ValueError(f"Axis '{path}' needs a positive integer 'num'")
+        else:
+            raise ValueError(f"Axis '{path}' needs 'values' or 'start', 'stop' and 'num'")
+        paths.append(path)
+        sizes.append(size)
+    if max_points is not None and math.prod(sizes) > max_points:
+        raise ValueError(f'At most {max_points} grid points are allowed')
+
+    parsed = []
+    for axis, path in zip(axes, paths):
+        if 'values' in axis:
+            values = np.asarray(axis['values'], dtype=float)
+            if values.ndim != 1:
+                raise ValueError(f"Axis '{path}' values must be numbers")
+        else:
+            values = np.linspace(float(axis['start']), float(axis['stop']), axis['num'])
+        name = FORM_INPUT_PATHS[path]
+        if name in INTEGER_INPUTS:
+            values = np.round(values)
+        parsed.append((path, name, values))
+    return parsed
+
+def _evaluate_chunk(inputs, years, metrics):
+    """Project one chunk of grid points for the requested metrics and years."""
+    projection = project_investment(inputs, metrics=metrics, years=years)
+    points = max(np.size(value) for value in inputs.values())
+    return {metric: np.broadcast_to(projection['yearly_data'][metric], (points, len(years)))
+            for metric in metrics}
+
+def _json_matrix(values):
+    """Convert an array to nested lists with None in place of NaN."""
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    values = values.astype(object)
+    values[missing] = None
+    return values.tolist()
+
+def grid_sweep(form_data, axes, metrics=DEFAULT_METRICS, years=(1,), workers=None,
+               chunk_size=CHUNK_SIZE, max_points=None):
+    """
+    Evaluate metrics over every combination of two or three inputs.
+    The grid points are flattened and projected by the vectorized kernel in
+    chunks, only as far as the last year requested. With workers > 1 the
+    chunks are spread over a process pool, which pays off for very large grids.
+    Args:
+        form_data (dict): Form data as accepted by analyze_property_investment; supplies
+            every input that is not swept.
+        axes (list): Swept inputs, see _parse_axes, e.g.
+            [{'path': 'loan_info.percent_down', 'start': 0.05, 'stop': 0.5, 'num': 10},
+             {'path': 'loan_info.interest_rate', 'values': [0.03, 0.05, 0.07, 0.09]}].
+        metrics (list): yearly_data metrics to report.
+        years (list): Projection years to report, between 1 and MAX_YEARS.
+        workers (int): Processes to spread the chunks over; None or 1 runs in-process.
+        chunk_size (int): Grid points projected per kernel call.
+        max_points (int): Largest grid accepted; None for no limit.
+    Returns:
+        dict: The axis values and, for every metric and year, a matrix indexed
+        [axis 0 value][axis 1 value]([axis 2 value]).
+    """
+    if isinstance(metrics, str) or not metrics:
+        raise ValueError('At least one metric is required')
+    metrics = list(metrics)
+    for metric in metrics:
+        if metric not in YEARLY_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'")
+    if not isinstance(years, (list, tuple)):
+        raise ValueError('Years must be a list')
+    years = report_years(years)
+    base_inputs = parse_property_inputs(form_data).projection_inputs()
+    grid_axes = _parse_axes(axes, max_points)
+
+    shape = tuple(values.size for _, _, values in grid_axes)
+    points = int(np.prod(shape))
+    grid = np.meshgrid(*(values for _, _, values in grid_axes), indexing='ij')
+    swept = {name: values.reshape(-1) for (_, name, _), values in zip(grid_axes, grid)}
+
+    chunks = []
+    for start in range(0, points, chunk_size):
+        inputs = dict(base_inputs)
+        inputs.update({name: values[start:start + chunk_size] for name, values in swept.items()})
+        chunks.append(inputs)
+    if workers and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            results = list(pool.map(_evaluate_chunk, chunks, [years] * len(chunks), [metrics] * len(chunks)))
+    else:
+        results = [_evaluate_chunk(inputs, years, metrics) for inputs in chunks]
+
+    matrices = {}
+    for metric in metrics:
+        # (points, years) -> (years, *grid shape)
+        values = np.concatenate([result[metric] for result in results]).T.reshape((len(years),) + shape)
+        matrices[metric] = {year: _json_matrix(matrix) for year, matrix in zip(years, values)}
+
+    return {
+        'axes': [{'path': path, 'values': values.tolist()} for path, _, values in grid_axes],
+        'shape': list(shape),
+        'years': years,
+        'metrics': matrices
+    }
@@ -0,0 +1,36 @@
+# Production serving: gunicorn -c gunicorn.conf.py app:app (from the backend directory)
+# Every setting can be overridden by the environment variable named next to it.
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# Pre-forked web workers (WEB_CONCURRENCY), each serving requests on a few
+# threads (WEB_THREADS); the threads mostly wait on the analysis pool, so a
+# slow analysis never holds up /health or the other light endpoints
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+
+# Seconds a request may take before its worker is restarted (WEB_TIMEOUT);
+# keep it above ANALYSIS_TIMEOUT so the pool times out first with a 504
+timeout = int(os.environ.get('WEB_TIMEOUT', 150))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Import the app (numpy, numpy_financial and the analysis modules) once in
+# the master, before forking, so workers start with them loaded and share
+# their memory pages
+preload_app = True
+
+# Split the CPUs between the web workers' analysis pools unless
+# ANALYSIS_WORKERS is set (app.py reads it when preloaded)
+os.environ.setdefault('ANALYSIS_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+accesslog = os.environ.get('ACCESS_LOG', '-')
+
+def worker_exit(server, worker):
+    """Stop the exiting worker's job runners and pool processes."""
+    from app import analysis_pool, job_pool, job_queue
+    job_queue.shutdown()
+    job_pool.shutdown()
+    analysis_pool.shutdown()
@@ -0,0 +1,219 @@
+import contextvars
+import threading
+import time
+from contextlib import nullcontext
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+                   60.0)
+
+# Prefix of every metric name
+METRIC_PREFIX = 'equity_engine_'
+
+# Stage timings of the current request (a list of (stage, seconds)), or None
+# outside one; each request thread sees its own
+_timings = contextvars.ContextVar('stage_timings', default=None)
+
+# Off by default, so that stage() is a shared no-op until enable()
+_enabled = False
+_NO_STAGE = nullcontext()
+
+def enable(on=True):
+    """Turn stage timing on (or off) in this process."""
+    global _enabled
+    _enabled = on
+
+def enabled():
+    return _enabled
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and latency histograms of this process, rendered in
+    the Prometheus text format. A metric is a name and a tuple of
+    (label, value) pairs.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        Args:
+            buckets (tuple): Ascending upper bounds of the histogram buckets, in seconds.
+        """
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, text):
+        """Set the HELP text of a metric."""
+        self._help[name] = text
+
+    def inc(self, name, labels=(), amount=1):
+        """Add amount to a counter."""
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, labels, seconds):
+        """Count one observation in a histogram."""
+        key = (name, labels)
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Per-bucket counts (the last one above every bound), sum and count
+                histogram = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self, gauges=()):
+        """
+        The metrics in the Prometheus text exposition format.
+        Args:
+            gauges (iterable): Extra (name, labels, value, type) samples read at
+                scrape time, e.g. cache counters kept elsewhere; type is 'gauge' or 'counter'.
+        Returns:
+            str: One sample per line, grouped by metric.
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, (list(counts), total, count))
+                                for key, (counts, total, count) in self._histograms.items())
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in self._help:
+                    lines.append(f'# HELP {METRIC_PREFIX}{name} {self._help[name]}')
+                lines.append(f'# TYPE {METRIC_PREFIX}{name} {kind}')
+
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f'{METRIC_PREFIX}{name}{_labels(labels)} {_number(value)}')
+        for (name, labels), (counts, total, count) in histograms:
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket
+                lines.append(f'{METRIC_PREFIX}{name}_bucket{_labels(labels + (("le", _number(bound)),))} {cumulative}')
+            lines.append(f'{METRIC_PREFIX}{name}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{METRIC_PREFIX}{name}_count{_labels(labels)} {count}')
+        for name, labels, value, kind in sorted(gauges, key=lambda sample: sample[:2]):
+            header(name, kind)
+            lines.append(f'{METRIC_PREFIX}{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+def _number(value):
+    if value is None:
+        return 'NaN'
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# Metrics of this process, scraped through the /metrics endpoint
+registry = MetricsRegistry()
+registry.describe('stage_duration_seconds', 'Time spent in each stage of an analysis or request.')
+registry.describe('requests_total', 'HTTP requests answered, by endpoint, method and status.')
+registry.describe('request_duration_seconds', 'Time to answer an HTTP request (to the first byte when streamed).')
+
+# --------------- Stage timing ---------------
+
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+def stage(name):
+    """
+    Context manager timing its block as the stage name. While timing is off
+    it is one shared no-op context, so instrumented code costs only this call.
+    """
+    if not _enabled:
+        return _NO_STAGE
+    return _Stage(name)
+
+def record(name, seconds):
+    """Count a stage duration towards the current request, or straight into the registry outside one."""
+    timings = _timings.get()
+    if timings is None:
+        registry.observe('stage_duration_seconds', (('stage', name),), seconds)
+    else:
+        timings.append((name, seconds))
+
+def start_timings():
+    """Collect the stage timings of the current context from now on; returns a token for finish_timings."""
+    return _timings.set([])
+
+def finish_timings(token):
+    """
+    Stop collecting, count the collected stages into the registry and return
+    them as a list of (stage, seconds) in the order they ended.
+    """
+    timings = _timings.get() or []
+    _timings.reset(token)
+    for name, seconds in timings:
+        registry.observe('stage_duration_seconds', (('stage', name),), seconds)
+    return timings
+
+def call_timed(fn, *args, **kwargs):
+    """
+    Call fn with stage timing on and return (result, stage timings), e.g. in
+    a pool process, whose own registry is never scraped.
+    """
+    enable()
+    token = _timings.set([])
+    try:
+        result = fn(*args, **kwargs)
+        return result, _timings.get()
+    finally:
+        _timings.reset(token)
+
+def timed_run(run):
+    """
+    Wrap a run(fn, *args, **kwargs) callable such as WorkerPool.run so that,
+    while timing is on, the stages fn goes through in the pool process are
+    recorded here as well.
+    """
+    def run_timed(fn, *args, **kwargs):
+        if not _enabled:
+            return run(fn, *args, **kwargs)
+        result, timings = run(call_timed, fn, *args, **kwargs)
+        for name, seconds in timings:
+            record(name, seconds)
+        return result
+    return run_timed
+
+def server_timing(timings, total=None):
+    """
+    Server-Timing header value of stage timings, in milliseconds, repeated
+    stages added up, e.g. 'parse;dur=0.041, analysis;dur=2.913, total;dur=3.420'.
+    """
+    durations = {}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0.0) + seconds
+    if total is not None:
+        durations['total'] = total
+    return ', '.join(f'{name};dur={seconds * 1000:.3f}' for name, seconds in durations.items())
@@ -0,0 +1,215 @@
+import numpy as np
+import numpy_financial as npf
+
+# --------------- Creating Functions for IRR Calculation ---------------
+def _sign_changes(flows):
+    """
+    Count sign changes along the last axis, ignoring zero cash flows.
+    By Descartes' rule of signs a series with exactly one sign change has a
+    single IRR above -100%, which is the one npf.irr returns.
+    """
+    signs = np.sign(flows)
+    positions = np.where(signs != 0, np.arange(flows.shape[-1]), 0)
+    filled = np.take_along_axis(signs, np.maximum.accumulate(positions, axis=-1), axis=-1)
+    return np.count_nonzero(filled[..., 1:] * filled[..., :-1] < 0, axis=-1)
+
+def _npv_at_discount_factor(flows, x, exponents=None):
+    """
+    Evaluate the NPV of each row of flows at discount factors x = 1 / (1 + rate).
+    Flow i is discounted by x ** exponents[i], i.e. received exponents[i]
+    periods in; evenly spaced (0, 1, 2, ...) when exponents is None.
+    """
+    if exponents is None:
+        exponents = np.arange(flows.shape[-1])
+    return np.sum(flows * x[:, None] ** exponents, axis=-1)
+
+def _bisect_discount_factor(flows, tol, maxiter=200, exponents=None):
+    """
+    Bracketed fallback for series with a single sign change. The NPV keeps the
+    sign of the first non-zero flow just above x = 0 and flips past the root, so
+    the upper bound is doubled until it brackets the root and then bisected.
+    """
+    rows = flows.shape[0]
+    first_sign = np.sign(np.take_along_axis(flows, np.argmax(flows != 0, axis=-1)[:, None], axis=-1)[:, 0])
+    lo = np.zeros(rows)
+    hi = np.ones(rows)
+    for _ in range(maxiter):
+        npv = _npv_at_discount_factor(flows, hi, exponents)
+        unbracketed = np.sign(npv) == first_sign
+        if not unbracketed.any():
+            break
+        lo = np.where(unbracketed, hi, lo)
+        hi = np.where(unbracketed, hi * 2, hi)
+    for _ in range(maxiter):
+        mid = (lo + hi) / 2
+        npv = _npv_at_discount_factor(flows, mid, exponents)
+        below = np.sign(npv) == first_sign
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+        with np.errstate(divide='ignore'):
+            if np.all((lo > 0) & (np.abs(1 / lo - 1 / hi) < tol)):
+                break
+    return (lo + hi) / 2
+
+def _has_closer_root(flows, x, samples=32):
+    """
+    Check whether the NPV changes sign strictly between rate 0 and +/-rate,
+    i.e. whether a root closer to zero than rate = 1 / x - 1 may exist.
+    npf.irr returns the root closest to zero, so such rows need its full solve.
+    """
+    rate = (1 / x - 1)[:, None]
+    fractions = np.arange(samples + 1) / samples
+    # From zero up to (not at) the root itself, and from zero all the way out
+    # to its mirror image, staying above -100%
+    mirror = np.maximum(-rate, -1 + 1e-9)
+    points = np.concatenate([rate * fractions[:-1], mirror * fractions[1:]], axis=1)
+    powers = (1 / (1 + points))[:, :, None] ** np.arange(flows.shape[-1])
+    signs = np.sign(np.einsum('rt,rpt->rp', flows, powers))
+    return np.any(signs != signs[:, :1], axis=1)
+
+def _solve_irr(flows, changes, guess, tol, maxiter, exponents=None):
+    """
+    Solve the IRR of each row of flows, starting Newton's method from guess.
+    Rows with no sign change have no IRR (NaN, as npf.irr returns). Rows with
+    one sign change have exactly one IRR; if Newton misses it, bisection finds
+    it. Rows with several sign changes may have several IRRs: a Newton root is
+    kept when no other root can be closer to zero, which is npf.irr's choice,
+    and the rest are handed to npf.irr. With uneven exponents (see
+    _npv_at_discount_factor) npf.irr does not apply: those rows keep the root
+    Newton converges to, as Excel's XIRR does, and are NaN if it does not.
+    """
+    rates = np.full(flows.shape[0], np.nan)
+    solvable = changes > 0
+    if not solvable.any():
+        return rates
+    if not solvable.all():
+        flows = flows[solvable]
+        guess = guess[solvable]
+        changes = changes[solvable]
+    evenly_spaced = exponents is None
+    if evenly_spaced:
+        exponents = np.arange(flows.shape[-1])
+    weighted = flows * exponents
+    x = 1 / (1 + guess)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(maxiter):
+            powers = x[:, None] ** exponents
+            # NPV over its derivative, sum(c * e * x ** (e - 1)) = sum(c * e * x ** e) / x
+            step = x * (flows * powers).sum(axis=-1) / (weighted * powers).sum(axis=-1)
+            x -= step
+            # A step of dx in the discount factor moves the rate by about dx / x**2
+            if not (np.abs(step) >= tol * x * x).any():
+                break
+        failed = ~(np.abs(step) < tol * x * x) | ~(x > 0)
+
+        single = changes == 1
+        if (failed & single).any():
+            x[failed & single] = _bisect_discount_factor(flows[failed & single], tol, exponents=exponents)
+        multiple = np.flatnonzero(~single)
+        if not evenly_spaced:
+            x[multiple[failed[multiple]]] = np.nan
+        elif multiple.size:
+            check = multiple[~failed[multiple]]
+            unresolved = np.concatenate([multiple[failed[multiple]],
+                                         check[_has_closer_root(flows[check], x[check])]])
+            for row in unresolved:
+                x[row] = 1 / (1 + npf.irr(flows[row]))
+    rates[solvable] = 1 / x - 1
+    return rates
+
+def hold_period_irr(initial_investment, cash_flows, terminal_values, tol=1e-10, maxiter=50,
+                    max_stacked_size=20000, hold_years=None):
+    """
+    Calculate the IRR of selling at the end of every year of a projection.
+    For a hold period of n years the cash flows are
+    [initial_investment, cf_1, ..., cf_(n-1), cf_n + terminal_n], the series
+    analyze_property_investment used to rebuild and pass to npf.irr each year.
+    Small problems (a few properties) stack every hold period into one Newton
+    solve. Larger ones go year by year, seeding each year's solve with the
+    previous year's IRR, which is usually a few Newton steps from the answer,
+    so only one year's cash flows are held at a time. Rows where Newton does
+    not converge fall back to bisection.
+    Args:
+        initial_investment (float or array): Cash flow at time 0 (normally negative), one per series.
+        cash_flows (array): Yearly cash flows, shape (years,) or (series, years).
+        terminal_values (array): Amount received on sale at the end of each hold period,
+            shape (..., len(hold_years)).
+        tol (float): Absolute tolerance on the rate.
+        maxiter (int): Newton iterations before falling back to bisection.
+        max_stacked_size (int): Largest series * hold periods * (years + 1) solved as one stacked system.
+        hold_years (array): Hold periods to solve, ascending; defaults to every year 1..years.
+    Returns:
+        ndarray: IRR for each hold period, same shape as terminal_values. NaN where
+        npf.irr would return NaN.
+    """
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    terminal_values = np.asarray(terminal_values, dtype=float)
+    single_series = cash_flows.ndim == 1
+    cash_flows = np.atleast_2d(cash_flows)
+    terminal_values = np.atleast_2d(terminal_values)
+    initial_investment = np.broadcast_to(np.asarray(initial_investment, dtype=float), cash_flows.shape[:1])
+
+    series, years = cash_flows.shape
+    flows = np.concatenate([initial_investment[:, None], cash_flows], axis=1)
+    hold_years = np.arange(1, years + 1) if hold_years is None else np.asarray(hold_years)
+    holds = hold_years.size
+    if series * holds * (years + 1) <= max_stacked_size:
+        # hold_flows[:, i] is the series for selling at the end of year hold_years[i],
+        # zero-padded past that year so every hold period is a row of one solve
+        held = np.arange(years + 1) <= hold_years[:, None]
+        hold_flows = flows[:, None, :] * held
+        hold_flows[:, np.arange(holds), hold_years] += terminal_values
+        hold_flows = hold_flows.reshape(series * holds, years + 1)
+        irr = _solve_irr(hold_flows, _sign_changes(hold_flows), np.full(series * holds, 0.1),
+                         tol, maxiter).reshape(series, holds)
+    else:
+        irr = np.empty((series, holds))
+        guess = np.full(series, 0.1)
+        for index, year in enumerate(hold_years):
+            hold_flows = flows[:, :year + 1].copy()
+            hold_flows[:, year] += terminal_values[:, index]
+            rates = _solve_irr(hold_flows, _sign_changes(hold_flows), guess, tol, maxiter)
+            irr[:, index] = rates
+            # Seed the next period from this one, or from the default where there was no IRR
+            guess = np.where(rates > -1, rates, 0.1)
+    return irr[0] if single_series else irr
+
+def cash_flow_irr(cash_flows, guess=0.1, tol=1e-10, maxiter=50):
+    """
+    IRR per period of evenly spaced cash flows, the rate npf.irr returns,
+    solved for every row at once.
+    Args:
+        cash_flows (array): Cash flows starting at time 0, shape (periods,) or (series, periods).
+        guess (float): Starting rate for Newton's method.
+        tol (float): Absolute tolerance on the rate.
+        maxiter (int): Newton iterations before falling back to bisection.
+    Returns:
+        float or ndarray: IRR per period of each series; NaN where there is none.
+    """
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    flows = np.atleast_2d(cash_flows)
+    rates = _solve_irr(flows, _sign_changes(flows), np.full(flows.shape[0], float(guess)), tol, maxiter)
+    return rates[0] if cash_flows.ndim == 1 else rates
+
+def xirr(cash_flows, dates, guess=0.1, tol=1e-10, maxiter=100):
+    """
+    Annual IRR of cash flows on arbitrary dates, like Excel's XIRR: flow i is
+    discounted by (1 + rate) ** ((dates[i] - dates[0]) / 365 days).
+    Args:
+        cash_flows (array): Cash flows, shape (flows,) or (series, flows).
+        dates (array): Date of each flow (datetime64 or ISO strings), shape (flows,).
+        guess (float): Starting rate for Newton's method.
+        tol (float): Absolute tolerance on the rate.
+        maxiter (int): Newton iterations before falling back to bisection.
+    Returns:
+        float or ndarray: Annual rate of each series; NaN where there is none.
+    """
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    flows = np.atleast_2d(cash_flows)
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    exponents = (dates - dates[0]).astype(float) / 365
+    if dates.shape != flows.shape[-1:] or np.any(np.diff(exponents) < 0):
+        raise ValueError('dates must be in order, one per cash flow')
+    rates = _solve_irr(flows, _sign_changes(flows), np.full(flows.shape[0], float(guess)), tol, maxiter,
+                       exponents)
+    return rates[0] if cash_flows.ndim == 1 else rates
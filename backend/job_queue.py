@@ -0,0 +1,297 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Job status, in the order a job goes through them
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+# Fields of a job record; result holds the output bytes (media_type says what they are)
+JOB_FIELDS = ('id', 'kind', 'status', 'progress', 'created', 'started', 'finished', 'expires', 'error',
+              'media_type', 'result')
+
+class QueueFull(RuntimeError):
+    """The queue already holds its largest number of unfinished jobs."""
+
+def _inline(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+class MemoryJobStore:
+    """
+    Job records in a dict of this process. Every web worker has its own, so
+    with several workers a job can only be polled through the worker that
+    took it; use SQLiteJobStore there.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else dict(job)
+
+    def purge(self, now, created_before=None):
+        """Drop the jobs that expired by now and the unfinished ones created before created_before; returns how many."""
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if (job['expires'] is not None and job['expires'] <= now)
+                       or (created_before is not None and job['finished'] is None and job['created'] < created_before)]
+            for job_id in expired:
+                del self._jobs[job_id]
+            return len(expired)
+
+    def trim(self, max_results, max_bytes):
+        """
+        Drop the oldest finished jobs beyond the newest max_results, or whose
+        results together with the newer ones' exceed max_bytes; returns how many.
+        """
+        with self._lock:
+            finished = sorted((job for job in self._jobs.values() if job['finished'] is not None),
+                              key=lambda job: job['finished'], reverse=True)
+            dropped = 0
+            total = 0
+            for count, job in enumerate(finished, 1):
+                total += len(job['result'] or b'')
+                if count > max_results or total > max_bytes:
+                    del self._jobs[job['id']]
+                    dropped += 1
+            return dropped
+
+    def count(self):
+        with self._lock:
+            return len(self._jobs)
+
+class SQLiteJobStore:
+    """
+    Job records in a SQLite database, shared by every process that opens the
+    same file, so any web worker can answer a poll. Each process opens its
+    own connection on first use (connections must not cross a fork).
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Database file; created with its table if missing.
+        """
+        self.path = path
+        self._connection = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, status TEXT, progress REAL, '
+                'created REAL, started REAL, finished REAL, expires REAL, error TEXT, media_type TEXT, result BLOB)')
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def add(self, job):
+        with self._lock:
+            self._db().execute(f"INSERT INTO jobs VALUES ({', '.join('?' * len(JOB_FIELDS))})",
+                               [job[name] for name in JOB_FIELDS])
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            self._db().execute(f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+                               [*fields.values(), job_id])
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._db().execute(f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else dict(zip(JOB_FIELDS, row))
+
+    def purge(self, now, created_before=None):
+        """Drop the jobs that expired by now and the unfinished ones created before created_before; returns how many."""
+        with self._lock:
+            return self._db().execute(
+                'DELETE FROM jobs WHERE expires <= ? OR (finished IS NULL AND created < ?)',
+                (now, float('-inf') if created_before is None else created_before)).rowcount
+
+    def trim(self, max_results, max_bytes):
+        """
+        Drop the oldest finished jobs beyond the newest max_results, or whose
+        results together with the newer ones' exceed max_bytes; returns how many.
+        """
+        with self._lock:
+            return self._db().execute(
+                'DELETE FROM jobs WHERE id IN (SELECT id FROM (SELECT id, '
+                'ROW_NUMBER() OVER (ORDER BY finished DESC, id) AS n, '
+                'SUM(COALESCE(LENGTH(result), 0)) OVER (ORDER BY finished DESC, id) AS total '
+                'FROM jobs WHERE finished IS NOT NULL) WHERE n > ? OR total > ?)',
+                (max_results, max_bytes)).rowcount
+
+    def count(self):
+        with self._lock:
+            return self._db().execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+class JobQueue:
+    """
+    Runs long analyses in the background and keeps their results for a while.
+    A job is a kind (a key of kinds) and its parameters. submit() records it
+    and returns at once; one of the runner threads then calls
+    kinds[kind](params, progress, run), where progress(done, total) records
+    how far it got and run(fn, *args) calls fn in the queue's worker pool (or
+    inline). The function returns (media type, result bytes). A finished job
+    is kept for ttl seconds, then dropped, and only the newest max_results
+    finished jobs (with at most max_result_bytes of results together) are
+    kept at all. A job still unfinished max_age seconds after it was
+    submitted (its process died) is dropped as well.
+    """
+
+    def __init__(self, kinds, store=None, runners=2, max_pending=100, ttl=3600, run=_inline, clock=time.time,
+                 max_results=1000, max_result_bytes=256 * 1024 * 1024, max_age=6 * 3600):
+        """
+        Args:
+            kinds (dict): Job kind -> function(params, progress, run) -> (media type, bytes).
+            store: MemoryJobStore (the default) or SQLiteJobStore.
+            runners (int): Jobs run at once.
+            max_pending (int): Jobs queued or running at once in this process; more raise QueueFull.
+            ttl (float): Seconds a finished job is kept.
+            run (callable): run(fn, *args, **kwargs) for the CPU-heavy calls of a job,
+                e.g. WorkerPool.run; calls them in the runner thread by default.
+            clock (callable): Wall-clock time source, in seconds.
+            max_results (int): Finished jobs kept at most; the oldest are dropped first.
+            max_result_bytes (int): Result bytes kept at most, across the finished jobs;
+                a larger single result fails its job.
+            max_age (float): Seconds after which a job that never finished is dropped.
+        """
+        if runners < 1:
+            raise ValueError('runners must be positive')
+        self.kinds = kinds
+        self.store = MemoryJobStore() if store is None else store
+        self.runners = runners
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._run = run
+        self._clock = clock
+        self.max_results = max_results
+        self.max_result_bytes = max_result_bytes
+        self.max_age = max_age
+        self._unfinished = set()
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _runner_pool(self):
+        """The runner threads of the current process, started on first use."""
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(self.runners, thread_name_prefix='job')
+            self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, kind, params):
+        """
+        Queue a job.
+        Args:
+            kind (str): One of kinds.
+            params (dict): Parameters of the job, passed to its function.
+        Returns:
+            dict: The job record (status 'queued').
+        """
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown job kind '{kind}'; expected one of {', '.join(self.kinds)}")
+        now = self._clock()
+        self.store.purge(now, now - self.max_age)
+        job = {name: None for name in JOB_FIELDS}
+        job.update(id=uuid.uuid4().hex, kind=kind, status='queued', progress=0.0, created=now)
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull('Too many jobs are waiting; try again later')
+            self.pending += 1
+            self._unfinished.add(job['id'])
+            self.store.add(job)
+            self._runner_pool().submit(self._execute, job['id'], kind, params)
+        return job
+
+    def _execute(self, job_id, kind, params):
+        """Run one job in a runner thread and record its outcome."""
+        self.store.update(job_id, status='running', started=self._clock())
+
+        def progress(done, total):
+            self.store.update(job_id, progress=done / total if total else 1.0)
+
+        try:
+            media_type, result = self.kinds[kind](params, progress, self._run)
+            if len(result) > self.max_result_bytes:
+                raise ValueError(f'The result is larger than {self.max_result_bytes} bytes')
+        except Exception as e:
+            now = self._clock()
+            self.store.update(job_id, status='failed', error=str(e) or type(e).__name__, finished=now,
+                              expires=now + self.ttl)
+            outcome = 'failed'
+        else:
+            now = self._clock()
+            self.store.update(job_id, status='succeeded', progress=1.0, media_type=media_type, result=result,
+                              finished=now, expires=now + self.ttl)
+            outcome = 'succeeded'
+        self.store.trim(self.max_results, self.max_result_bytes)
+        with self._lock:
+            self.pending -= 1
+            self._unfinished.discard(job_id)
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def get(self, job_id):
+        """The job record, or None if there is no such job or it expired."""
+        now = self._clock()
+        job = self.store.get(job_id)
+        if job is None or (job['expires'] is not None and job['expires'] <= now):
+            return None
+        return job
+
+    def stats(self):
+        """Settings and counters of this process, e.g. for a health check."""
+        with self._lock:
+            return {
+                'runners': self.runners,
+                'max_pending': self.max_pending,
+                'ttl': self.ttl,
+                'max_results': self.max_results,
+                'max_result_bytes': self.max_result_bytes,
+                'max_age': self.max_age,
+                'pending': self.pending,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'stored': self.store.count()
+            }
+
+    def shutdown(self, wait=False):
+        """
+        Stop the runner threads of the current process, dropping queued jobs.
+        The jobs of this process that have not finished are recorded as
+        failed, so that nobody polls them forever.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None or self._pid != os.getpid():
+            return
+        executor.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            unfinished = list(self._unfinished)
+            self._unfinished.clear()
+        now = self._clock()
+        for job_id in unfinished:
+            self.store.update(job_id, status='failed', error='The server stopped before the job finished',
+                              finished=now, expires=now + self.ttl)
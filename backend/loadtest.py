@@ -0,0 +1,416 @@
+"""
+HTTP load generator for the API. Replays a corpus of /analyze payloads at a
+set concurrency (and optionally a set rate) and reports throughput, latency
+percentiles and errors as text and JSON. Only the standard library is used
+for the client, so it runs offline next to the server:
+
+    python loadtest.py --start gunicorn --concurrency 16 --duration 30
+    python loadtest.py --url http://127.0.0.1:8000 --rate 50 --output load.json
+    python loadtest.py --start flask --max-p99 500 --max-error-rate 0.01   # exits 1 when a limit is exceeded
+"""
+import argparse
+import copy
+import http.client
+import itertools
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+from property_inputs import SAMPLE_FORM_DATA
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Seconds to wait for a started server to answer /health
+SERVER_START_TIMEOUT = 60
+
+# --------------- Corpus ---------------
+
+def generate_corpus(size=200, seed=0):
+    """
+    Realistic /analyze payloads: the sample property with its price, rent,
+    expenses, loan and growth rates varied, including cash purchases,
+    interest-free loans, loan options and multi-unit properties.
+    Args:
+        size (int): Number of payloads.
+        seed (int): Random seed, so a corpus can be reproduced.
+    Returns:
+        list: Form data dictionaries.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        form_data = copy.deepcopy(SAMPLE_FORM_DATA)
+        price = rng.randrange(150, 1500) * 1000
+        units = rng.choice((1, 1, 1, 2, 4, 12, 48))
+        rent = round(price * rng.uniform(0.006, 0.011), -1)
+        form_data['property_info'].update(
+            units=[{'beds': rng.randint(1, 4), 'baths': rng.randint(1, 3), 'rent': round(rent / units, -1)}
+                   for _ in range(units)],
+            total_beds=units * 2, total_baths=units)
+        form_data['purchase_info'].update(
+            purchase_price=price, rent_monthly=rent, closing_cost=round(price * rng.uniform(0.01, 0.04)),
+            initial_improvements=rng.choice((0, 5000, 20000)))
+        form_data['loan_info'].update(
+            percent_down=rng.choice((0.035, 0.1, 0.2, 0.25, 0.25, 1)),
+            interest_rate=rng.choice((0, round(rng.uniform(0.03, 0.09), 4))),
+            loan_term_years=rng.choice((15, 30, 30)))
+        if rng.random() < 0.1:
+            form_data['loan_info'].update(interest_only_years=5, arm_fixed_years=5, arm_reset_years=1,
+                                          arm_rate_step=0.0025, arm_rate_cap=0.1)
+        form_data['owner_paid_expenses'].update(
+            property_tax_yr=round(price * rng.uniform(0.005, 0.025)), insurance_mo=rng.randrange(60, 400),
+            vacancy_rate=rng.choice((0.03, 0.05, 0.08)), management_rate=rng.choice((0, 0.08, 0.1)))
+        form_data['yearly_rate_increase'].update(
+            appreciation=round(rng.uniform(0, 0.06), 3), rent_rate_inc=round(rng.uniform(0, 0.05), 3))
+        corpus.append(form_data)
+    return corpus
+
+def load_corpus(path):
+    """Request bodies from a JSON Lines file, one JSON document per line."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+# --------------- Load ---------------
+
+def run_load(url, bodies, concurrency=8, rate=None, duration=10.0, requests=None, warmup=0.0, timeout=60.0,
+             unique=False):
+    """
+    POST the bodies to url in turn from concurrency threads, each on its own
+    keep-alive connection.
+    Without a rate every thread sends its next request as soon as the last one
+    is answered. With a rate, request i is due at i / rate seconds and its
+    latency counts from then, so time spent waiting for a free thread (when
+    the server falls behind) is included rather than hidden.
+    Args:
+        url (str): Endpoint, e.g. 'http://127.0.0.1:8000/analyze?format=json'.
+        bodies (list): JSON request bodies, sent round-robin.
+        concurrency (int): Requests in flight at once at most.
+        rate (float): Requests per second in total; None for as fast as answered.
+        duration (float): Seconds to send requests for after the warmup.
+        requests (int): Stop after this many requests (after the warmup) instead, if given.
+        warmup (float): Seconds of requests sent first and left out of the records.
+        timeout (float): Seconds to wait for a response.
+        unique (bool): Change the closing cost of every request so that no two bodies
+            are the same (and the server's response cache never hits).
+    Returns:
+        dict: 'records' (start, latency in seconds, status code or None, error,
+        response bytes) of the measured requests, 'elapsed' (seconds they took).
+    """
+    parts = urllib.parse.urlsplit(url)
+    target = parts.path + (f'?{parts.query}' if parts.query else '')
+    encoded = [json.dumps(body).encode() for body in bodies]
+    counter = itertools.count()
+    records = []
+    lock = threading.Lock()
+    start = time.perf_counter() + 0.05
+    measure_from = start + warmup
+    end = None if requests is not None else measure_from + duration
+    # Requests numbered below this are warmup, when stopping after a number of requests
+    first_measured = [None]
+
+    def body(index):
+        if not unique:
+            return encoded[index % len(encoded)]
+        data = copy.deepcopy(bodies[index % len(bodies)])
+        purchase = data.setdefault('purchase_info', {})
+        purchase['closing_cost'] = float(purchase.get('closing_cost', 0) or 0) + index * 1e-4
+        return json.dumps(data).encode()
+
+    def worker():
+        connection = None
+        own = []
+        while True:
+            index = next(counter)
+            now = time.perf_counter()
+            due = start + index / rate if rate else max(now, start)
+            if end is not None and due >= end:
+                break
+            if requests is not None:
+                if due >= measure_from and first_measured[0] is None:
+                    with lock:
+                        if first_measured[0] is None:
+                            first_measured[0] = index
+                if first_measured[0] is not None and index >= first_measured[0] + requests:
+                    break
+            if due > now:
+                time.sleep(due - now)
+            if connection is None:
+                connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+            status = error = None
+            size = 0
+            sent = time.perf_counter()
+            try:
+                connection.request('POST', target, body(index), {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                size = len(response.read())
+                status = response.status
+                if status >= 400:
+                    error = f'HTTP {status}'
+                if response.will_close:
+                    connection.close()
+                    connection = None
+            except (OSError, http.client.HTTPException) as e:
+                error = type(e).__name__
+                connection.close()
+                connection = None
+            finished = time.perf_counter()
+            began = due if rate else sent
+            if began >= measure_from:
+                own.append((began - start, finished - began, status, error, size))
+        if connection is not None:
+            connection.close()
+        with lock:
+            records.extend(own)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    records.sort()
+    if not records:
+        return {'records': [], 'elapsed': 0.0}
+    first = min(record[0] for record in records)
+    last = max(record[0] + record[1] for record in records)
+    return {'records': records, 'elapsed': last - first}
+
+# --------------- Report ---------------
+
+def percentile(sorted_values, q):
+    """The q-th percentile (nearest rank) of ascending values."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+def summarize(run, settings=None):
+    """
+    Throughput, latency and error figures of a run_load result.
+    Args:
+        run (dict): run_load result.
+        settings (dict): Settings of the run, copied into the summary.
+    Returns:
+        dict: JSON-serializable summary.
+    """
+    records = run['records']
+    latencies = sorted(record[1] * 1000 for record in records)
+    statuses = {}
+    errors = {}
+    for _, _, status, error, _ in records:
+        key = str(status) if status is not None else 'none'
+        statuses[key] = statuses.get(key, 0) + 1
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+    error_count = sum(errors.values())
+    elapsed = run['elapsed']
+    counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    for latency in latencies:
+        counts[next((i for i, bound in enumerate(HISTOGRAM_BUCKETS_MS) if latency <= bound),
+                    len(HISTOGRAM_BUCKETS_MS))] += 1
+    return {
+        'settings': settings or {},
+        'requests': len(records),
+        'errors': error_count,
+        'error_rate': error_count / len(records) if records else 0.0,
+        'elapsed_s': elapsed,
+        'throughput_rps': len(records) / elapsed if elapsed else 0.0,
+        'bytes_received': sum(record[4] for record in records),
+        'latency_ms': {
+            'min': latencies[0] if latencies else None,
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            **{f'p{q}': percentile(latencies, q) for q in PERCENTILES},
+            'max': latencies[-1] if latencies else None
+        },
+        'status': statuses,
+        'error_kinds': errors,
+        'histogram': [{'le_ms': bound, 'count': count}
+                      for bound, count in zip(HISTOGRAM_BUCKETS_MS + ('inf',), counts)]
+    }
+
+def format_summary(summary):
+    """The summary as a text report."""
+    latency = summary['latency_ms']
+    lines = [
+        f"Target        {summary['settings'].get('url', '')}",
+        f"Requests      {summary['requests']:,} ({summary['errors']:,} errors, {summary['error_rate']:.2%})",
+        f"Elapsed       {summary['elapsed_s']:.2f} s",
+        f"Throughput    {summary['throughput_rps']:,.1f} requests/s",
+        f"Received      {summary['bytes_received'] / 1e6:,.1f} MB",
+        'Status        ' + ', '.join(f'{status}: {count:,}' for status, count in sorted(summary['status'].items()))
+    ]
+    if summary['error_kinds']:
+        lines.append('Errors        ' + ', '.join(f'{kind}: {count:,}'
+                                                 for kind, count in sorted(summary['error_kinds'].items())))
+    if summary['requests']:
+        lines.append('Latency (ms)  ' + '  '.join(f'{name} {value:,.1f}' for name, value in latency.items()))
+        lines.append('Histogram')
+        most = max(bucket['count'] for bucket in summary['histogram'])
+        for bucket in summary['histogram']:
+            if bucket['count']:
+                bound = f"<= {bucket['le_ms']:>5} ms" if bucket['le_ms'] != 'inf' else f"> {HISTOGRAM_BUCKETS_MS[-1]} ms"
+                lines.append(f"  {bound:>12}  {'#' * max(1, round(40 * bucket['count'] / most)):<40} "
+                             f"{bucket['count']:,}")
+    return '\n'.join(lines)
+
+def check_limits(summary, max_p95=None, max_p99=None, max_error_rate=None, min_throughput=None):
+    """Descriptions of the limits the summary exceeds (none when it passes)."""
+    latency = summary['latency_ms']
+    failures = []
+    if not summary['requests']:
+        return ['no requests completed']
+    if max_p95 is not None and latency['p95'] > max_p95:
+        failures.append(f"p95 latency {latency['p95']:,.1f} ms > {max_p95:g} ms")
+    if max_p99 is not None and latency['p99'] > max_p99:
+        failures.append(f"p99 latency {latency['p99']:,.1f} ms > {max_p99:g} ms")
+    if max_error_rate is not None and summary['error_rate'] > max_error_rate:
+        failures.append(f"error rate {summary['error_rate']:.2%} > {max_error_rate:.2%}")
+    if min_throughput is not None and summary['throughput_rps'] < min_throughput:
+        failures.append(f"throughput {summary['throughput_rps']:,.1f}/s < {min_throughput:g}/s")
+    return failures
+
+# --------------- Server ---------------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_server(kind, port=None, log=None):
+    """
+    Start the API on 127.0.0.1 from this directory and wait until /health answers.
+    Args:
+        kind (str): 'flask' (the development server of app.py) or 'gunicorn'
+            (gunicorn.conf.py, configured by the usual environment variables).
+        port (int): Port to listen on; a free one when None.
+        log (file): Where the server output goes; discarded when None.
+    Returns:
+        tuple: (subprocess.Popen, base URL).
+    """
+    port = port or _free_port()
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, BIND=f'127.0.0.1:{port}')
+    if kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']
+    else:
+        command = [sys.executable, '-c', f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    output = log or subprocess.DEVNULL
+    process = subprocess.Popen(command, cwd=here, env=env, stdout=output, stderr=output)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'The {kind} server exited with status {process.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return process, url
+            connection.close()
+        except OSError:
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'The {kind} server did not answer /health within {SERVER_START_TIMEOUT} seconds')
+
+def stop_server(process):
+    """Stop a server started by start_server, gracefully if it allows."""
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+# --------------- Command line ---------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the API with a corpus of /analyze payloads.')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default='http://127.0.0.1:8000', help='base URL of a running server')
+    target.add_argument('--start', choices=('flask', 'gunicorn'),
+                        help='start the server from this directory for the run and stop it after')
+    parser.add_argument('--path', default='/analyze', help='endpoint to POST to, with any query (default: /analyze)')
+    parser.add_argument('--corpus', metavar='FILE', help='JSON Lines file of request bodies (default: generated)')
+    parser.add_argument('--corpus-size', type=int, default=200, help='payloads generated (default: 200)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated corpus (default: 0)')
+    parser.add_argument('--unique', action='store_true',
+                        help='make every request body distinct so the response cache never hits')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='requests in flight (default: 8)')
+    parser.add_argument('--rate', type=float, help='requests per second (default: as fast as answered)')
+    parser.add_argument('-d', '--duration', type=float, default=10.0, help='seconds to measure (default: 10)')
+    parser.add_argument('-n', '--requests', type=int, help='measure this many requests instead of a duration')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds sent before measuring (default: 2)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for a response (default: 60)')
+    parser.add_argument('--output', metavar='FILE', help="write the summary as JSON to FILE ('-' for stdout)")
+    parser.add_argument('--server-log', metavar='FILE', help='with --start, write the server output to FILE')
+    parser.add_argument('--max-p95', type=float, metavar='MS', help='fail when the p95 latency is above MS')
+    parser.add_argument('--max-p99', type=float, metavar='MS', help='fail when the p99 latency is above MS')
+    parser.add_argument('--max-error-rate', type=float, metavar='FRACTION',
+                        help='fail when more than FRACTION of the requests fail')
+    parser.add_argument('--min-throughput', type=float, metavar='RPS',
+                        help='fail when fewer than RPS requests per second complete')
+    args = parser.parse_args(argv)
+    if args.concurrency < 1 or (args.rate is not None and args.rate <= 0):
+        parser.error('--concurrency and --rate must be positive')
+
+    bodies = load_corpus(args.corpus) if args.corpus else generate_corpus(args.corpus_size, args.seed)
+    if not bodies:
+        parser.error('the corpus is empty')
+    process = None
+    log = None
+    base_url = args.url
+    if args.start:
+        log = open(args.server_log, 'w') if args.server_log else None
+        process, base_url = start_server(args.start, log=log)
+    url = base_url.rstrip('/') + args.path
+    try:
+        run = run_load(url, bodies, args.concurrency, args.rate, args.duration, args.requests, args.warmup,
+                       args.timeout, args.unique)
+    finally:
+        if process is not None:
+            stop_server(process)
+        if log is not None:
+            log.close()
+
+    settings = {
+        'url': url,
+        'server': args.start or 'external',
+        'corpus': args.corpus or f'generated ({len(bodies)}, seed {args.seed})',
+        'unique': args.unique,
+        'concurrency': args.concurrency,
+        'rate': args.rate,
+        'duration': args.duration if args.requests is None else None,
+        'requests': args.requests,
+        'warmup': args.warmup,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    }
+    summary = summarize(run, settings)
+    out = sys.stderr if args.output == '-' else sys.stdout
+    print(format_summary(summary), file=out)
+    if args.output == '-':
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+            f.write('\n')
+
+    failures = check_limits(summary, args.max_p95, args.max_p99, args.max_error_rate, args.min_throughput)
+    for failure in failures:
+        print(f'Limit exceeded: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
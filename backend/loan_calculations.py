@@ -1,6 +1,380 @@
+import math
+import numpy as np
 import numpy_financial as npf
+from result_cache import ResultCache
+
+# Most normalized amortization tables kept; each holds one loan's schedule
+# per 1 of principal (a 40-year table is about 20 KB)
+AMORTIZATION_CACHE_SIZE = 256
+
+# Process-wide tables keyed by (rate, nper, when, periods per year), shared by every request
+_amortization_tables = ResultCache(max_size=AMORTIZATION_CACHE_SIZE)
 
 # --------------- Creating Functions for Loan Calculation ---------------
+def amortization_schedule(rate, nper, pv, num_periods=None, when=0):
+    """
+    Build the full monthly amortization schedule of a loan in one pass.
+    Uses the closed-form balance of a level-payment loan, so every period is
+    computed at once instead of replaying the loan month by month. Follows the
+    same conventions as calculate_cumipmt / calculate_cumprinc: pv is passed
+    Excel-style (negative for money received), the payment is the npf.pmt
+    end-of-period payment, when=1 makes the first period interest free, and the
+    balance is floored at zero once the loan is paid off.
+    Args:
+        rate (float or array): Annual interest rate.
+        nper (int or array): Total number of payment periods.
+        pv (float or array): Present value (loan amount).
+        num_periods (int): Number of periods to build. Defaults to max(nper);
+            periods after payoff carry zero interest, principal and balance.
+        when (int): When payments are due (0 = end of period, 1 = beginning).
+    Returns:
+        dict: 'payment' (per-loan payment), and 'interest', 'principal' and
+        'balance' arrays of shape (..., num_periods) where index 0 is period 1.
+    """
+    if _cached_term(rate, nper):
+        # One rate and term: the cached schedule of a loan of 1, scaled by the amount
+        table = amortization_table(rate, nper, when)
+        if num_periods is None:
+            num_periods = int(nper)
+        amount = -np.asarray(pv, dtype=float)
+        length = min(num_periods, int(nper))
+        padding = np.zeros(num_periods - length)
+        schedule = {'payment': table['payment'] * amount}
+        for name in ('interest', 'principal', 'balance'):
+            schedule[name] = np.concatenate([table[name][:length], padding]) * amount[..., None]
+        return schedule
+    return _amortization_arrays(rate, nper, pv, num_periods, when)
+
+def _amortization_arrays(rate, nper, pv, num_periods=None, when=0):
+    """amortization_schedule computed directly from the closed-form balance."""
+    monthly_rate = np.asarray(rate, dtype=float) / 12
+    nper = np.asarray(nper)
+    pv = np.asarray(pv, dtype=float)
+    if num_periods is None:
+        num_periods = int(np.max(nper))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = np.asarray(npf.pmt(monthly_rate, nper, pv), dtype=float)
+
+    r = monthly_rate[..., None]
+    pmt = payment[..., None]
+    opening = -pv[..., None]
+    periods = np.arange(1, num_periods + 1)
+
+    # With when=1 the first payment is all principal, and the level-payment
+    # recurrence starts from the balance left after it
+    offset = 1 if when == 1 else 0
+    start_balance = opening - pmt * offset
+    elapsed = np.maximum(periods - offset, 0)
+    growth = (1 + r) ** elapsed
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity = np.where(r == 0, elapsed, (growth - 1) / r)
+    balance = start_balance * growth - pmt * annuity
+
+    prev_balance = np.concatenate([np.broadcast_to(opening, balance.shape[:-1] + (1,)), balance[..., :-1]], axis=-1)
+    interest = prev_balance * r
+    if when == 1:
+        interest[..., 0] = 0
+    principal = pmt - interest
+
+    # Once the balance goes negative the loan is paid off: the final period only
+    # repays what was left, and nothing accrues afterwards
+    paid_off = np.maximum.accumulate(balance < 0, axis=-1)
+    payoff_period = paid_off & ~np.concatenate(
+        [np.zeros(paid_off.shape[:-1] + (1,), dtype=bool), paid_off[..., :-1]], axis=-1)
+    principal = np.where(payoff_period, prev_balance, principal)
+    after_payoff = paid_off & ~payoff_period
+    interest = np.where(after_payoff, 0.0, interest)
+    principal = np.where(after_payoff, 0.0, principal)
+    balance = np.where(paid_off, 0.0, balance)
+
+    return {
+        'payment': payment,
+        'interest': interest,
+        'principal': principal,
+        'balance': balance
+    }
+
+def yearly_amortization(schedule, periods_per_year=12):
+    """
+    Roll a monthly amortization schedule up into yearly totals.
+    Args:
+        schedule (dict): Output of amortization_schedule or loan_schedule. Its
+            length must be a whole number of years.
+        periods_per_year (int): Payment periods in a year.
+    Returns:
+        dict: Arrays of shape (..., years) with the 'interest', 'principal' and
+        'payments' paid during each year, 'cum_principal' paid through the end of each year and
+        the 'balance' left at the end of each year.
+    """
+    interest = schedule['interest']
+    principal = schedule['principal']
+    years_shape = interest.shape[:-1] + (interest.shape[-1] // periods_per_year, periods_per_year)
+    yearly_interest = interest.reshape(years_shape).sum(axis=-1)
+    yearly_principal = principal.reshape(years_shape).sum(axis=-1)
+    return {
+        'interest': yearly_interest,
+        'principal': yearly_principal,
+        'payments': yearly_interest + yearly_principal,
+        'cum_principal': np.cumsum(yearly_principal, axis=-1),
+        'balance': schedule['balance'][..., periods_per_year - 1::periods_per_year]
+    }
+
+def loan_years(rate, nper, pv, years, periods_per_year=12):
+    """
+    Yearly totals of a level-payment loan for any years, each from the
+    closed-form balance rather than by building the schedule up to it, so
+    year 40 costs the same as year 1. Matches yearly_amortization of
+    amortization_schedule (payments due at the end of each period); nothing is
+    paid after the last of the nper payments.
+    Args:
+        rate (float or array): Annual interest rate.
+        nper (int or array): Total number of payment periods.
+        pv (float or array): Present value (loan amount), negative as in npf.pmt.
+        years (array): Year numbers (1 = first year), in any order.
+        periods_per_year (int): Payment periods in a year.
+    Returns:
+        dict: Arrays of shape (..., len(years)) with the 'interest', 'principal'
+        and 'payments' paid during each year and the 'balance' left at its end.
+    """
+    years = np.asarray(years)
+    if _cached_term(rate, nper):
+        # One rate and term: look the years up in the cached table of a loan of 1
+        yearly = amortization_table(rate, nper, 0, periods_per_year)['yearly']
+        last_year = yearly['balance'].size
+        index = np.minimum(years, last_year) - 1
+        within_term = years <= last_year
+        amount = -np.asarray(pv, dtype=float)[..., None]
+        return {name: np.where(within_term, values[index], 0.0) * amount for name, values in yearly.items()}
+    return _loan_year_arrays(rate, nper, pv, years, periods_per_year)
+
+def _loan_year_arrays(rate, nper, pv, years, periods_per_year=12):
+    """loan_years computed directly from the closed-form balance."""
+    monthly_rate = np.asarray(rate, dtype=float)[..., None] / periods_per_year
+    nper = np.asarray(nper, dtype=float)[..., None]
+    pv = np.asarray(pv, dtype=float)[..., None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = np.asarray(npf.pmt(monthly_rate, nper, pv), dtype=float)
+
+        def balance(periods):
+            """Balance after the given number of payments; zero once the loan is paid off."""
+            growth = (1 + monthly_rate) ** periods
+            annuity = np.where(monthly_rate == 0, periods, (growth - 1) / monthly_rate)
+            return np.where(periods >= nper, 0.0, np.maximum(-pv * growth - payment * annuity, 0.0))
+
+        end = np.asarray(years) * periods_per_year
+        start = end - periods_per_year
+        opening, closing = balance(start), balance(end)
+    payments = payment * np.clip(np.minimum(end, nper) - start, 0, None)
+    principal = opening - closing
+    return {
+        'interest': payments - principal,
+        'principal': principal,
+        'payments': payments,
+        'balance': closing
+    }
+
+# --------------- Amortization Table Cache ---------------
+def amortization_table(rate, nper, when=0, periods_per_year=12):
+    """
+    Amortization table of a loan of 1, memoized process-wide.
+    A level-payment schedule scales linearly with the loan amount, so one
+    table per (rate, nper, when) serves every principal: amortization_schedule
+    and loan_years multiply it by the amount instead of rebuilding the
+    schedule. Most traffic uses a handful of terms and rates, so the bounded
+    cache is nearly always hit. The arrays are read-only.
+    Args:
+        rate (float): Annual interest rate.
+        nper (int): Total number of payment periods.
+        when (int): When payments are due (0 = end of period, 1 = beginning).
+        periods_per_year (int): Payment periods in a year.
+    Returns:
+        dict: 'payment' per 1 borrowed, 'interest', 'principal' and 'balance'
+        arrays of length nper, and 'yearly' with the 'interest', 'principal',
+        'payments' and 'balance' of each year of the term (end-of-period
+        payments only; see loan_years).
+    """
+    if nper != int(nper):
+        raise ValueError('nper must be a whole number of periods')
+    key = (float(rate), int(nper), int(when), int(periods_per_year))
+    table = _amortization_tables.get(key)
+    if table is None:
+        rate, nper = key[0], key[1]
+        schedule = _amortization_arrays(rate, nper, -1.0, nper, when)
+        years = np.arange(1, math.ceil(nper / periods_per_year) + 1)
+        yearly = _loan_year_arrays(rate, nper, -1.0, years, periods_per_year)
+        for values in (schedule, yearly):
+            for value in values.values():
+                value.flags.writeable = False
+        table = dict(schedule, payment=float(schedule['payment']), yearly=yearly)
+        _amortization_tables.put(key, table)
+    return table
+
+def _cached_term(rate, nper):
+    """
+    Whether a loan can use amortization_table: one rate and a whole number of
+    periods. A fractional term is computed directly, as npf.pmt does, rather
+    than rounded to a cached one.
+    """
+    return np.ndim(rate) == 0 and np.ndim(nper) == 0 and float(nper).is_integer()
+
+def amortization_cache_stats():
+    """Size and hit / miss / eviction counters of the amortization table cache."""
+    return _amortization_tables.stats()
+
+# --------------- Loan Schedule Library ---------------
+def arm_resets(rate, fixed_periods, reset_periods, rate_step, rate_cap, num_periods):
+    """
+    Rate-reset path of an adjustable-rate loan whose rate moves by a fixed
+    step at every reset, e.g. a 5/1 ARM (fixed_periods=60, reset_periods=12).
+    Args:
+        rate (float or array): Initial annual interest rate.
+        fixed_periods (int or array): Periods at the initial rate; 0 for a fixed-rate loan.
+        reset_periods (int or array): Periods between resets after that.
+        rate_step (float or array): Change in the annual rate at each reset.
+        rate_cap (float or array): Highest annual rate; 0 for no cap. Rates never go below zero.
+        num_periods (int): Number of periods the path has to cover.
+    Returns:
+        tuple: (reset_periods, reset_rates) arrays of shape (..., resets) as
+        taken by loan_schedule; resets a loan does not have are at num_periods.
+    """
+    rate = np.asarray(rate, dtype=float)[..., None]
+    fixed = np.asarray(fixed_periods, dtype=int)[..., None]
+    every = np.maximum(np.asarray(reset_periods, dtype=int), 1)[..., None]
+    adjustable = fixed > 0
+    count = np.where(adjustable, -(-(num_periods - fixed) // every), 0)
+    resets = np.arange(1, max(int(np.max(count)), 0) + 1)
+    periods = fixed + (resets - 1) * every
+    periods = np.where(adjustable & (periods < num_periods), periods, num_periods)
+    rates = rate + np.asarray(rate_step, dtype=float)[..., None] * resets
+    cap = np.asarray(rate_cap, dtype=float)[..., None]
+    rates = np.maximum(np.where(cap > 0, np.minimum(rates, cap), rates), 0.0)
+    return periods, rates
+
+def loan_schedule(principal, rate, term_periods, num_periods=None, interest_only_periods=0,
+                  reset_periods=None, reset_rates=None, balloon_period=0, extra_principal=0.0,
+                  periods_per_year=12):
+    """
+    Full payment schedule of a loan with an interest-only period, rate resets
+    (ARM), a balloon and extra principal payments, built once per loan.
+    The loan is split into segments at the end of the interest-only period
+    and at every reset. Within a segment the rate and the scheduled payment
+    are fixed, so its balance is closed-form; only the balance at each
+    segment start is carried from one segment to the next, a handful of
+    steps for every loan at once, and every period is then filled in
+    together. At the end of the interest-only period and at every reset the
+    payment is recalculated to repay the balance over the rest of the term.
+    Extra principal is paid on top of the scheduled payment and shortens the
+    loan. Whatever is owed at the balloon period, or at the end of the term
+    (e.g. after a loan that is interest-only throughout), is repaid then.
+    With none of the options this matches amortization_schedule.
+    Args:
+        principal (float or array): Loan amount (positive).
+        rate (float or array): Initial annual interest rate.
+        term_periods (int or array): Periods over which the loan amortizes.
+        num_periods (int): Number of periods to build; defaults to max(term_periods).
+        interest_only_periods (int or array): Initial periods that pay interest only.
+        reset_periods (array): Period after which each new rate applies, ascending,
+            shape (..., resets); see arm_resets. Entries >= num_periods are ignored.
+        reset_rates (array): Annual rate applied after each reset, shape (..., resets).
+        balloon_period (int or array): Period in which the balance is due; 0 for none.
+        extra_principal (float or array): Extra principal paid every period.
+        periods_per_year (int): Payment periods in a year.
+    Returns:
+        dict: 'interest', 'principal', 'payment' (interest + principal) and
+        'balance' arrays of shape (..., num_periods) where index 0 is period 1.
+    """
+    principal = np.asarray(principal, dtype=float)
+    rate = np.asarray(rate, dtype=float)
+    term = np.asarray(term_periods, dtype=int)
+    if num_periods is None:
+        num_periods = int(np.max(term))
+    if reset_periods is None:
+        reset_periods = np.full(0, num_periods)
+        reset_rates = np.zeros(0)
+    reset_periods = np.asarray(reset_periods, dtype=int)
+    reset_rates = np.asarray(reset_rates, dtype=float)
+    shape = np.broadcast_shapes(principal.shape, rate.shape, term.shape, np.shape(interest_only_periods),
+                                np.shape(balloon_period), np.shape(extra_principal),
+                                reset_periods.shape[:-1], reset_rates.shape[:-1])
+    resets = reset_periods.shape[-1]
+    reset_periods = np.broadcast_to(reset_periods, shape + (resets,))
+    reset_rates = np.broadcast_to(reset_rates, shape + (resets,))
+    io_periods = np.broadcast_to(np.clip(np.asarray(interest_only_periods, dtype=int), 0, num_periods), shape)
+    extra = np.broadcast_to(np.asarray(extra_principal, dtype=float), shape)
+
+    # Segments: (start, end] period ranges split at the interest-only end and
+    # the resets, sorted per loan; a loan with fewer splits gets empty segments
+    bounds = np.sort(np.concatenate([np.zeros(shape + (1,), dtype=int), io_periods[..., None],
+                                     np.minimum(reset_periods, num_periods),
+                                     np.full(shape + (1,), num_periods)], axis=-1), axis=-1)
+    starts, ends = bounds[..., :-1], bounds[..., 1:]
+    resets_before = np.sum(reset_periods[..., None, :] <= starts[..., None], axis=-1)
+    rates = np.concatenate([np.broadcast_to(rate, shape)[..., None], reset_rates], axis=-1)
+    segment_rate = np.take_along_axis(rates, resets_before, axis=-1) / periods_per_year
+    segment_io = starts < io_periods[..., None]
+
+    periods = np.arange(1, num_periods + 1)
+    segment = np.zeros(shape + (num_periods,), dtype=int)
+    segment_balance = np.empty(starts.shape)
+    segment_payment = np.empty(starts.shape)
+    balance = np.broadcast_to(principal, shape)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for i in range(starts.shape[-1]):
+            r = segment_rate[..., i]
+            io = segment_io[..., i]
+            length = ends[..., i] - starts[..., i]
+            payment = np.where(io, balance * r,
+                               np.asarray(npf.pmt(r, term - starts[..., i], -balance), dtype=float))
+            segment_balance[..., i] = balance
+            segment_payment[..., i] = payment
+            growth = (1 + r) ** length
+            annuity = np.where(r == 0, length, (growth - 1) / r)
+            balance = np.where(io, balance - extra * length, balance * growth - (payment + extra) * annuity)
+            balance = np.maximum(np.nan_to_num(balance), 0.0)
+            segment += periods > ends[..., i, None]
+        segment = np.minimum(segment, starts.shape[-1] - 1)
+
+        def per_period(values):
+            """Value of a per-segment array for the segment each period falls in."""
+            return np.take_along_axis(values, segment, axis=-1)
+
+        r = per_period(segment_rate)
+        io = per_period(segment_io)
+        start_balance = per_period(segment_balance)
+        payment = per_period(segment_payment)
+        elapsed = periods - per_period(starts)
+        growth = (1 + r) ** elapsed
+        annuity = np.where(r == 0, elapsed, (growth - 1) / r)
+        balance = np.where(io, start_balance - extra[..., None] * elapsed,
+                           start_balance * growth - (payment + extra[..., None]) * annuity)
+
+    prev_balance = np.concatenate([np.broadcast_to(principal, shape)[..., None], balance[..., :-1]], axis=-1)
+    prev_balance = np.maximum(prev_balance, 0.0)
+    interest = prev_balance * r
+    principal_paid = prev_balance - balance
+
+    # Once the balance goes negative the loan is paid off: the final period only
+    # repays what was left. The balance still owed in the due period (balloon
+    # or last period of the term) is repaid in it; nothing accrues afterwards.
+    paid_off = np.maximum.accumulate(balance < 0, axis=-1)
+    payoff_period = paid_off & ~np.concatenate(
+        [np.zeros(shape + (1,), dtype=bool), paid_off[..., :-1]], axis=-1)
+    principal_paid = np.where(payoff_period, prev_balance, principal_paid)
+    balloon = np.asarray(balloon_period, dtype=int)
+    due = np.where((balloon > 0) & (balloon < term), balloon, term)[..., None]
+    balance = np.where(paid_off, 0.0, balance)
+    principal_paid = np.where(periods == due, principal_paid + balance, principal_paid)
+    balance = np.where(periods >= due, 0.0, balance)
+    after = (paid_off & ~payoff_period) | (periods > due)
+    interest = np.where(after, 0.0, interest)
+    principal_paid = np.where(after, 0.0, principal_paid)
+    return {
+        'interest': interest,
+        'principal': principal_paid,
+        'payment': interest + principal_paid,
+        'balance': balance
+    }
+
 def calculate_cumipmt(rate, nper, pv, start_period, end_period, when=0):
     """
     Calculate cumulative interest paid between start_period and end_period.
@@ -15,22 +389,8 @@ def calculate_cumipmt(rate, nper, pv, start_period, end_period, when=0):
     Returns:
         float: Total interest paid over the specified periods.
     """
-    monthly_rate = rate / 12
-    payment = npf.pmt(monthly_rate, nper, pv)
-    balance = -pv
-    total_interest = 0
-    for period in range(1, end_period + 1):
-        if when == 1 and period == 1:
-            interest = 0
-        else:
-            interest = balance * monthly_rate
-        principal = payment - interest
-        if period >= start_period:
-            total_interest += interest
-        balance -= principal
-        if balance < 0:
-            balance = 0
-    return total_interest
+    schedule = amortization_schedule(rate, nper, pv, end_period, when)
+    return float(schedule['interest'][start_period - 1:end_period].sum())
 
 def calculate_cumprinc(rate, nper, pv, start_period, end_period, when=0):
     """
@@ -45,20 +405,5 @@ def calculate_cumprinc(rate, nper, pv, start_period, end_period, when=0):
     Returns:
         float: Total principal paid over the specified periods.
     """
-    monthly_rate = rate / 12
-    payment = npf.pmt(monthly_rate, nper, pv)
-    total_principal = 0
-    balance = -pv
-    for period in range(1, end_period + 1):
-        if when == 1 and period == 1:
-            interest = 0
-        else:
-            interest = balance * monthly_rate
-        principal = payment - interest
-        if period >= start_period:
-            total_principal += principal
-        balance -= principal
-        if balance < 0:
-            total_principal += balance
-            balance = 0
-    return total_principal
+    schedule = amortization_schedule(rate, nper, pv, end_period, when)
+    return float(schedule['principal'][start_period - 1:end_period].sum())
@@ -0,0 +1,245 @@
+import numpy as np
+from loan_calculations import amortization_schedule, loan_schedule
+from irr_calculations import cash_flow_irr, xirr
+from projection_calculations import PROJECTION_INPUTS, loan_options
+
+# Longest monthly projection (40 years)
+MAX_MONTHS = 480
+
+# Every metric in monthly_data, in report order
+MONTHLY_METRICS = (
+    'gross_rent', 'vacancy_loss', 'effective_gross_income', 'property_taxes', 'insurance',
+    'owner_paid_utilities', 'property_management', 'maintenance', 'total_operating_expenses',
+    'noi', 'interest_paid', 'principal_paid', 'loan_payments', 'mortgage_balance', 'property_value',
+    'equity', 'selling_cost', 'sale_proceeds', 'cash_flow_before_tax', 'depreciation', 'cum_dep',
+    'taxable_income', 'income_tax_due', 'cash_flow_after_tax', 'capital_gain', 'tax_on_capital_gain',
+    'recapture_tax', 'sale_proceeds_after_tax', 'cum_cash_flow'
+)
+
+# Monthly metrics that are amounts at the end of a month (the rest are flows
+# during the month); a year's value of these is the one at its last month
+BALANCE_METRICS = (
+    'mortgage_balance', 'property_value', 'equity', 'selling_cost', 'sale_proceeds', 'cum_dep',
+    'capital_gain', 'tax_on_capital_gain', 'recapture_tax', 'sale_proceeds_after_tax', 'cum_cash_flow'
+)
+
+def month_end_dates(start_date, num_months):
+    """
+    Date of the end of each month of a projection starting on start_date:
+    the same day of the month num_months later, or the month's last day.
+    Args:
+        start_date (str or datetime64): Purchase date, e.g. '2025-01-01'.
+        num_months (int): Number of months.
+    Returns:
+        ndarray: datetime64[D] dates for month 0 (the start) to num_months.
+    """
+    start = np.datetime64(start_date, 'D')
+    first_month = start.astype('datetime64[M]')
+    months = first_month + np.arange(num_months + 1)
+    day = start - first_month.astype('datetime64[D]')
+    last_day = (months + 1).astype('datetime64[D]') - 1
+    return np.minimum(months.astype('datetime64[D]') + day, last_day)
+
+def project_monthly(inputs, num_months=360, sale_month=None, start_date=None):
+    """
+    Project a property investment month by month, for every month at once.
+    Rent and expenses grow once a year, as in the yearly projection, the
+    loan follows its monthly amortization schedule and the property value
+    compounds monthly, so summing flows over each year (see yearly_rollup)
+    reproduces project_investment's yearly_data. Income tax is worked out on
+    the year-to-date taxable income, so a year's months add up to the yearly
+    tax and a sale in the middle of a year is taxed on the months held.
+    Inputs may be arrays, in which case every scenario is projected together.
+    Args:
+        inputs (dict): Values for every name in PROJECTION_INPUTS.
+        num_months (int): Number of months to project, at most MAX_MONTHS.
+        sale_month (int): Month at the end of which the property is sold;
+            defaults to the last month.
+        start_date (str): Purchase date; when given the sale also gets an XIRR
+            over the actual dates of the monthly cash flows.
+    Returns:
+        dict: 'months', 'monthly_data' with one array of shape (..., num_months)
+        per metric in MONTHLY_METRICS, and 'sale' with the outcome of selling
+        at sale_month: proceeds, profit, the monthly IRR and its annual
+        equivalent, and the XIRR.
+    """
+    num_months = int(num_months)
+    if not 1 <= num_months <= MAX_MONTHS:
+        raise ValueError(f'The number of months must be between 1 and {MAX_MONTHS}')
+    sale_month = num_months if sale_month is None else int(sale_month)
+    if not 1 <= sale_month <= num_months:
+        raise ValueError(f'sale_month must be between 1 and {num_months}')
+
+    values = {name: np.asarray(inputs[name], dtype=float) for name in PROJECTION_INPUTS}
+    col = {name: value[..., None] for name, value in values.items()}
+    months = np.arange(1, num_months + 1)
+    # Whole years elapsed before each month, and the projection year it falls in
+    elapsed_years = (months - 1) // 12
+    years = elapsed_years + 1
+
+    def growth(name):
+        """Growth factor of a yearly rate input for each month (stepping once a year)."""
+        return (1 + col[name]) ** elapsed_years
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Derived Values (Formulae)
+        down_payment = values['purchase_price'] * values['percent_down']
+        loan_amount = values['purchase_price'] - down_payment
+        total_cash_invested = down_payment + values['initial_improvements'] + values['closing_cost']
+        owner_paid_utilities_monthly = (values['water_mo'] + values['sewer_mo'] + values['garbage_mo'] +
+                                        values['gas_electric_mo'] + values['lawn_mo'] + values['hoa'] +
+                                        values['other_expenses'])
+
+        # Rental income (Formulae)
+        gross_rent = col['rent_monthly'] * growth('rent_rate_inc')
+        vacancy_loss = gross_rent * col['vacancy_rate']
+        effective_gross_income = gross_rent - vacancy_loss
+
+        # Operating expenses (Formulae)
+        property_taxes = col['property_tax_yr'] / 12 * growth('property_tax_rate_inc')
+        insurance = col['insurance_mo'] * growth('insurance_rate_inc')
+        owner_paid_utilities = owner_paid_utilities_monthly[..., None] * growth('utility_rate_inc')
+        property_management = gross_rent * col['management_rate']
+        maintenance = gross_rent * col['maintenance_rate']
+        total_operating_expenses = property_taxes + insurance + owner_paid_utilities + property_management + maintenance
+        noi = effective_gross_income - total_operating_expenses
+
+        # Loan (Formulae): zeroed for cash purchases and 0% loans, as in the yearly projection
+        has_loan = ((values['percent_down'] < 1) & (values['interest_rate'] > 0))[..., None]
+        options = loan_options(values, num_months)
+        if options is None:
+            loan = amortization_schedule(values['interest_rate'], values['loan_term_years'] * 12, -loan_amount,
+                                         num_months, 0)
+        else:
+            loan = loan_schedule(loan_amount, values['interest_rate'], values['loan_term_years'] * 12, num_months,
+                                 **options)
+        interest_paid = np.where(has_loan, loan['interest'], 0.0)
+        principal_paid = np.where(has_loan, loan['principal'], 0.0)
+        loan_payments = interest_paid + principal_paid
+        mortgage_balance = np.where(has_loan, loan['balance'], 0.0)
+
+        # Property value and sale (Formulae)
+        property_value = col['purchase_price'] * (1 + col['appreciation']) ** (months / 12)
+        equity = property_value - mortgage_balance
+        selling_cost = property_value * col['selling_cost_percentage']
+        sale_proceeds = property_value - mortgage_balance - selling_cost
+
+        # Cash flow and tax (Formulae)
+        cash_flow_before_tax = noi - loan_payments
+        cum_cash_flow = np.cumsum(cash_flow_before_tax, axis=-1)
+        depreciable_basis = (col['improved_value_ratio'] * col['purchase_price'] +
+                             col['initial_improvements'] + col['closing_cost'])
+        depreciation = np.where(years <= col['depreciation_years'], depreciable_basis / col['depreciation_years'] / 12, 0.0)
+        cum_dep = np.cumsum(depreciation, axis=-1)
+        taxable_income = effective_gross_income - total_operating_expenses - interest_paid - depreciation
+        income_tax_due = _year_to_date_tax(taxable_income, col['income_tax_rate'])
+        cash_flow_after_tax = cash_flow_before_tax - income_tax_due
+
+        # Capital gains and cost basis (Formulae)
+        adjusted_cost_basis = (col['purchase_price'] + col['closing_cost'] + col['initial_improvements'] -
+                               cum_dep + selling_cost)
+        capital_gain = property_value - adjusted_cost_basis
+        pay_cap_gains = col['pay_cap_gains'] != 0
+        tax_on_capital_gain = np.where(pay_cap_gains & (capital_gain > 0), capital_gain * col['cap_gains_tax_rate'], 0.0)
+        recapture_tax = np.where(pay_cap_gains, cum_dep * col['recapture_tax_rate'], 0.0)
+        sale_proceeds_after_tax = sale_proceeds - tax_on_capital_gain - recapture_tax
+
+    monthly_data = {
+        'gross_rent': gross_rent,
+        'vacancy_loss': vacancy_loss,
+        'effective_gross_income': effective_gross_income,
+        'property_taxes': property_taxes,
+        'insurance': insurance,
+        'owner_paid_utilities': owner_paid_utilities,
+        'property_management': property_management,
+        'maintenance': maintenance,
+        'total_operating_expenses': total_operating_expenses,
+        'noi': noi,
+        'interest_paid': interest_paid,
+        'principal_paid': principal_paid,
+        'loan_payments': loan_payments,
+        'mortgage_balance': mortgage_balance,
+        'property_value': property_value,
+        'equity': equity,
+        'selling_cost': selling_cost,
+        'sale_proceeds': sale_proceeds,
+        'cash_flow_before_tax': cash_flow_before_tax,
+        'depreciation': depreciation,
+        'cum_dep': cum_dep,
+        'taxable_income': taxable_income,
+        'income_tax_due': income_tax_due,
+        'cash_flow_after_tax': cash_flow_after_tax,
+        'capital_gain': capital_gain,
+        'tax_on_capital_gain': tax_on_capital_gain,
+        'recapture_tax': recapture_tax,
+        'sale_proceeds_after_tax': sale_proceeds_after_tax,
+        'cum_cash_flow': cum_cash_flow
+    }
+
+    # Sale at the end of sale_month (Formulae)
+    end = sale_month - 1
+    tci = total_cash_invested[..., None]
+    flow_shape = np.broadcast_shapes(np.shape(tci), cash_flow_before_tax[..., :sale_month].shape)
+    before_tax = np.concatenate([np.broadcast_to(-tci, flow_shape[:-1] + (1,)),
+                                 np.broadcast_to(cash_flow_before_tax[..., :sale_month], flow_shape)], axis=-1)
+    before_tax[..., -1] += np.broadcast_to(sale_proceeds[..., end], flow_shape[:-1])
+    after_tax = np.concatenate([np.broadcast_to(-tci, flow_shape[:-1] + (1,)),
+                                np.broadcast_to(cash_flow_after_tax[..., :sale_month], flow_shape)], axis=-1)
+    after_tax[..., -1] += np.broadcast_to(sale_proceeds_after_tax[..., end], flow_shape[:-1])
+    rows = before_tax.reshape(-1, sale_month + 1), after_tax.reshape(-1, sale_month + 1)
+    irr_monthly = cash_flow_irr(np.concatenate(rows)).reshape((2,) + flow_shape[:-1])
+
+    sale = {
+        'month': sale_month,
+        'sale_proceeds': sale_proceeds[..., end],
+        'sale_proceeds_after_tax': sale_proceeds_after_tax[..., end],
+        'cum_cash_flow': cum_cash_flow[..., end],
+        'total_profit_pre_tax': sale_proceeds[..., end] + cum_cash_flow[..., end] - total_cash_invested,
+        'total_profit_post_tax': (sale_proceeds_after_tax[..., end] + cum_cash_flow[..., end] -
+                                  np.sum(income_tax_due[..., :sale_month], axis=-1) - total_cash_invested),
+        'irr_monthly_before_tax': irr_monthly[0],
+        'irr_monthly_after_tax': irr_monthly[1],
+        'irr_before_tax': (1 + irr_monthly[0]) ** 12 - 1,
+        'irr_after_tax': (1 + irr_monthly[1]) ** 12 - 1
+    }
+    if start_date is not None:
+        dates = month_end_dates(start_date, sale_month)
+        solved = xirr(np.concatenate(rows), dates).reshape((2,) + flow_shape[:-1])
+        sale['xirr_before_tax'] = solved[0]
+        sale['xirr_after_tax'] = solved[1]
+
+    return {'months': months, 'monthly_data': monthly_data, 'sale': sale}
+
+def _year_to_date_tax(taxable_income, tax_rate):
+    """
+    Income tax due each month: the tax on the year's taxable income so far
+    (never negative) less what the earlier months of the year already paid.
+    """
+    shape = taxable_income.shape[:-1] + (-1, 12)
+    num_months = taxable_income.shape[-1]
+    padded = -num_months % 12
+    if padded:
+        taxable_income = np.concatenate(
+            [taxable_income, np.zeros(taxable_income.shape[:-1] + (padded,))], axis=-1)
+    year_to_date = np.maximum(np.cumsum(taxable_income.reshape(shape), axis=-1) * tax_rate[..., None], 0)
+    tax = np.diff(year_to_date, axis=-1, prepend=0).reshape(taxable_income.shape)
+    return tax[..., :num_months]
+
+def yearly_rollup(monthly_data):
+    """
+    Roll monthly_data up into yearly values: flows are summed over each
+    year and balances (BALANCE_METRICS) taken at its last month. A partial
+    last year is rolled up over the months it has.
+    Args:
+        monthly_data (dict): Metric name -> array of shape (..., num_months).
+    Returns:
+        dict: Metric name -> array of shape (..., num_years).
+    """
+    yearly = {}
+    for name, values in monthly_data.items():
+        num_months = values.shape[-1]
+        if name in BALANCE_METRICS:
+            yearly[name] = values[..., np.minimum(np.arange(12, num_months + 12, 12), num_months) - 1]
+        else:
+            yearly[name] = np.add.reduceat(values, np.arange(0, num_months, 12), axis=-1)
+    return yearly
@@ -0,0 +1,616 @@
+import inspect
+import numpy as np
+import numpy_financial as npf
+from loan_calculations import arm_resets, loan_schedule, loan_years, yearly_amortization
+from irr_calculations import hold_period_irr
+from instrumentation import stage
+
+# Inputs the projection kernel reads. Each may be a scalar (one property) or an
+# array with one entry per scenario; the yearly outputs get a trailing year axis.
+PROJECTION_INPUTS = (
+    'rent_monthly', 'purchase_price', 'closing_cost', 'initial_improvements',
+    'percent_down', 'interest_rate', 'loan_term_years', 'interest_only', 'interest_only_years',
+    'arm_fixed_years', 'arm_reset_years', 'arm_rate_step', 'arm_rate_cap', 'balloon_years', 'extra_principal_mo',
+    'appreciation', 'rent_rate_inc', 'property_tax_rate_inc', 'insurance_rate_inc', 'utility_rate_inc',
+    'property_tax_yr', 'insurance_mo', 'water_mo', 'sewer_mo', 'garbage_mo', 'gas_electric_mo',
+    'lawn_mo', 'hoa', 'other_expenses', 'management_rate', 'vacancy_rate', 'maintenance_rate',
+    'improved_value_ratio', 'income_tax_rate', 'cap_gains_tax_rate', 'recapture_tax_rate',
+    'depreciation_years', 'pay_cap_gains', 'selling_cost_percentage'
+)
+
+# Rate inputs that may also be given per year, with a trailing year axis
+YEARLY_INPUTS = (
+    'appreciation', 'rent_rate_inc', 'property_tax_rate_inc', 'insurance_rate_inc', 'utility_rate_inc',
+    'management_rate', 'vacancy_rate', 'maintenance_rate'
+)
+
+# Every metric in yearly_data, in report order
+YEARLY_METRICS = (
+    'gross_rent', 'vacancy_loss', 'effective_gross_income', 'property_taxes', 'insurance',
+    'owner_paid_utilities', 'property_management', 'maintenance', 'total_operating_expenses',
+    'noi', 'interest_paid', 'principal_paid', 'loan_payments', 'mortgage_balance', 'equity',
+    'appreciation_amount', 'property_value', 'selling_cost', 'sale_proceeds',
+    'cash_flow_before_tax', 'depreciation', 'cum_dep', 'taxable_income', 'income_tax_due',
+    'cum_income_tax', 'cash_flow_after_tax', 'original_cost_basis', 'adjusted_cost_basis',
+    'capital_gain', 'tax_on_capital_gain', 'recapture_tax', 'total_taxes_due_from_sale',
+    'total_profit_pre_tax', 'total_profit_post_tax', 'cap_rate_annual', 'cash_on_cash_return',
+    'return_on_equity', 'roi_pre_tax', 'irr_before_tax', 'irr_after_tax', 'rent_to_value',
+    'gross_rent_multiplier', 'equity_multiplier', 'break_even_ratio', 'debt_coverage_ratio',
+    'debt_yield', 'cum_operating_income', 'cum_operating_expenses', 'cum_noi', 'cum_cash_flow'
+)
+
+IRR_METRICS = ('irr_before_tax', 'irr_after_tax')
+
+# Years shown in the report projections and the frontend results
+PROJECTION_YEARS = (1, 5, 10, 20, 30)
+
+# Yearly metrics that have no value in some years ('N/A' in the yearly_data
+# dicts); the kernel stores those as NaN
+OPTIONAL_METRICS = ('debt_coverage_ratio', 'debt_yield')
+
+# Scenario-level values reported as derived_values
+DERIVED_VALUES = (
+    'down_payment', 'loan_amount', 'mortgage_monthly', 'property_tax_monthly', 'insurance_monthly',
+    'owner_paid_utilities_monthly', 'total_cash_invested', 'gross_rent_initial', 'vacancy_loss_initial',
+    'egi_initial', 'op_exp_initial', 'noi_initial', 'initial_cap_rate'
+)
+
+# Cash flows and terminal (sale) amounts each IRR series is solved from
+IRR_FLOWS = {
+    'irr_before_tax': ('cash_flow_before_tax', 'sale_proceeds'),
+    'irr_after_tax': ('cash_flow_after_tax', 'sale_proceeds_after_tax')
+}
+
+# --------------- Calculation graph ---------------
+# Every quantity of the projection is a node: a function whose parameter names
+# are the nodes it is computed from. Besides other nodes, a function may ask
+# for the projection context: 'values' (scenario inputs), 'col' (inputs as
+# columns against the year axis, or per-year rates), 'years' (the year
+# numbers being evaluated), 'growth' and 'per_year'. Nodes are closed-form in
+# the year, so they can be evaluated for any years without the ones before.
+# Running totals are registered with _cumulative instead and are the only
+# values that need every year up to the last one asked for. Only the nodes a
+# request needs are evaluated.
+_NODES = {}
+_CUMULATIVE = {}
+
+def _node(name):
+    """Register a function as the node computing name; its parameters are its dependencies."""
+    def register(function):
+        _NODES[name] = (function, tuple(inspect.signature(function).parameters))
+        return function
+    return register
+
+def _cumulative(name, source):
+    """Register name as the running total of node source over the years."""
+    _CUMULATIVE[name] = source
+
+_CONTEXT = ('values', 'col', 'years', 'growth', 'per_year')
+
+# Derived Values (Formulae)
+@_node('down_payment')
+def _down_payment(values):
+    return values['purchase_price'] * values['percent_down']
+
+@_node('loan_amount')
+def _loan_amount(values, down_payment):
+    return values['purchase_price'] - down_payment
+
+@_node('mortgage_monthly')
+def _mortgage_monthly(values, loan_amount):
+    amortizing = -np.asarray(npf.pmt(values['interest_rate'] / 12, values['loan_term_years'] * 12, loan_amount))
+    return np.where(interest_only_periods(values) > 0, loan_amount * values['interest_rate'] / 12, amortizing)
+
+@_node('property_tax_monthly')
+def _property_tax_monthly(values):
+    return values['property_tax_yr'] / 12
+
+@_node('insurance_monthly')
+def _insurance_monthly(values):
+    return values['insurance_mo']
+
+@_node('owner_paid_utilities_monthly')
+def _owner_paid_utilities_monthly(values):
+    return (values['water_mo'] + values['sewer_mo'] + values['garbage_mo'] + values['gas_electric_mo'] +
+            values['lawn_mo'] + values['hoa'] + values['other_expenses'])
+
+@_node('total_cash_invested')
+def _total_cash_invested(values, down_payment):
+    return down_payment + values['initial_improvements'] + values['closing_cost']
+
+@_node('total_cost')
+def _total_cost(values):
+    return values['purchase_price'] + values['initial_improvements'] + values['closing_cost']
+
+@_node('gross_rent_initial')
+def _gross_rent_initial(values):
+    return values['rent_monthly'] * 12
+
+@_node('vacancy_loss_initial')
+def _vacancy_loss_initial(values, gross_rent_initial):
+    return gross_rent_initial * values['vacancy_rate']
+
+@_node('egi_initial')
+def _egi_initial(gross_rent_initial, vacancy_loss_initial):
+    return gross_rent_initial - vacancy_loss_initial
+
+@_node('op_exp_initial')
+def _op_exp_initial(values, owner_paid_utilities_monthly, gross_rent_initial):
+    return (values['property_tax_yr'] + values['insurance_mo'] * 12 + owner_paid_utilities_monthly * 12 +
+            gross_rent_initial * values['management_rate'] + gross_rent_initial * values['maintenance_rate'])
+
+@_node('noi_initial')
+def _noi_initial(egi_initial, op_exp_initial):
+    return egi_initial - op_exp_initial
+
+@_node('initial_cap_rate')
+def _initial_cap_rate(noi_initial, total_cost):
+    return noi_initial / total_cost
+
+# Rental income (Formulae)
+@_node('gross_rent')
+def _gross_rent(col, growth):
+    return col['rent_monthly'] * 12 * growth('rent_rate_inc', False)
+
+@_node('vacancy_loss')
+def _vacancy_loss(gross_rent, col):
+    return gross_rent * col['vacancy_rate']
+
+@_node('effective_gross_income')
+def _effective_gross_income(gross_rent, vacancy_loss):
+    return gross_rent - vacancy_loss
+
+# Operating expenses (Formulae)
+@_node('property_taxes')
+def _property_taxes(col, growth):
+    return col['property_tax_yr'] * growth('property_tax_rate_inc', False)
+
+@_node('insurance')
+def _insurance(col, growth):
+    return col['insurance_mo'] * 12 * growth('insurance_rate_inc', False)
+
+@_node('owner_paid_utilities')
+def _owner_paid_utilities(owner_paid_utilities_monthly, growth):
+    return owner_paid_utilities_monthly[..., None] * 12 * growth('utility_rate_inc', False)
+
+@_node('property_management')
+def _property_management(gross_rent, col):
+    return gross_rent * col['management_rate']
+
+@_node('maintenance')
+def _maintenance(gross_rent, col):
+    return gross_rent * col['maintenance_rate']
+
+@_node('total_operating_expenses')
+def _total_operating_expenses(property_taxes, insurance, owner_paid_utilities, property_management, maintenance):
+    return property_taxes + insurance + owner_paid_utilities + property_management + maintenance
+
+@_node('noi')
+def _noi(effective_gross_income, total_operating_expenses):
+    return effective_gross_income - total_operating_expenses
+
+# Loan (Formulae): one schedule per scenario, zeroed for cash purchases and 0% loans
+def interest_only_periods(values):
+    """Interest-only months: interest_only_years, or the whole term when only interest_only is set."""
+    years = np.where(values['interest_only'] != 0, values['loan_term_years'], 0.0)
+    return np.round(np.where(values['interest_only_years'] > 0, values['interest_only_years'], years) * 12)
+
+def loan_options(values, num_periods):
+    """
+    loan_schedule arguments for the loan options among the inputs: an
+    interest-only period, ARM resets (arm_fixed_years at the initial rate,
+    then a change of arm_rate_step every arm_reset_years up to arm_rate_cap),
+    a balloon after balloon_years and extra_principal_mo paid every month.
+    Args:
+        values (dict): Projection inputs.
+        num_periods (int): Months the schedule covers.
+    Returns:
+        dict: Keyword arguments for loan_schedule, or None when no scenario has
+        any option (a plain level-payment loan, which has a closed form).
+    """
+    io_periods = interest_only_periods(values)
+    fixed_periods = np.round(values['arm_fixed_years'] * 12)
+    balloon_period = np.round(values['balloon_years'] * 12)
+    extra_principal = values['extra_principal_mo']
+    if not (np.any(io_periods > 0) or np.any(fixed_periods > 0) or np.any(balloon_period > 0)
+            or np.any(extra_principal != 0)):
+        return None
+    reset_periods, reset_rates = arm_resets(values['interest_rate'], fixed_periods,
+                                            np.round(values['arm_reset_years'] * 12), values['arm_rate_step'],
+                                            values['arm_rate_cap'], num_periods)
+    return {
+        'interest_only_periods': io_periods,
+        'reset_periods': reset_periods,
+        'reset_rates': reset_rates,
+        'balloon_period': balloon_period,
+        'extra_principal': extra_principal
+    }
+
+@_node('has_loan')
+def _has_loan(values):
+    return ((values['percent_down'] < 1) & (values['interest_rate'] > 0))[..., None]
+
+@_node('loan')
+def _loan(values, loan_amount, years):
+    num_periods = int(years[-1]) * 12
+    with stage('amortization'):
+        options = loan_options(values, num_periods)
+        if options is None:
+            return loan_years(values['interest_rate'], values['loan_term_years'] * 12, -loan_amount, years)
+        schedule = yearly_amortization(loan_schedule(loan_amount, values['interest_rate'],
+                                                     values['loan_term_years'] * 12, num_periods, **options))
+        return {name: schedule[name][..., years - 1] for name in ('interest', 'principal', 'payments', 'balance')}
+
+@_node('interest_paid')
+def _interest_paid(has_loan, loan):
+    return np.where(has_loan, loan['interest'], 0.0)
+
+@_node('principal_paid')
+def _principal_paid(has_loan, loan):
+    return np.where(has_loan, loan['principal'], 0.0)
+
+@_node('loan_payments')
+def _loan_payments(has_loan, loan):
+    return np.where(has_loan, loan['payments'], 0.0)
+
+@_node('mortgage_balance')
+def _mortgage_balance(has_loan, loan):
+    return np.where(has_loan, loan['balance'], 0.0)
+
+# Property value and equity (Formulae)
+@_node('property_value')
+def _property_value(col, growth):
+    return col['purchase_price'] * growth('appreciation', True)
+
+@_node('appreciation_amount')
+def _appreciation_amount(years, property_value, col, growth):
+    return np.where(years > 1,
+                    property_value - col['purchase_price'] * growth('appreciation', False),
+                    col['purchase_price'] * col['appreciation'][..., :1])
+
+@_node('equity')
+def _equity(property_value, mortgage_balance):
+    return property_value - mortgage_balance
+
+@_node('selling_cost')
+def _selling_cost(property_value, col):
+    return property_value * col['selling_cost_percentage']
+
+@_node('sale_proceeds')
+def _sale_proceeds(property_value, mortgage_balance, selling_cost):
+    return property_value - mortgage_balance - selling_cost
+
+# Cash flow and tax (Formulae)
+@_node('cash_flow_before_tax')
+def _cash_flow_before_tax(noi, loan_payments):
+    return noi - loan_payments
+
+_cumulative('cum_cash_flow', 'cash_flow_before_tax')
+
+@_node('depreciation')
+def _depreciation(col, years):
+    depreciable_basis = (col['improved_value_ratio'] * col['purchase_price'] +
+                         col['initial_improvements'] + col['closing_cost'])
+    return np.where(years <= col['depreciation_years'], depreciable_basis / col['depreciation_years'], 0.0)
+
+_cumulative('cum_dep', 'depreciation')
+
+@_node('taxable_income')
+def _taxable_income(effective_gross_income, total_operating_expenses, interest_paid, depreciation):
+    return effective_gross_income - total_operating_expenses - interest_paid - depreciation
+
+@_node('income_tax_due')
+def _income_tax_due(taxable_income, col):
+    return np.maximum(taxable_income * col['income_tax_rate'], 0)
+
+_cumulative('cum_income_tax', 'income_tax_due')
+
+@_node('cash_flow_after_tax')
+def _cash_flow_after_tax(cash_flow_before_tax, income_tax_due):
+    return cash_flow_before_tax - income_tax_due
+
+# Capital gains and cost basis (Formulae)
+@_node('original_cost_basis')
+def _original_cost_basis(col, per_year):
+    return per_year(col['purchase_price'] + col['closing_cost'])
+
+@_node('adjusted_cost_basis')
+def _adjusted_cost_basis(original_cost_basis, col, cum_dep, selling_cost):
+    return original_cost_basis + col['initial_improvements'] - cum_dep + selling_cost
+
+@_node('capital_gain')
+def _capital_gain(property_value, adjusted_cost_basis):
+    return property_value - adjusted_cost_basis
+
+@_node('tax_on_capital_gain')
+def _tax_on_capital_gain(col, capital_gain):
+    return np.where((col['pay_cap_gains'] != 0) & (capital_gain > 0), capital_gain * col['cap_gains_tax_rate'], 0.0)
+
+@_node('recapture_tax')
+def _recapture_tax(col, cum_dep):
+    return np.where(col['pay_cap_gains'] != 0, cum_dep * col['recapture_tax_rate'], 0.0)
+
+@_node('total_taxes_due_from_sale')
+def _total_taxes_due_from_sale(tax_on_capital_gain, recapture_tax):
+    return tax_on_capital_gain + recapture_tax
+
+@_node('sale_proceeds_after_tax')
+def _sale_proceeds_after_tax(sale_proceeds, total_taxes_due_from_sale):
+    return sale_proceeds - total_taxes_due_from_sale
+
+# Profit (Formulae)
+@_node('tci')
+def _tci(total_cash_invested):
+    return total_cash_invested[..., None]
+
+@_node('total_profit_pre_tax')
+def _total_profit_pre_tax(sale_proceeds, cum_cash_flow, tci):
+    return sale_proceeds + cum_cash_flow - tci
+
+@_node('total_profit_post_tax')
+def _total_profit_post_tax(total_profit_pre_tax, cum_income_tax, total_taxes_due_from_sale):
+    return total_profit_pre_tax - cum_income_tax - total_taxes_due_from_sale
+
+# Financial metrics (Formulae)
+@_node('cap_rate_annual')
+def _cap_rate_annual(noi, total_cost):
+    return noi / total_cost[..., None]
+
+@_node('cash_on_cash_return')
+def _cash_on_cash_return(cash_flow_before_tax, tci):
+    return np.where(tci > 0, cash_flow_before_tax / tci, 0.0)
+
+@_node('return_on_equity')
+def _return_on_equity(cash_flow_before_tax, equity):
+    return np.where(equity > 0, cash_flow_before_tax / equity, 0.0)
+
+@_node('roi_pre_tax')
+def _roi_pre_tax(total_profit_pre_tax, tci):
+    return np.where(tci > 0, total_profit_pre_tax / tci, 0.0)
+
+@_node('rent_to_value')
+def _rent_to_value(years, col, property_value, gross_rent):
+    rent_value_base = np.where(years == 1, col['purchase_price'], property_value)
+    return np.where(rent_value_base > 0, (gross_rent / 12) / rent_value_base, 0.0)
+
+@_node('gross_rent_multiplier')
+def _gross_rent_multiplier(property_value, gross_rent):
+    return np.where(gross_rent > 0, property_value / gross_rent, 0.0)
+
+@_node('equity_multiplier')
+def _equity_multiplier(equity, cum_cash_flow, tci):
+    return np.where(tci > 0, (equity + cum_cash_flow) / tci, 0.0)
+
+@_node('break_even_ratio')
+def _break_even_ratio(total_operating_expenses, loan_payments, gross_rent):
+    return np.where(gross_rent > 0, (total_operating_expenses + loan_payments) / gross_rent, 0.0)
+
+@_node('debt_coverage_ratio')
+def _debt_coverage_ratio(noi, loan_payments):
+    return np.where(loan_payments > 0, noi / loan_payments, np.nan)
+
+@_node('debt_yield')
+def _debt_yield(noi, loan_amount):
+    return np.where(loan_amount[..., None] > 0, noi / loan_amount[..., None], np.nan)
+
+_cumulative('cum_operating_income', 'effective_gross_income')
+_cumulative('cum_operating_expenses', 'total_operating_expenses')
+_cumulative('cum_noi', 'noi')
+
+def _dependencies(name):
+    """Nodes a node or IRR metric is computed from directly."""
+    if name in IRR_FLOWS:
+        return IRR_FLOWS[name] + ('total_cash_invested',)
+    if name in _CUMULATIVE:
+        return (_CUMULATIVE[name],)
+    return tuple(dependency for dependency in _NODES[name][1] if dependency not in _CONTEXT)
+
+def _depends_on_years(name):
+    """Whether a node's value changes from year to year (as opposed to one value per scenario)."""
+    if name in _CUMULATIVE:
+        return True
+    return any(dependency in ('col', 'years', 'growth', 'per_year') or _depends_on_years(dependency)
+               for dependency in _NODES[name][1] if dependency != 'values')
+
+# Nodes evaluated per year; the rest have one value per scenario
+_YEARLY_NODES = frozenset(name for name in list(_NODES) + list(_CUMULATIVE) if _depends_on_years(name))
+
+def metric_dependencies(metrics):
+    """
+    Every node of the calculation graph the given metrics need.
+    Args:
+        metrics (list): Names from YEARLY_METRICS or DERIVED_VALUES.
+    Returns:
+        set: The metrics themselves and everything they are computed from.
+    """
+    needed = set()
+    pending = list(metrics)
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(_dependencies(name))
+    return needed
+
+def project_investment(inputs, num_years=30, yearly_inputs=None, metrics=None, years=None):
+    """
+    Project a property investment over the whole horizon at once.
+    Every line item is a geometric growth series, a closed-form loan balance,
+    a cumulative sum or a masked combination of those, so each one is computed
+    as an array over the years instead of one year at a time, and a single
+    year (e.g. year 40) is evaluated directly from its formula. Running totals
+    and IRR are only taken as far as the last year asked for. Inputs may be
+    arrays, in which case every scenario is projected in the same pass. Only
+    the parts of the calculation graph the requested metrics depend on are
+    evaluated, e.g. year-by-year cap rates never touch the loan schedule,
+    taxes or IRR.
+    Args:
+        inputs (dict): Values for every name in PROJECTION_INPUTS.
+        num_years (int): Number of years to project when years is not given.
+        yearly_inputs (dict): Optional per-year values for names in YEARLY_INPUTS,
+            shape (..., num_years), replacing the constant rate in inputs. A
+            growth rate for year t applies to the change from year t to t + 1
+            (rent and expenses) or over year t (property value).
+        metrics (list): Names from YEARLY_METRICS to compute; None for all.
+        years (list): Years to report, ascending (e.g. [3, 7] or [40]); defaults
+            to 1..num_years.
+    Returns:
+        dict: 'derived_values' with one value per scenario and 'yearly_data'
+        with one array of shape (..., len(years)) per requested metric, in the
+        order of YEARLY_METRICS.
+    """
+    if metrics is None:
+        metrics = YEARLY_METRICS
+    unknown = [name for name in metrics if name not in YEARLY_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown metric '{unknown[0]}'")
+    metrics = [name for name in YEARLY_METRICS if name in metrics]
+    years = np.arange(1, num_years + 1) if years is None else np.asarray(years, dtype=int)
+    if years.ndim != 1 or years.size == 0 or years[0] < 1 or np.any(np.diff(years) <= 0):
+        raise ValueError('years must be ascending positive year numbers')
+    last_year = int(years[-1])
+
+    values = {name: np.asarray(inputs[name], dtype=float) for name in PROJECTION_INPUTS}
+    yearly_inputs = {name: np.asarray(value, dtype=float)[..., :last_year]
+                     for name, value in (yearly_inputs or {}).items()}
+    for name, value in yearly_inputs.items():
+        # Year-1 rates feed the initial (derived) values
+        values[name] = value[..., 0]
+
+    def context(grid):
+        """Projection context for evaluating nodes at the year numbers in grid."""
+        col = {name: value[..., None] for name, value in values.items()}
+        col.update(yearly_inputs)
+        elapsed = grid - 1
+
+        def growth(name, through_year):
+            """Compounded growth factor of a rate input for each year."""
+            if name not in yearly_inputs:
+                return (1 + col[name]) ** (grid if through_year else elapsed)
+            factors = np.cumprod(1 + yearly_inputs[name], axis=-1)
+            if through_year:
+                return factors
+            return np.concatenate([np.ones_like(factors[..., :1]), factors[..., :-1]], axis=-1)
+
+        def per_year(value):
+            """Repeat a value that does not change over the years along the year axis."""
+            return np.broadcast_to(value, np.broadcast_shapes(np.shape(value), grid.shape))
+
+        return {'values': values, 'col': col, 'years': grid, 'growth': growth, 'per_year': per_year}
+
+    # Point-in-time values are evaluated at just the requested years ('report');
+    # running totals and IRR cash flows need every year up to the last one
+    # ('dense'). Per-year rates compound year by year, so with those (or when
+    # every year is requested anyway) the two are the same.
+    dense_years = np.arange(1, last_year + 1)
+    sparse = not yearly_inputs and years.size < last_year
+    contexts = {'dense': context(dense_years)}
+    contexts['report'] = context(years) if sparse else contexts['dense']
+    computed = {'dense': {}, 'shared': {}}
+    computed['report'] = {} if sparse else computed['dense']
+
+    def evaluate(name, grid='report'):
+        """Value of a node at the years of grid, computing (and keeping) its dependencies first."""
+        cache = computed[grid] if name in _YEARLY_NODES else computed['shared']
+        if name not in cache:
+            if name in _CUMULATIVE:
+                totals = np.cumsum(evaluate(_CUMULATIVE[name], 'dense'), axis=-1)
+                cache[name] = totals[..., years - 1] if grid == 'report' and sparse else totals
+            else:
+                function, dependencies = _NODES[name]
+                cache[name] = function(*(contexts[grid][dependency] if dependency in _CONTEXT
+                                         else evaluate(dependency, grid) for dependency in dependencies))
+        return cache[name]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived_values = {name: evaluate(name) for name in DERIVED_VALUES}
+        yearly_data = {name: None if name in IRR_FLOWS else evaluate(name) for name in metrics}
+        # Values computed for every year, when only some were asked for
+        subsample = not sparse and years.size < last_year
+
+        def report(values):
+            """Values at the requested years."""
+            return values[..., years - 1] if subsample else values
+
+        # Internal rate of return (Formulae): the requested series are solved
+        # together, for the report years as hold periods
+        irr_metrics = [name for name in metrics if name in IRR_FLOWS]
+        if irr_metrics:
+            flows = {name: evaluate(IRR_FLOWS[name][0], 'dense') for name in irr_metrics}
+            terminals = {name: report(evaluate(IRR_FLOWS[name][1])) for name in irr_metrics}
+            # Cash flows and sale proceeds can vary along different inputs, so both
+            # are brought to one common shape before stacking
+            scenario_shape = np.broadcast_shapes(*(np.shape(a)[:-1] for name in irr_metrics
+                                                   for a in (flows[name], terminals[name])))
+            flow_shape = scenario_shape + (last_year,)
+            terminal_shape = scenario_shape + (years.size,)
+            initial = np.broadcast_to(-derived_values['total_cash_invested'], scenario_shape).reshape(-1)
+            with stage('irr'):
+                solved = hold_period_irr(
+                    np.concatenate([initial] * len(irr_metrics)),
+                    np.stack([np.broadcast_to(flows[name], flow_shape)
+                              for name in irr_metrics]).reshape(-1, last_year),
+                    np.stack([np.broadcast_to(terminals[name], terminal_shape)
+                              for name in irr_metrics]).reshape(-1, years.size),
+                    hold_years=years
+                ).reshape((len(irr_metrics),) + terminal_shape)
+            yearly_data.update({name: report(values) for name, values in yearly_data.items() if name not in IRR_FLOWS})
+            yearly_data.update(zip(irr_metrics, solved))
+        else:
+            yearly_data = {name: report(values) for name, values in yearly_data.items()}
+
+    return {'derived_values': derived_values, 'yearly_data': yearly_data}
+
+def _rows_from_table(names, table, years):
+    """Build yearly_data dicts from a nested list of shape (years, metrics)."""
+    optional = [names.index(name) for name in OPTIONAL_METRICS if name in names]
+    yearly_data = {}
+    for year, row in zip(years, table):
+        for position in optional:
+            if row[position] != row[position]:
+                row[position] = 'N/A'
+        yearly_data[year] = dict(zip(names, row))
+    return yearly_data
+
+def yearly_rows(columns, years):
+    """
+    Turn one scenario's yearly metric arrays into the per-year dicts of
+    yearly_data, with NaN optional metrics reported as 'N/A'.
+    Args:
+        columns (dict): Metric name -> array of shape (num_years,).
+        years (list): Year numbers matching the array positions.
+    Returns:
+        dict: Year -> {metric name: value}.
+    """
+    names = list(columns)
+    return _rows_from_table(names, np.stack([columns[name] for name in names], axis=-1).tolist(), years)
+
+def yearly_columns(columns, years):
+    """
+    yearly_data in the columnar layout: one float64 array per metric, indexed
+    by position in years, with NaN where a metric has no value.
+    Args:
+        columns (dict): Metric name -> array of shape (num_years,).
+        years (list): Year numbers matching the array positions.
+    Returns:
+        dict: {'years': [...], 'columns': {metric name: array}}.
+    """
+    return {'years': list(years), 'columns': {name: np.asarray(values, dtype=float) for name, values in columns.items()}}
+
+def yearly_columns_to_rows(yearly_data):
+    """Turn columnar yearly_data (see yearly_columns) into the per-year dicts of yearly_rows."""
+    return yearly_rows(yearly_data['columns'], yearly_data['years'])
+
+def batch_yearly_rows(columns, years):
+    """
+    Same as yearly_rows for a batch of scenarios, converting each metric
+    table to Python values in one call rather than once per scenario.
+    Args:
+        columns (dict): Metric name -> array of shape (scenarios, num_years).
+        years (list): Year numbers matching the array positions.
+    Returns:
+        list: One yearly_data dict per scenario.
+    """
+    names = list(columns)
+    tables = np.stack([columns[name] for name in names], axis=-1).tolist()
+    return [_rows_from_table(names, table, years) for table in tables]
@@ -0,0 +1,261 @@
+from dataclasses import dataclass, field, fields
+import numpy as np
+from projection_calculations import PROJECTION_INPUTS
+
+# -------------------- Input Conversion --------------------
+def safe_float(value, default=0):
+    """Safely convert value to float, handling None, empty strings, and strings."""
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+def safe_bool(value, default=False):
+    """Safely convert value to bool, reading strings such as "true", "1", "yes" and "false"."""
+    if value is None or value == '':
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes', 'on')
+    return bool(value)
+
+def safe_int(value, default=0):
+    """Safely convert value to int, handling None, empty strings, and strings."""
+    if value is None or value == '':
+        return default
+    try:
+        return int(float(value))  # Convert to float first to handle "3.0" strings
+    except (ValueError, TypeError):
+        return default
+
+class _FrozenDict(tuple):
+    """Hashable stand-in for a dict held by the inputs (e.g. a unit row), as (key, value) pairs."""
+
+def _freeze(value):
+    """Make a form value hashable: dicts and lists become (nested) tuples."""
+    if isinstance(value, dict):
+        return _FrozenDict((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _thaw(value):
+    """Undo _freeze."""
+    if isinstance(value, _FrozenDict):
+        return {key: _thaw(item) for key, item in value}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+# How each kind of field is read from its form section. Lenient kinds fall back
+# to the default on bad values; strict ones ('float', 'int') report an error.
+_CONVERTERS = {
+    'value': lambda section, name, default: _freeze(section.get(name, default)),
+    'number': lambda section, name, default: safe_float(section.get(name), default),
+    'count': lambda section, name, default: safe_int(section.get(name), default),
+    'flag': lambda section, name, default: safe_bool(section.get(name), default),
+    'float': lambda section, name, default: float(section.get(name, default)),
+    'int': lambda section, name, default: int(section.get(name, default))
+}
+_NUMERIC_KINDS = {'number': np.float64, 'float': np.float64, 'count': np.int64, 'int': np.int64, 'flag': np.bool_}
+
+def _form_field(section, kind, default):
+    """Dataclass field read from form_data[section] by the given kind of conversion."""
+    return field(metadata={'section': section, 'kind': kind, 'default': default})
+
+class InputError(ValueError):
+    """Invalid form data; errors maps each bad field's form path to its message."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(f'{path}: {message}' for path, message in errors.items()))
+
+    def __reduce__(self):
+        # Rebuilt from errors, e.g. when raised in a worker process
+        return InputError, (self.errors,)
+
+@dataclass(frozen=True, slots=True)
+class PropertyInputs:
+    """
+    Every analysis input, read once from the frontend form data by
+    parse_property_inputs. Immutable and hashable, so it can key caches.
+    """
+    # Property Information (Input)
+    property_type: str = _form_field('property_info', 'value', 'House')
+    street: str = _form_field('property_info', 'value', '')
+    city: str = _form_field('property_info', 'value', '')
+    state: str = _form_field('property_info', 'value', '')
+    zip_code: str = _form_field('property_info', 'value', '')
+    year_built: int = _form_field('property_info', 'count', 2024)
+    sqft: float = _form_field('property_info', 'number', 0)
+    lot_size: float = _form_field('property_info', 'number', 0)
+    parking: str = _form_field('property_info', 'value', 'Garage')
+    units: tuple = _form_field('property_info', 'value', [])
+    total_beds: int = _form_field('property_info', 'count', 0)
+    total_baths: int = _form_field('property_info', 'count', 0)
+
+    # Purchase Price & Rental Income (Input)
+    rent_monthly: float = _form_field('purchase_info', 'number', 0)
+    purchase_price: float = _form_field('purchase_info', 'number', 0)
+    closing_cost: float = _form_field('purchase_info', 'number', 0)
+    initial_improvements: float = _form_field('purchase_info', 'number', 0)
+    purchase_date: str = _form_field('purchase_info', 'value', '2025-01-01')
+
+    # Loan Info (Input) - already converted to decimals in frontend
+    percent_down: float = _form_field('loan_info', 'float', 0.20)
+    interest_rate: float = _form_field('loan_info', 'float', 0.04)
+    loan_term_years: int = _form_field('loan_info', 'int', 30)
+    interest_only: bool = _form_field('loan_info', 'flag', False)
+    interest_only_years: float = _form_field('loan_info', 'float', 0)
+    arm_fixed_years: float = _form_field('loan_info', 'float', 0)
+    arm_reset_years: float = _form_field('loan_info', 'float', 1)
+    arm_rate_step: float = _form_field('loan_info', 'float', 0)
+    arm_rate_cap: float = _form_field('loan_info', 'float', 0)
+    balloon_years: float = _form_field('loan_info', 'float', 0)
+    extra_principal_mo: float = _form_field('loan_info', 'number', 0)
+
+    # Yearly Rate Increase (Input)
+    appreciation: float = _form_field('yearly_rate_increase', 'float', 0.02)
+    rent_rate_inc: float = _form_field('yearly_rate_increase', 'float', 0.02)
+    property_tax_rate_inc: float = _form_field('yearly_rate_increase', 'float', 0.02)
+    insurance_rate_inc: float = _form_field('yearly_rate_increase', 'float', 0.02)
+    utility_rate_inc: float = _form_field('yearly_rate_increase', 'float', 0.02)
+
+    # Owner Paid Expenses (Input)
+    property_tax_yr: float = _form_field('owner_paid_expenses', 'number', 0)
+    insurance_mo: float = _form_field('owner_paid_expenses', 'number', 0)
+    water_mo: float = _form_field('owner_paid_expenses', 'number', 0)
+    sewer_mo: float = _form_field('owner_paid_expenses', 'number', 0)
+    garbage_mo: float = _form_field('owner_paid_expenses', 'number', 0)
+    gas_electric_mo: float = _form_field('owner_paid_expenses', 'number', 0)
+    lawn_mo: float = _form_field('owner_paid_expenses', 'number', 0)
+    hoa: float = _form_field('owner_paid_expenses', 'number', 0)
+    other_expenses: float = _form_field('owner_paid_expenses', 'number', 0)
+    management_rate: float = _form_field('owner_paid_expenses', 'float', 0.10)
+    vacancy_rate: float = _form_field('owner_paid_expenses', 'float', 0.04)
+    maintenance_rate: float = _form_field('owner_paid_expenses', 'float', 0.10)
+
+    # Tax Info (Input)
+    improved_value_ratio: float = _form_field('tax_info', 'float', 0.7336)
+    income_tax_rate: float = _form_field('tax_info', 'float', 0.22)
+    cap_gains_tax_rate: float = _form_field('tax_info', 'float', 0.15)
+    recapture_tax_rate: float = _form_field('tax_info', 'float', 0.25)
+    depreciation_years: float = _form_field('tax_info', 'float', 27.5)
+    q1_tax: str = _form_field('tax_info', 'value', 'I will use a 1031 exchange')
+    selling_cost_percentage: float = _form_field('tax_info', 'float', 0.03)
+
+    # Derived from q1_tax
+    pay_cap_gains: bool = False
+
+    def to_dict(self):
+        """Flat dictionary of every input, with unit rows as plain dicts."""
+        return {name: _thaw(getattr(self, name)) for name in _FIELD_NAMES}
+
+    def projection_inputs(self):
+        """The inputs the projection kernel reads (PROJECTION_INPUTS), as floats."""
+        return {name: float(getattr(self, name)) for name in PROJECTION_INPUTS}
+
+    def to_record(self):
+        """The numeric inputs as a NumPy structured record (see RECORD_DTYPE)."""
+        return np.array(tuple(getattr(self, name) for name in RECORD_DTYPE.names), dtype=RECORD_DTYPE)[()]
+
+# (name, section, converter, default) per form field, in form order
+_FORM_FIELDS = tuple((f.name, f.metadata['section'], _CONVERTERS[f.metadata['kind']], f.metadata['default'])
+                     for f in fields(PropertyInputs) if 'section' in f.metadata)
+_FIELD_NAMES = tuple(f.name for f in fields(PropertyInputs))
+_SECTIONS = tuple(dict.fromkeys(section for _, section, _, _ in _FORM_FIELDS))
+
+# Numeric inputs as stored in NumPy records, so batches of thousands of
+# properties are held as columns rather than one object per property
+RECORD_DTYPE = np.dtype(
+    [(f.name, _NUMERIC_KINDS[f.metadata['kind']]) for f in fields(PropertyInputs)
+     if f.metadata.get('kind') in _NUMERIC_KINDS] + [('pay_cap_gains', np.bool_)])
+
+# Form path (e.g. 'loan_info.interest_rate') of every numeric projection input
+FORM_INPUT_PATHS = {f'{section}.{name}': name for name, section, _, _ in _FORM_FIELDS if name in PROJECTION_INPUTS}
+
+# Inputs the form only accepts as whole numbers
+INTEGER_INPUTS = tuple(name for name in FORM_INPUT_PATHS.values() if RECORD_DTYPE[name].kind == 'i')
+
+# Capital gains are not taxed for these answers to the tax question
+_NO_CAP_GAINS_ANSWERS = (
+    "I will use a 1031 exchange",
+    "I will have lived in it as a homestead for 2 out of 5 years",
+    "Other, I will NOT pay capital gains"
+)
+
+# Example property used when no form data is given (for backward compatibility)
+SAMPLE_FORM_DATA = {
+    'property_info': {
+        'property_type': 'House', 'street': '123 ABC Street', 'city': 'City', 'state': 'State',
+        'zip_code': 'Zip Code', 'year_built': 2024, 'sqft': 1234, 'lot_size': 1, 'parking': 'Garage',
+        'units': [{'beds': 3, 'baths': 2, 'rent': 4600}], 'total_beds': 3, 'total_baths': 2
+    },
+    'purchase_info': {
+        'rent_monthly': 4600, 'purchase_price': 400000, 'closing_cost': 12000,
+        'initial_improvements': 0, 'purchase_date': '2025-01-01'
+    },
+    'loan_info': {'percent_down': 0.20, 'interest_rate': 0.04, 'loan_term_years': 30, 'interest_only': False},
+    'yearly_rate_increase': {
+        'appreciation': 0.02, 'rent_rate_inc': 0.02, 'property_tax_rate_inc': 0.02,
+        'insurance_rate_inc': 0.02, 'utility_rate_inc': 0.02
+    },
+    'owner_paid_expenses': {
+        'property_tax_yr': 6000, 'insurance_mo': 0, 'water_mo': 0, 'sewer_mo': 0, 'garbage_mo': 0,
+        'gas_electric_mo': 0, 'lawn_mo': 0, 'hoa': 0, 'other_expenses': 0,
+        'management_rate': 0.10, 'vacancy_rate': 0.04, 'maintenance_rate': 0.10
+    },
+    'tax_info': {
+        'improved_value_ratio': 0.7336, 'income_tax_rate': 0.22, 'cap_gains_tax_rate': 0.15,
+        'recapture_tax_rate': 0.25, 'depreciation_years': 27.5, 'q1_tax': 'I will use a 1031 exchange',
+        'selling_cost_percentage': 0.03
+    }
+}
+
+def parse_property_inputs(form_data=None):
+    """
+    Read the analysis inputs out of the frontend form data.
+    Every field is checked in one pass and all invalid fields are reported
+    together in a single InputError.
+
+    Args:
+        form_data: Dictionary containing form data from frontend. If None, uses default values.
+    Returns:
+        PropertyInputs: The parsed inputs.
+    """
+    if not form_data:
+        form_data = SAMPLE_FORM_DATA
+    if not isinstance(form_data, dict):
+        raise InputError({'form_data': 'must be an object'})
+
+    errors = {}
+    sections = {}
+    for section in _SECTIONS:
+        sections[section] = form_data.get(section, {})
+        if not isinstance(sections[section], dict):
+            errors[section] = 'must be an object'
+            sections[section] = {}
+
+    values = {}
+    for name, section, convert, default in _FORM_FIELDS:
+        try:
+            values[name] = convert(sections[section], name, default)
+        except (ValueError, TypeError, OverflowError) as e:
+            errors[f'{section}.{name}'] = str(e)
+    if errors:
+        raise InputError(errors)
+
+    values['pay_cap_gains'] = values['q1_tax'] not in _NO_CAP_GAINS_ANSWERS
+    return PropertyInputs(**values)
+
+def inputs_to_records(inputs_list):
+    """
+    Stack the numeric inputs of many properties into one NumPy structured array.
+    Args:
+        inputs_list (list): PropertyInputs per property.
+    Returns:
+        ndarray: One RECORD_DTYPE record per property; records[name] is a column.
+    """
+    return np.array([tuple(getattr(inputs, name) for name in RECORD_DTYPE.names) for inputs in inputs_list],
+                    dtype=RECORD_DTYPE)
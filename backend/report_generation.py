@@ -1,172 +1,513 @@
-from data_processing import create_projection_dataframe
+import csv
+import html
+import io
+import string
+import sys
+from data_processing import PROJECTION_ROWS, metric_columns, projection_matrix
+from projection_calculations import PROJECTION_YEARS
 
-def generate_investment_report(analysis_data):
+# Report targets render_investment_report can produce
+REPORT_FORMATS = ('text', 'markdown', 'html', 'csv')
+REPORT_MEDIA_TYPES = {
+    'text': 'text/plain; charset=utf-8',
+    'markdown': 'text/markdown; charset=utf-8',
+    'html': 'text/html; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8'
+}
+
+# Columns of the CSV target: one row per report cell, so the reports of many
+# properties can share one file
+CSV_COLUMNS = ('property', 'section', 'item', 'column', 'value')
+
+# Year 1 metrics shown in the summary
+_YEAR_1_METRICS = (
+    'cash_flow_before_tax', 'loan_payments', 'cap_rate_annual', 'cash_on_cash_return', 'return_on_equity',
+    'roi_pre_tax', 'irr_before_tax', 'rent_to_value', 'gross_rent_multiplier', 'equity_multiplier',
+    'break_even_ratio', 'debt_coverage_ratio', 'debt_yield'
+)
+
+# --------------- Templates ---------------
+def _compile(source):
     """
-    Generate the complete investment analysis report.
+    Compile a str.format template into a function of its fields. Fields are
+    either all names (looked up in a dict) or all positions (taken from a
+    sequence), with an optional format spec, e.g. '${purchase_price:>12,.0f}'
+    or '{0:<30}'; the template is checked once here and rendered by the bound
+    str.format, which parses it in C.
     """
+    names = [name for _, name, _, _ in string.Formatter().parse(source) if name is not None]
+    if all(name.isdigit() for name in names):
+        render = source.format
+        return lambda fields: render(*fields)
+    if any(not name.isidentifier() for name in names):
+        raise ValueError(f"Template fields must be all names or all positions: '{source}'")
+    return source.format_map
+
+def _pair(label, value, right_label, right_value):
+    """Template source of a two-column summary line: label and value, then a second label and value."""
+    return label.ljust(30) + value + '\t' + right_label.ljust(30) + right_value
+
+# Everything above the Buy & Hold projection tables, as the text report lays it out
+_TEXT_SUMMARY = _compile('\n'.join([
+    '',
+    '{title:^80}',
+    '',
+    '{address:^80}',
+    '{subtitle:^80}',
+    '',
+    '{property_type}   ·   {total_beds} Beds   ·   {total_baths} Baths   ·   {sqft:,.0f} Sq.Ft.',
+    '',
+    '${purchase_price:,.0f} Purchase Price',
+    '${initial_cash:,.0f} Cash Needed   ·   ${cash_flow_monthly:,.0f}/mo Cash Flow   ·   '
+    '{cap_rate:.1f}% Cap Rate   ·   {cash_on_cash_return:.1f}% COC',
+    '',
+    '{description_title:^80}',
+    '',
+    'ADDRESS'.ljust(20),
+    '{street:<20}',
+    '{city:<20}',
+    '{state_zip:<20}',
+    '',
+    'DESCRIPTION',
+    'Property Type:'.ljust(20) + '\t{property_type:>15}',
+    'Square Footage:'.ljust(20) + '\t{sqft:>15,.0f}',
+    'Beds:'.ljust(20) + '\t{total_beds:>15}',
+    'Baths:'.ljust(20) + '\t{total_baths:>15}',
+    'Year Built:'.ljust(20) + '\t{year_built:>15}',
+    'Parking:'.ljust(20) + '\t{parking:>15}',
+    'Lot Size:'.ljust(20) + '\t{lot_size:>15.2f}',
+    '',
+    '\t\t\tClick for Map',
+    '',
+    'Purchase Analysis & Return',
+    '\tPURCHASE & REHAB'.ljust(43) + '\t' + 'FINANCING (PURCHASE)'.ljust(30),
+    _pair('Purchase Price:', '\t${purchase_price:>12,.0f}', 'Loan Type:', '\t{loan_type}, {loan_term_years} Year'),
+    _pair('Amount Financed:', '\t-${loan_amount:>12,.0f}', 'Interest Rate:', ' \t{interest_rate:>12.2f}%'),
+    _pair('Down Payment:', '\t=${down_payment:>12,.0f}', 'Percent Down:', ' \t{percent_down:>12.2f}%'),
+    _pair('Purchase Cost:', '\t+${closing_cost:>12,.0f}', 'Loan Amount:', ' \t${loan_amount:>12,.0f}'),
+    _pair('Rehab Cost:', '\t+${initial_improvements:>12,.0f}', 'Loan Payment:', '\t${mortgage_monthly:>12,.0f} Per Month'),
+    _pair('Total Cash Needed:', '\t=${initial_cash:>12,.0f}', '', '\t${mortgage_yearly:>12,.0f} Per Year'),
+    '\nAfter Repair Value:'.ljust(30) + '\t${arv:>12,.0f}',
+    'ARV per Square Foot:'.ljust(30) + '\t${arv_per_sqft:>12,.1f}',
+    'Price per Square Foot:'.ljust(30) + '\t${price_per_sqft:>12,.1f}',
+    '',
+    'RETURNS & RATIOS (Year 1)'.ljust(45) + '\t' + 'ASSUMPTIONS & PROJECTIONS'.ljust(30),
+    _pair('Cap Rate:', '\t{cap_rate:>12.1f}%', 'Purchase Date:', '\t{purchase_date:>15}'),
+    _pair('Cash on Cash Return:', '\t{cash_on_cash_return:>12.1f}%', 'Initial Improvements:',
+          ' \t${initial_improvements:>12,.0f}'),
+    _pair('Return on Equity:', '\t{return_on_equity:>12.1f}%', 'Purchase Cost:', ' \t${closing_cost:>12,.0f}'),
+    _pair('Return on Investment:', '\t{roi:>12.1f}%', 'Vacancy Rate:', ' \t{vacancy_rate:>12.0f}%'),
+    _pair('Internal Rate of Return:', '\t{irr:>12.1f}%', 'Appreciation:', ' \t{appreciation:>12.0f}%'),
+    _pair('', '\t' + ''.rjust(15), 'Rent Rate Increase:', ' \t{rent_rate_inc:>12.0f}%'),
+    _pair('Rent to Value:', '\t{rent_to_value:>12.1f}%', 'Property Tax Increase:', ' \t{property_tax_rate_inc:>12.0f}%'),
+    _pair('Gross Rent Multiplier:', '\t{gross_rent_multiplier:>12.2f}', 'Insurance Rate Increase:',
+          ' \t{insurance_rate_inc:>12.0f}%'),
+    _pair('Equity Multiple:', '\t{equity_multiple:>12.2f}', 'Utilities Rate Increase:', ' \t{utility_rate_inc:>12.0f}%'),
+    _pair('Break Even Ratio:', '\t{break_even_ratio:>12.1f}%', 'Selling Costs:', ' \t{selling_cost_percentage:>12.0f}%'),
+    _pair('Debt Coverage Ratio:', '\t{debt_coverage_ratio:>12}', 'Depreciation Period:', '\t{depreciation_years:>12.1f}\tYears'),
+    _pair('Debt Yield:', '\t{debt_yield:>13}', 'Land Value:', ' \t${land_value:>12,.0f}'),
+    '',
+    'Cash Flow (Year 1)',
+    '',
+    '\t'.ljust(30) + '\t' + 'Monthly'.rjust(12) + '\t' + 'Yearly'.rjust(12),
+    '\tCASH FLOW',
+    '\tGross Rent:'.ljust(30) + '\t${rent_monthly:>12,.0f}\t${gross_rent_initial:>12,.0f}',
+    '{vacancy_label:<30}\t-${vacancy_loss_monthly:>12,.0f}\t-${vacancy_loss_initial:>12,.0f}',
+    '\tOperating Income:'.ljust(30) + '\t=${egi_monthly:>12,.0f}\t=${egi_initial:>12,.0f}',
+    '{operating_expense_label:<30}\t+${op_exp_monthly:>12,.0f}\t+${op_exp_initial:>12,.0f}',
+    '\tNet Operating Income:'.ljust(30) + '\t=${noi_monthly:>12,.0f}\t=${noi_initial:>12,.0f}',
+    '\tLoan Payments:'.ljust(30) + '\t-${mortgage_monthly:>12,.0f}\t-${loan_payments:>12,.0f}',
+    '\tCash Flow:'.ljust(30) + '\t=${cash_flow_monthly:>12,.0f}\t=${cash_flow:>12,.0f}',
+    '',
+    '\tOPERATING EXPENSES',
+    '\tProperty Taxes:'.ljust(30) + '\t${property_tax_monthly:>12,.0f}\t${property_tax_yr:>12,.0f}',
+    '\tInsurance:'.ljust(30) + '\t${insurance_monthly:>12,.0f}\t${insurance_yearly:>12,.0f}',
+    '\tOwner Paid Utilities:'.ljust(30) + '\t${utilities_monthly:>12,.0f}\t${utilities_yearly:>12,.0f}',
+    '{management_label:<30}\t${management_monthly:>12,.0f}\t${management_yearly:>12,.0f}',
+    '{maintenance_label:<30}\t${maintenance_monthly:>12,.0f}\t${maintenance_yearly:>12,.0f}',
+    '\tTotal:'.ljust(30) + '\t${op_exp_monthly:>12,.0f}\t${op_exp_initial:>12,.0f}',
+    '',
+    'Buy & Hold Projections',
+    '\t' + '\t'.join(name.ljust(15) for name in ('Appreciation', 'Rent Increase', 'Tax Increase',
+                                                  'Insurance Increase', 'Utility Increase', 'Selling Cost')),
+    '\t' + '\t'.join(f'{{{name}:>15.2f}}%' for name in ('appreciation', 'rent_rate_inc', 'property_tax_rate_inc',
+                                                         'insurance_rate_inc', 'utility_rate_inc',
+                                                         'selling_cost_percentage')),
+    ''
+]))
+
+# Summary sections of the Markdown, HTML and CSV targets: (title, column
+# headings, rows of (label, value templates))
+_SUMMARY_SECTIONS = tuple((title, columns, tuple((label, tuple(_compile(value) for value in values))
+                                                 for label, *values in rows))
+                          for title, columns, rows in (
+    ('Property Description', ('Value',), (
+        ('Address', '{street}, {city}, {state_zip}'),
+        ('Property Type', '{property_type}'),
+        ('Square Footage', '{sqft:,.0f}'),
+        ('Beds', '{total_beds}'),
+        ('Baths', '{total_baths}'),
+        ('Year Built', '{year_built}'),
+        ('Parking', '{parking}'),
+        ('Lot Size', '{lot_size:.2f}'))),
+    ('Purchase & Rehab', ('Value',), (
+        ('Purchase Price', '${purchase_price:,.0f}'),
+        ('Amount Financed', '-${loan_amount:,.0f}'),
+        ('Down Payment', '${down_payment:,.0f}'),
+        ('Purchase Cost', '${closing_cost:,.0f}'),
+        ('Rehab Cost', '${initial_improvements:,.0f}'),
+        ('Total Cash Needed', '${initial_cash:,.0f}'),
+        ('After Repair Value', '${arv:,.0f}'),
+        ('ARV per Square Foot', '${arv_per_sqft:,.1f}'),
+        ('Price per Square Foot', '${price_per_sqft:,.1f}'))),
+    ('Financing (Purchase)', ('Value',), (
+        ('Loan Type', '{loan_type}, {loan_term_years} Year'),
+        ('Interest Rate', '{interest_rate:.2f}%'),
+        ('Percent Down', '{percent_down:.2f}%'),
+        ('Loan Amount', '${loan_amount:,.0f}'),
+        ('Loan Payment', '${mortgage_monthly:,.0f} Per Month'),
+        ('', '${mortgage_yearly:,.0f} Per Year'))),
+    ('Returns & Ratios (Year 1)', ('Value',), (
+        ('Cap Rate', '{cap_rate:.1f}%'),
+        ('Cash on Cash Return', '{cash_on_cash_return:.1f}%'),
+        ('Return on Equity', '{return_on_equity:.1f}%'),
+        ('Return on Investment', '{roi:.1f}%'),
+        ('Internal Rate of Return', '{irr:.1f}%'),
+        ('Rent to Value', '{rent_to_value:.1f}%'),
+        ('Gross Rent Multiplier', '{gross_rent_multiplier:.2f}'),
+        ('Equity Multiple', '{equity_multiple:.2f}'),
+        ('Break Even Ratio', '{break_even_ratio:.1f}%'),
+        ('Debt Coverage Ratio', '{debt_coverage_ratio}'),
+        ('Debt Yield', '{debt_yield}'))),
+    ('Assumptions & Projections', ('Value',), (
+        ('Purchase Date', '{purchase_date}'),
+        ('Initial Improvements', '${initial_improvements:,.0f}'),
+        ('Purchase Cost', '${closing_cost:,.0f}'),
+        ('Vacancy Rate', '{vacancy_rate:.0f}%'),
+        ('Appreciation', '{appreciation:.0f}%'),
+        ('Rent Rate Increase', '{rent_rate_inc:.0f}%'),
+        ('Property Tax Increase', '{property_tax_rate_inc:.0f}%'),
+        ('Insurance Rate Increase', '{insurance_rate_inc:.0f}%'),
+        ('Utilities Rate Increase', '{utility_rate_inc:.0f}%'),
+        ('Selling Costs', '{selling_cost_percentage:.0f}%'),
+        ('Depreciation Period', '{depreciation_years:.1f} Years'),
+        ('Land Value', '${land_value:,.0f}'))),
+    ('Cash Flow (Year 1)', ('Monthly', 'Yearly'), (
+        ('Gross Rent', '${rent_monthly:,.0f}', '${gross_rent_initial:,.0f}'),
+        ('Vacancy ({vacancy_rate:.0f}%)', '-${vacancy_loss_monthly:,.0f}', '-${vacancy_loss_initial:,.0f}'),
+        ('Operating Income', '${egi_monthly:,.0f}', '${egi_initial:,.0f}'),
+        ('Operating Expense ({operating_expense_ratio:.0f}%)', '${op_exp_monthly:,.0f}', '${op_exp_initial:,.0f}'),
+        ('Net Operating Income', '${noi_monthly:,.0f}', '${noi_initial:,.0f}'),
+        ('Loan Payments', '-${mortgage_monthly:,.0f}', '-${loan_payments:,.0f}'),
+        ('Cash Flow', '${cash_flow_monthly:,.0f}', '${cash_flow:,.0f}'))),
+    ('Operating Expenses (Year 1)', ('Monthly', 'Yearly'), (
+        ('Property Taxes', '${property_tax_monthly:,.0f}', '${property_tax_yr:,.0f}'),
+        ('Insurance', '${insurance_monthly:,.0f}', '${insurance_yearly:,.0f}'),
+        ('Owner Paid Utilities', '${utilities_monthly:,.0f}', '${utilities_yearly:,.0f}'),
+        ('Property Management ({management_rate:.0f}%)', '${management_monthly:,.0f}', '${management_yearly:,.0f}'),
+        ('Maintenance Reserve ({maintenance_rate:.0f}%)', '${maintenance_monthly:,.0f}', '${maintenance_yearly:,.0f}'),
+        ('Total', '${op_exp_monthly:,.0f}', '${op_exp_initial:,.0f}'))),
+    ('Buy & Hold Assumptions', ('Value',), (
+        ('Appreciation', '{appreciation:.2f}%'),
+        ('Rent Increase', '{rent_rate_inc:.2f}%'),
+        ('Tax Increase', '{property_tax_rate_inc:.2f}%'),
+        ('Insurance Increase', '{insurance_rate_inc:.2f}%'),
+        ('Utility Increase', '{utility_rate_inc:.2f}%'),
+        ('Selling Cost', '{selling_cost_percentage:.2f}%')))
+))
+# Labels with a rate in them are templates too
+_SUMMARY_SECTIONS = tuple((title, columns, tuple((_compile(label), values) for label, values in rows))
+                          for title, columns, rows in _SUMMARY_SECTIONS)
+
+# Buy & Hold projection tables: (title, cell kind, rows of PROJECTION_ROWS labels)
+_PROJECTION_SECTIONS = (
+    ('RENTAL INCOME', 'money', ('Gross Rent', 'Vacancy ({vacancy_rate:.0f}%)', 'Operating Income')),
+    ('OPERATING EXPENSES', 'money', (
+        'Property Taxes', 'Insurance', 'Owner Paid Utilities', 'Property Mgmt ({management_rate:.0f}%)',
+        'Maintenance Reserve ({maintenance_rate:.0f}%)', 'Operating Expenses')),
+    ('CASH FLOW', 'money', ('Operating Income', 'Operating Expenses', 'Net Operating Income', 'Loan Payments',
+                            'Cash Flow')),
+    ('EQUITY ACCUMULATION', 'money', ('Property Value', 'Loan Balance', 'Equity')),
+    ('SALE ANALYSIS (PRE-TAX)', 'money', (
+        'Equity', 'Selling Cost ({selling_cost_percentage:.0f}%)', 'Sale Proceeds', 'Cumulative Operating Income',
+        'Cumulative Operating Expenses', 'Cumulative NOI', 'Cumulative Cash Flow', 'Total Cash Invested',
+        'Total Profit (Pre-Tax)')),
+    ('TAX BENEFITS & DEDUCTIONS', 'money', (
+        'Operating Expenses (Tax)', 'Loan Interest', 'Depreciation', 'Total Deductions', 'Operating Income (Tax)',
+        'Taxable Income', 'Income Tax Due ({income_tax_rate:.0f}%)')),
+    ('CAPITAL GAIN TAX', 'money', (
+        'Original Cost Basis', 'Capital Improvements', 'Cumulative Depreciation', 'Selling Cost (Tax)',
+        'Adjusted Cost Basis', 'Sale Price', 'Capital Gain', 'Tax on Capital Gain (15%)', 'Recapture Tax (25%)')),
+    ('SALE ANALYSIS (POST-TAX)', 'money', (
+        'Total Profit (Pre-Tax, Sale)', 'Cumulative Income Tax Paid', 'Capital Gain Tax Due', 'Recapture Tax Due',
+        'Total Profit (Post-Tax)')),
+    ('INVESTMENT RETURNS', 'percent', (
+        'Cap Rate', 'Cash on Cash Return', 'Return on Equity', 'Return on Investment', 'Internal Rate of Return')),
+    ('FINANCIAL RATIOS', 'ratio', (
+        'Rent to Value', 'Gross Rent Multiplier', 'Equity Multiple', 'Break Even Ratio', 'Debt Coverage Ratio',
+        'Debt Yield'))
+)
+_ROW_INDEX = {label: row for row, (label, _, _) in enumerate(PROJECTION_ROWS)}
+_PERCENT_ROWS = ('Rent to Value', 'Break Even Ratio', 'Debt Yield')
+
+# Format specs of a projection cell in the text report (first) and the other
+# targets, by cell kind; the text width of a cell with no value ('N/A')
+_TEXT_CELLS = {'money': ('${:>12,.0f}', 15), 'percent': ('{:>12.1f}%', 13),
+               'percent_ratio': ('{:>12.1f}%', 12), 'ratio': ('{:>12.2f}', 12)}
+_PLAIN_CELLS = {'money': '${:,.0f}', 'percent': '{:.1f}%', 'percent_ratio': '{:.1f}%', 'ratio': '{:.2f}'}
+_text_rows = {}
+_plain_cells = {kind: _compile(spec.replace('{:', '{0:')) for kind, spec in _PLAIN_CELLS.items()}
+
+def _text_row(kind, num_years):
+    """Compiled text template of a projection row of num_years cells of one kind, built once and kept."""
+    key = (kind, num_years)
+    if key not in _text_rows:
+        spec = _TEXT_CELLS[kind][0]
+        _text_rows[key] = _compile('\t{0:<30}\t' + '\t'.join(spec.replace('{:', f'{{{i}:')
+                                                             for i in range(1, num_years + 1)))
+    return _text_rows[key]
+
+def _cell_kind(section_kind, label):
+    """Cell kind of a projection row: FINANCIAL RATIOS mixes percentages and plain ratios."""
+    if section_kind == 'ratio' and label in _PERCENT_ROWS:
+        return 'percent_ratio'
+    return section_kind
+
+# --------------- Report Data ---------------
+def _report_fields(analysis_data):
+    """Every scalar the report shows, keyed by template field name (rates in percent)."""
     property_info = analysis_data['property_info']
     purchase_info = analysis_data['purchase_info']
     loan_info = analysis_data['loan_info']
     expenses_info = analysis_data['expenses_info']
     rates = analysis_data['rates']
     tax_info = analysis_data['tax_info']
-    derived_values = analysis_data['derived_values']
-    yearly_data = analysis_data['yearly_data']
-    
-    # Create projection dataframe
-    proj_df = create_projection_dataframe(yearly_data, derived_values, rates, tax_info)
-    
-    # Output Generation
+    derived = analysis_data['derived_values']
+    year_1 = {name: float(values[0]) for name, values in
+              metric_columns(analysis_data['yearly_data'], _YEAR_1_METRICS, [1]).items()}
+
     address = f"{property_info['street']}, {property_info['city']}, {property_info['state']} {property_info['zip_code']}"
-    initial_cash = derived_values['total_cash_invested']
+    initial_cash = derived['total_cash_invested']
     arv = purchase_info['purchase_price'] + purchase_info['initial_improvements']
+    sqft = property_info['sqft']
+    gross_rent_initial = derived['gross_rent_initial']
+    egi_initial = derived['egi_initial']
+    management_rate = expenses_info['management_rate']
+    maintenance_rate = expenses_info['maintenance_rate']
+    operating_expense_ratio = derived['op_exp_initial'] / egi_initial * 100 if egi_initial > 0 else 0
+    debt_coverage_ratio = year_1['debt_coverage_ratio']
+    debt_yield = year_1['debt_yield']
+    return {
+        'title': 'Investment Analysis for ' + address,
+        'address': address,
+        'subtitle': 'Investment Property - Rental',
+        'description_title': 'Property Description',
+        'property_type': property_info['property_type'],
+        'total_beds': property_info['total_beds'],
+        'total_baths': property_info['total_baths'],
+        'sqft': sqft,
+        'street': property_info['street'],
+        'city': property_info['city'],
+        'state_zip': f"{property_info['state']} {property_info['zip_code']}",
+        'year_built': property_info['year_built'],
+        'parking': property_info['parking'],
+        'lot_size': property_info['lot_size'],
+        'purchase_price': purchase_info['purchase_price'],
+        'closing_cost': purchase_info['closing_cost'],
+        'initial_improvements': purchase_info['initial_improvements'],
+        'purchase_date': purchase_info['purchase_date'],
+        'rent_monthly': purchase_info['rent_monthly'],
+        'initial_cash': initial_cash,
+        'arv': arv,
+        'arv_per_sqft': arv / sqft if sqft else float('nan'),
+        'price_per_sqft': purchase_info['purchase_price'] / sqft if sqft else float('nan'),
+        'loan_type': 'Amortizing' if not loan_info['interest_only'] else 'Interest Only',
+        'loan_term_years': loan_info['loan_term_years'],
+        'interest_rate': loan_info['interest_rate'] * 100,
+        'percent_down': loan_info['percent_down'] * 100,
+        'loan_amount': derived['loan_amount'],
+        'down_payment': derived['down_payment'],
+        'mortgage_monthly': derived['mortgage_monthly'],
+        'mortgage_yearly': derived['mortgage_monthly'] * 12,
+        'cash_flow': year_1['cash_flow_before_tax'],
+        'cash_flow_monthly': year_1['cash_flow_before_tax'] / 12,
+        'loan_payments': year_1['loan_payments'],
+        'cap_rate': year_1['cap_rate_annual'] * 100,
+        'cash_on_cash_return': year_1['cash_on_cash_return'] * 100,
+        'return_on_equity': year_1['return_on_equity'] * 100,
+        'roi': year_1['roi_pre_tax'] * 100,
+        'irr': year_1['irr_before_tax'] * 100,
+        'rent_to_value': year_1['rent_to_value'] * 100,
+        'gross_rent_multiplier': year_1['gross_rent_multiplier'],
+        'equity_multiple': year_1['equity_multiplier'],
+        'break_even_ratio': year_1['break_even_ratio'] * 100,
+        # 'N/A' without loan payments
+        'debt_coverage_ratio': 'N/A' if debt_coverage_ratio != debt_coverage_ratio else f'{debt_coverage_ratio:.2f}',
+        'debt_yield': 'N/A' if debt_yield != debt_yield else f'{debt_yield * 100:.1f}%',
+        'vacancy_rate': expenses_info['vacancy_rate'] * 100,
+        'management_rate': management_rate * 100,
+        'maintenance_rate': maintenance_rate * 100,
+        'appreciation': rates['appreciation'] * 100,
+        'rent_rate_inc': rates['rent_rate_inc'] * 100,
+        'property_tax_rate_inc': rates['property_tax_rate_inc'] * 100,
+        'insurance_rate_inc': rates['insurance_rate_inc'] * 100,
+        'utility_rate_inc': rates['utility_rate_inc'] * 100,
+        'selling_cost_percentage': tax_info['selling_cost_percentage'] * 100,
+        'depreciation_years': tax_info['depreciation_years'],
+        'land_value': purchase_info['purchase_price'] * (1 - tax_info['improved_value_ratio']),
+        'gross_rent_initial': gross_rent_initial,
+        'vacancy_loss_initial': derived['vacancy_loss_initial'],
+        'vacancy_loss_monthly': derived['vacancy_loss_initial'] / 12,
+        'egi_initial': egi_initial,
+        'egi_monthly': egi_initial / 12,
+        'operating_expense_ratio': operating_expense_ratio,
+        'op_exp_initial': derived['op_exp_initial'],
+        'op_exp_monthly': derived['op_exp_initial'] / 12,
+        'noi_initial': derived['noi_initial'],
+        'noi_monthly': derived['noi_initial'] / 12,
+        'property_tax_monthly': derived['property_tax_monthly'],
+        'property_tax_yr': expenses_info['property_tax_yr'],
+        'insurance_monthly': derived['insurance_monthly'],
+        'insurance_yearly': derived['insurance_monthly'] * 12,
+        'utilities_monthly': derived['owner_paid_utilities_monthly'],
+        'utilities_yearly': derived['owner_paid_utilities_monthly'] * 12,
+        'management_monthly': purchase_info['rent_monthly'] * management_rate,
+        'management_yearly': gross_rent_initial * management_rate,
+        'maintenance_monthly': purchase_info['rent_monthly'] * maintenance_rate,
+        'maintenance_yearly': gross_rent_initial * maintenance_rate,
+        'vacancy_label': f"\tVacancy ({expenses_info['vacancy_rate'] * 100:.0f}%):",
+        'operating_expense_label': f'\tOperating Expense ({operating_expense_ratio:.0f}%):',
+        'management_label': f'\tProperty Management ({management_rate * 100:.0f}%):',
+        'maintenance_label': f'\tMaintenance Reserve ({maintenance_rate * 100:.0f}%):'
+    }
 
-    # Header and Summary
-    print(f"\n{'Investment Analysis for ' + address:^{80}}\n")
-    print(f"{address:^{80}}")
-    print(f"{'Investment Property - Rental':^{80}}\n")
-    print(f"{property_info['property_type']}   ·   {property_info['total_beds']} Beds   ·   {property_info['total_baths']} Baths   ·   {property_info['sqft']:,.0f} Sq.Ft.\n")
-    print(f"${purchase_info['purchase_price']:,.0f} Purchase Price")
-    print(
-        f"${initial_cash:,.0f} Cash Needed   ·   ${yearly_data[1]['cash_flow_before_tax'] / 12:,.0f}/mo Cash Flow   ·   {yearly_data[1]['cap_rate_annual'] * 100:.1f}% Cap Rate   ·   {yearly_data[1]['cash_on_cash_return'] * 100:.1f}% COC\n")
-
-    print(f"{'Property Description':^{80}}\n")
-    print(f"ADDRESS".ljust(20))
-    print(f"{property_info['street']}".ljust(20))
-    print(f"{property_info['city']}".ljust(20))
-    print(f"{property_info['state']} {property_info['zip_code']}".ljust(20) + "\n")
-    print("DESCRIPTION")
-    print(f"Property Type:".ljust(20) + f"\t{property_info['property_type']:>15}")
-    print(f"Square Footage:".ljust(20) + f"\t{property_info['sqft']:>15,.0f}")
-    print(f"Beds:".ljust(20) + f"\t{property_info['total_beds']:>15}")
-    print(f"Baths:".ljust(20) + f"\t{property_info['total_baths']:>15}")
-    print(f"Year Built:".ljust(20) + f"\t{property_info['year_built']:>15}")
-    print(f"Parking:".ljust(20) + f"\t{property_info['parking']:>15}")
-    print(f"Lot Size:".ljust(20) + f"\t{property_info['lot_size']:>15.2f}\n")
-    print("\t\t\tClick for Map\n")
-
-    # Purchase Analysis & Return
-    print("Purchase Analysis & Return")
-    print("\tPURCHASE & REHAB".ljust(43) + "\t" + "FINANCING (PURCHASE)".ljust(30))
-    print(f"Purchase Price:".ljust(30) + f"\t${purchase_info['purchase_price']:>12,.0f}" + "\t" + f"Loan Type:".ljust(30) + f"\t{'Amortizing' if not loan_info['interest_only'] else 'Interest Only'}, {loan_info['loan_term_years']} Year".rjust(15))
-    print(f"Amount Financed:".ljust(30) + f"\t-${derived_values['loan_amount']:>12,.0f}" + "\t" + f"Interest Rate:".ljust(30) + f"\t{loan_info['interest_rate'] * 100:>12.2f}%".rjust(15))
-    print(f"Down Payment:".ljust(30) + f"\t=${derived_values['down_payment']:>12,.0f}" + "\t" + f"Percent Down:".ljust(30) + f"\t{loan_info['percent_down'] * 100:>12.2f}%".rjust(15))
-    print(f"Purchase Cost:".ljust(30) + f"\t+${purchase_info['closing_cost']:>12,.0f}" + "\t" + f"Loan Amount:".ljust(30) + f"\t${derived_values['loan_amount']:>12,.0f}".rjust(15))
-    print(f"Rehab Cost:".ljust(30) + f"\t+${purchase_info['initial_improvements']:>12,.0f}" + "\t" + f"Loan Payment:".ljust(30) + f"\t${derived_values['mortgage_monthly']:>12,.0f} Per Month".rjust(15))
-    print(f"Total Cash Needed:".ljust(30) + f"\t=${initial_cash:>12,.0f}" + "\t" + "".ljust(30) + f"\t${derived_values['mortgage_monthly'] * 12:>12,.0f} Per Year".rjust(15))
-    print(f"\nAfter Repair Value:".ljust(30) + f"\t${arv:>12,.0f}")
-    print(f"ARV per Square Foot:".ljust(30) + f"\t${arv / property_info['sqft']:>12,.1f}")
-    print(f"Price per Square Foot:".ljust(30) + f"\t${purchase_info['purchase_price'] / property_info['sqft']:>12,.1f}\n")
-
-    print("RETURNS & RATIOS (Year 1)".ljust(45) + "\t" + "ASSUMPTIONS & PROJECTIONS".ljust(30))
-    print(f"Cap Rate:".ljust(30) + f"\t{yearly_data[1]['cap_rate_annual'] * 100:>12.1f}%" + "\t" + f"Purchase Date:".ljust(30) + f"\t{purchase_info['purchase_date']:>15}".rjust(15))
-    print(f"Cash on Cash Return:".ljust(30) + f"\t{yearly_data[1]['cash_on_cash_return'] * 100:>12.1f}%" + "\t" + f"Initial Improvements:".ljust(30) + f"\t${purchase_info['initial_improvements']:>12,.0f}".rjust(15))
-    print(f"Return on Equity:".ljust(30) + f"\t{yearly_data[1]['return_on_equity'] * 100:>12.1f}%" + "\t" + f"Purchase Cost:".ljust(30) + f"\t${purchase_info['closing_cost']:>12,.0f}".rjust(15))
-    print(f"Return on Investment:".ljust(30) + f"\t{yearly_data[1]['roi_pre_tax'] * 100:>12.1f}%" + "\t" + f"Vacancy Rate:".ljust(30) + f"\t{expenses_info['vacancy_rate'] * 100:>12.0f}%".rjust(15))
-    print(f"Internal Rate of Return:".ljust(30) + f"\t{yearly_data[1]['irr_before_tax'] * 100:>12.1f}%" + "\t" + f"Appreciation:".ljust(30) + f"\t{rates['appreciation'] * 100:>12.0f}%".rjust(15))
-    print("".ljust(30) + "\t" + "".rjust(15) + "\t" + f"Rent Rate Increase:".ljust(30) + f"\t{rates['rent_rate_inc'] * 100:>12.0f}%".rjust(15))
-    print(f"Rent to Value:".ljust(30) + f"\t{yearly_data[1]['rent_to_value'] * 100:>12.1f}%" + "\t" + f"Property Tax Increase:".ljust(30) + f"\t{rates['property_tax_rate_inc'] * 100:>12.0f}%".rjust(15))
-    print(f"Gross Rent Multiplier:".ljust(30) + f"\t{yearly_data[1]['gross_rent_multiplier']:>12.2f}" + "\t" + f"Insurance Rate Increase:".ljust(30) + f"\t{rates['insurance_rate_inc'] * 100:>12.0f}%".rjust(15))
-    print(f"Equity Multiple:".ljust(30) + f"\t{yearly_data[1]['equity_multiplier']:>12.2f}" + "\t" + f"Utilities Rate Increase:".ljust(30) + f"\t{rates['utility_rate_inc'] * 100:>12.0f}%".rjust(15))
-    print(f"Break Even Ratio:".ljust(30) + f"\t{yearly_data[1]['break_even_ratio'] * 100:>12.1f}%" + "\t" + f"Selling Costs:".ljust(30) + f"\t{tax_info['selling_cost_percentage'] * 100:>12.0f}%".rjust(15))
-    print(f"Debt Coverage Ratio:".ljust(30) + f"\t{yearly_data[1]['debt_coverage_ratio']:>12.2f}" + "\t" + f"Depreciation Period:".ljust(30) + f"\t{tax_info['depreciation_years']:>12.1f}\tYears".rjust(15))
-    print(f"Debt Yield:".ljust(30) + f"\t{yearly_data[1]['debt_yield'] * 100:>12.1f}%" + "\t" + f"Land Value:".ljust(30) + f"\t${purchase_info['purchase_price'] * (1 - tax_info['improved_value_ratio']):>12,.0f}".rjust(15))
-
-    # Cash Flow (Year 1)
-    print("\nCash Flow (Year 1)\n")
-    print("\t".ljust(30) + "\t" + "Monthly".rjust(12) + "\t" + "Yearly".rjust(12))
-    print("\tCASH FLOW")
-    print(f"\tGross Rent:".ljust(30) + f"\t${purchase_info['rent_monthly']:>12,.0f}" + f"\t${derived_values['gross_rent_initial']:>12,.0f}")
-    print(f"\tVacancy ({expenses_info['vacancy_rate'] * 100:.0f}%):".ljust(30) + f"\t-${derived_values['vacancy_loss_initial'] / 12:>12,.0f}" + f"\t-${derived_values['vacancy_loss_initial']:>12,.0f}")
-    print(f"\tOperating Income:".ljust(30) + f"\t=${derived_values['egi_initial'] / 12:>12,.0f}" + f"\t=${derived_values['egi_initial']:>12,.0f}")
-    print(f"\tOperating Expense ({derived_values['op_exp_initial'] / derived_values['egi_initial'] * 100 if derived_values['egi_initial'] > 0 else 0:.0f}%):".ljust(30) + f"\t+${derived_values['op_exp_initial'] / 12:>12,.0f}" + f"\t+${derived_values['op_exp_initial']:>12,.0f}")
-    print(f"\tNet Operating Income:".ljust(30) + f"\t=${derived_values['noi_initial'] / 12:>12,.0f}" + f"\t=${derived_values['noi_initial']:>12,.0f}")
-    print(f"\tLoan Payments:".ljust(30) + f"\t-${derived_values['mortgage_monthly']:>12,.0f}" + f"\t-${yearly_data[1]['loan_payments']:>12,.0f}")
-    print(f"\tCash Flow:".ljust(30) + f"\t=${yearly_data[1]['cash_flow_before_tax'] / 12:>12,.0f}" + f"\t=${yearly_data[1]['cash_flow_before_tax']:>12,.0f}\n")
-    print("\tOPERATING EXPENSES")
-    print(f"\tProperty Taxes:".ljust(30) + f"\t${derived_values['property_tax_monthly']:>12,.0f}" + f"\t${expenses_info['property_tax_yr']:>12,.0f}")
-    print(f"\tInsurance:".ljust(30) + f"\t${derived_values['insurance_monthly']:>12,.0f}" + f"\t${derived_values['insurance_monthly'] * 12:>12,.0f}")
-    print(f"\tOwner Paid Utilities:".ljust(30) + f"\t${derived_values['owner_paid_utilities_monthly']:>12,.0f}" + f"\t${derived_values['owner_paid_utilities_monthly'] * 12:>12,.0f}")
-    print(f"\tProperty Management ({expenses_info['management_rate'] * 100:.0f}%):".ljust(30) + f"\t${purchase_info['rent_monthly'] * expenses_info['management_rate']:>12,.0f}" + f"\t${derived_values['gross_rent_initial'] * expenses_info['management_rate']:>12,.0f}")
-    print(f"\tMaintenance Reserve ({expenses_info['maintenance_rate'] * 100:.0f}%):".ljust(30) + f"\t${purchase_info['rent_monthly'] * expenses_info['maintenance_rate']:>12,.0f}" + f"\t${derived_values['gross_rent_initial'] * expenses_info['maintenance_rate']:>12,.0f}")
-    print(f"\tTotal:".ljust(30) + f"\t${derived_values['op_exp_initial'] / 12:>12,.0f}" + f"\t${derived_values['op_exp_initial']:>12,.0f}")
-
-    # Buy & Hold Projections
-    proj_years = [1, 5, 10, 20, 30]
-    
-    print("\nBuy & Hold Projections")
-    print("\t" + "\t".join([
-        f"Appreciation".ljust(15),
-        f"Rent Increase".ljust(15),
-        f"Tax Increase".ljust(15),
-        f"Insurance Increase".ljust(15),
-        f"Utility Increase".ljust(15),
-        f"Selling Cost".ljust(15)
-    ]))
-    print("\t" + "\t".join([
-        f"{rates['appreciation'] * 100:>15.2f}%",
-        f"{rates['rent_rate_inc'] * 100:>15.2f}%",
-        f"{rates['property_tax_rate_inc'] * 100:>15.2f}%",
-        f"{rates['insurance_rate_inc'] * 100:>15.2f}%",
-        f"{rates['utility_rate_inc'] * 100:>15.2f}%",
-        f"{tax_info['selling_cost_percentage'] * 100:>15.2f}%"
-    ]))
-    print("\n\t\t\t\t" + "\t".join([f"Year {y}".rjust(15) for y in proj_years]))
-    print("RENTAL INCOME")
-    vacancy_rate_pct = expenses_info['vacancy_rate'] * 100
-    for idx in ['Gross Rent', f'Vacancy ({vacancy_rate_pct:.0f}%)', 'Operating Income']:
-        row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-        print("\t" + "\t".join(row))
-    print("\nOPERATING EXPENSES")
-    management_rate_pct = expenses_info['management_rate'] * 100
-    maintenance_rate_pct = expenses_info['maintenance_rate'] * 100
-    for idx in ['Property Taxes', 'Insurance', 'Owner Paid Utilities',
-                f'Property Mgmt ({management_rate_pct:.0f}%)',
-                f'Maintenance Reserve ({maintenance_rate_pct:.0f}%)', 'Operating Expenses']:
-        row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-        print("\t" + "\t".join(row))
-    print("\nCASH FLOW")
-    for idx in ['Operating Income', 'Operating Expenses', 'Net Operating Income', 'Loan Payments', 'Cash Flow']:
-        row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-        print("\t" + "\t".join(row))
-    print("\nEQUITY ACCUMULATION")
-    for idx in ['Property Value', 'Loan Balance', 'Equity']:
-        row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-        print("\t" + "\t".join(row))
-    print("\nSALE ANALYSIS (PRE-TAX)")
-    selling_cost_pct = tax_info['selling_cost_percentage'] * 100
-    for idx in ['Equity', f'Selling Cost ({selling_cost_pct:.0f}%)', 'Sale Proceeds',
-                'Cumulative Operating Income', 'Cumulative Operating Expenses', 'Cumulative NOI',
-                'Cumulative Cash Flow', 'Total Cash Invested', 'Total Profit (Pre-Tax)']:
-        row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-        print("\t" + "\t".join(row))
-    print("\nTAX BENEFITS & DEDUCTIONS")
-    income_tax_rate_pct = tax_info['income_tax_rate'] * 100
-    for idx in ['Operating Expenses (Tax)', 'Loan Interest', 'Depreciation', 'Total Deductions',
-                'Operating Income (Tax)', 'Taxable Income', f'Income Tax Due ({income_tax_rate_pct:.0f}%)']:
-        row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-        print("\t" + "\t".join(row))
-    print("\nCAPITAL GAIN TAX")
-    for idx in ['Original Cost Basis', 'Capital Improvements', 'Cumulative Depreciation', 'Selling Cost (Tax)',
-                'Adjusted Cost Basis', 'Sale Price', 'Capital Gain', 'Tax on Capital Gain (15%)',
-                'Recapture Tax (25%)']:
-        row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-        print("\t" + "\t".join(row))
-    print("\nSALE ANALYSIS (POST-TAX)")
-    for idx in ['Total Profit (Pre-Tax, Sale)', 'Cumulative Income Tax Paid', 'Capital Gain Tax Due',
-                'Recapture Tax Due', 'Total Profit (Post-Tax)']:
-        row = [idx.ljust(30)] + [f"${x:>12,.0f}" if isinstance(x, (int, float)) else str(x).rjust(15) for x in proj_df.loc[idx]]
-        print("\t" + "\t".join(row))
-    print("\nINVESTMENT RETURNS")
-    for idx in ['Cap Rate', 'Cash on Cash Return', 'Return on Equity', 'Return on Investment',
-                'Internal Rate of Return']:
-        row = [idx.ljust(30)] + [f"{x:>12.1f}%" for x in proj_df.loc[idx]]
-        print("\t" + "\t".join(row))
-    print("\nFINANCIAL RATIOS")
-    for idx in ['Rent to Value', 'Gross Rent Multiplier', 'Equity Multiple', 'Break Even Ratio',
-                'Debt Coverage Ratio', 'Debt Yield']:
-        row = [idx.ljust(30)] + [
-            f"{x:>12.1f}%" if idx in ['Rent to Value', 'Break Even Ratio', 'Debt Yield']
-            else f"{x:>12.2f}" if idx in ['Gross Rent Multiplier', 'Equity Multiple', 'Debt Coverage Ratio']
-            else str(x).rjust(15) for x in proj_df.loc[idx]]
-        print("\t" + "\t".join(row))
+def _projection_table(analysis_data, proj_years):
+    """The projection matrix, labelled with the expense rates the form was analyzed with."""
+    rates = dict(analysis_data['rates'], **analysis_data['expenses_info'])
+    return projection_matrix(analysis_data['yearly_data'], analysis_data['derived_values'], rates,
+                             analysis_data['tax_info'], proj_years)
+
+def _projection_rows(table, kind, labels):
+    """(label, values, missing) of the projection rows with the given PROJECTION_ROWS labels."""
+    for label in labels:
+        row = _ROW_INDEX[label]
+        yield table['labels'][row], table['values'][row], table['missing'][row]
+
+# --------------- Renderers ---------------
+def _render_text(out, fields, table):
+    """The plain-text report, laid out as the CLI has always printed it."""
+    out.write(_TEXT_SUMMARY(fields))
+    out.write('\n\t\t\t\t' + '\t'.join(f'Year {y}'.rjust(15) for y in table['years']) + '\n')
+    for number, (title, section_kind, labels) in enumerate(_PROJECTION_SECTIONS):
+        out.write(('\n' if number else '') + title + '\n')
+        for label, values, missing in _projection_rows(table, section_kind, labels):
+            kind = _cell_kind(section_kind, label)
+            if not missing.any():
+                out.write(_text_row(kind, len(values))((label, *values.tolist())) + '\n')
+                continue
+            spec, width = _TEXT_CELLS[kind]
+            cells = ['N/A'.rjust(width) if absent else spec.format(value)
+                     for value, absent in zip(values.tolist(), missing.tolist())]
+            out.write('\t' + label.ljust(30) + '\t' + '\t'.join(cells) + '\n')
+
+def _report_sections(fields, table):
+    """
+    The report as (title, column headings, rows of (label, cells)) sections
+    with display strings, shared by the Markdown, HTML and CSV targets.
+    """
+    for title, columns, rows in _SUMMARY_SECTIONS:
+        yield title, columns, [(label(fields), [value(fields) for value in values]) for label, values in rows]
+    columns = [f'Year {y}' for y in table['years']]
+    for title, section_kind, labels in _PROJECTION_SECTIONS:
+        rows = []
+        for label, values, missing in _projection_rows(table, section_kind, labels):
+            cell = _plain_cells[_cell_kind(section_kind, label)]
+            rows.append((label, ['N/A' if absent else cell((value,))
+                                 for value, absent in zip(values.tolist(), missing.tolist())]))
+        yield title.title(), columns, rows
+
+def _markdown_escape(text):
+    """Escape the characters that would break a Markdown table cell."""
+    return text.replace('\\', '\\\\').replace('|', '\\|')
+
+def _render_markdown(out, fields, table):
+    """The report as Markdown: a heading and one table per section."""
+    out.write(f"# {_markdown_escape(fields['title'])}\n\n{fields['subtitle']}\n")
+    for title, columns, rows in _report_sections(fields, table):
+        out.write(f'\n## {title}\n\n| | ' + ' | '.join(columns) + ' |\n|---|' + '---:|' * len(columns) + '\n')
+        for label, cells in rows:
+            out.write('| ' + _markdown_escape(label) + ' | ' + ' | '.join(map(_markdown_escape, cells)) + ' |\n')
+
+def _render_html(out, fields, table):
+    """The report as an HTML fragment: a heading and one table per section."""
+    out.write(f"<h1>{html.escape(fields['title'])}</h1>\n<p>{html.escape(fields['subtitle'])}</p>\n")
+    for title, columns, rows in _report_sections(fields, table):
+        out.write(f'<h2>{html.escape(title)}</h2>\n<table>\n<tr><th></th>' +
+                  ''.join(f'<th>{html.escape(column)}</th>' for column in columns) + '</tr>\n')
+        for label, cells in rows:
+            out.write(f'<tr><th>{html.escape(label)}</th>' +
+                      ''.join(f'<td>{html.escape(cell)}</td>' for cell in cells) + '</tr>\n')
+        out.write('</table>\n')
+
+def _render_csv(out, fields, table):
+    """The report as CSV rows (see CSV_COLUMNS), without the header row."""
+    writer = csv.writer(out, lineterminator='\n')
+    for title, columns, rows in _report_sections(fields, table):
+        for label, cells in rows:
+            writer.writerows((fields['address'], title, label, column, cell) for column, cell in zip(columns, cells))
+
+_RENDERERS = {'text': _render_text, 'markdown': _render_markdown, 'html': _render_html, 'csv': _render_csv}
+
+def render_investment_report(analysis_data, fmt='text', proj_years=PROJECTION_YEARS, out=None):
+    """
+    Render the complete investment analysis report into one buffer.
+    The report is assembled from templates compiled once at import, so
+    rendering it (or thousands of them) does no template parsing and no
+    per-cell type checks: rows without an 'N/A' value are formatted by a
+    single compiled row template.
+    Args:
+        analysis_data (dict): Output of analyze_property_investment (nested or columnar yearly_data).
+        fmt (str): One of REPORT_FORMATS.
+        proj_years (list): Years shown in the Buy & Hold Projections.
+        out: Text buffer to append to; a new one is used when None.
+    Returns:
+        str: The rendered report (only what this call appended when out is given).
+    """
+    if fmt not in _RENDERERS:
+        raise ValueError(f"Unknown report format '{fmt}'; expected one of {', '.join(REPORT_FORMATS)}")
+    buffer = io.StringIO()
+    _RENDERERS[fmt](buffer, _report_fields(analysis_data), _projection_table(analysis_data, proj_years))
+    report = buffer.getvalue()
+    if out is not None:
+        out.write(report)
+    return report
+
+def write_investment_reports(analyses, file=None, fmt='text', proj_years=PROJECTION_YEARS):
+    """
+    Render many reports in a loop and write each with a single write call.
+    CSV output gets one header row for all the reports.
+    Args:
+        analyses (iterable): analyze_property_investment outputs.
+        file: Text stream to write to; defaults to standard output.
+        fmt (str): One of REPORT_FORMATS.
+        proj_years (list): Years shown in the Buy & Hold Projections.
+    Returns:
+        int: Number of reports written.
+    """
+    file = sys.stdout if file is None else file
+    if fmt == 'csv':
+        file.write(','.join(CSV_COLUMNS) + '\n')
+    count = 0
+    for analysis_data in analyses:
+        file.write(render_investment_report(analysis_data, fmt, proj_years))
+        count += 1
+    return count
+
+def generate_investment_report(analysis_data, proj_years=PROJECTION_YEARS, fmt='text', file=None):
+    """
+    Generate the complete investment analysis report.
+    proj_years are the years shown in the Buy & Hold Projections. The report
+    is rendered into one buffer and written to file (standard output by
+    default) at once.
+    """
+    (sys.stdout if file is None else file).write(render_investment_report(analysis_data, fmt, proj_years))
@@ -0,0 +1,163 @@
+import json
+import numpy as np
+from projection_calculations import yearly_columns_to_rows
+
+# Optional encoders; the formats they provide are only offered when installed
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Response format -> media type. 'json' is the compact columnar shape,
+# 'nested' the {year: {metric: value}} yearly_data shape. 'ndjson' and 'sse'
+# stream one record at a time (see encode_stream).
+FORMATS = {
+    'json': 'application/json',
+    'nested': 'application/json',
+    'msgpack': 'application/msgpack',
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream'
+}
+_ACCEPTED_TYPES = {
+    'application/json': 'json',
+    'application/msgpack': 'msgpack',
+    'application/x-msgpack': 'msgpack',
+    'application/vnd.apache.arrow.stream': 'arrow',
+    'application/x-ndjson': 'ndjson',
+    'text/event-stream': 'sse'
+}
+# Streaming formats, only offered by endpoints that ask for them
+STREAM_FORMATS = ('ndjson', 'sse')
+
+class FormatError(ValueError):
+    """The requested response format is unknown or its encoder is not installed."""
+
+def available_formats():
+    """Formats that can be produced with the installed packages."""
+    return [fmt for fmt in FORMATS if (fmt != 'msgpack' or msgpack) and (fmt != 'arrow' or pa)]
+
+def negotiate_format(requested=None, accept_mimetypes=None, formats=None):
+    """
+    Pick the response format: an explicit ?format= value wins, otherwise the
+    best match for the Accept header, otherwise compact JSON.
+    Args:
+        requested (str): Value of the format query parameter, if any.
+        accept_mimetypes: The request's Accept header (werkzeug MIMEAccept).
+        formats (list): Formats the endpoint supports; defaults to every format but STREAM_FORMATS.
+    Returns:
+        str: One of FORMATS.
+    """
+    formats = formats or [fmt for fmt in FORMATS if fmt not in STREAM_FORMATS]
+    formats = [fmt for fmt in formats if fmt in available_formats()]
+    if requested:
+        if requested not in FORMATS:
+            raise FormatError(f"Unknown format '{requested}'; expected one of {', '.join(FORMATS)}")
+        if requested not in formats:
+            raise FormatError(f"Format '{requested}' is not available")
+        return requested
+    if accept_mimetypes is not None:
+        offered = [media for media, fmt in _ACCEPTED_TYPES.items() if fmt in formats]
+        best = accept_mimetypes.best_match(offered)
+        if best is not None:
+            return _ACCEPTED_TYPES[best]
+    return 'json'
+
+def _column_list(values):
+    """Convert a metric array to a list with None in place of NaN."""
+    column = values.tolist()
+    missing = np.flatnonzero(np.isnan(values))
+    for position in missing.tolist():
+        column[position] = None
+    return column
+
+def compact_analysis(analysis):
+    """Analysis with columnar yearly_data as plain lists: {'years': [...], 'columns': {metric: [...]}}."""
+    yearly = analysis['yearly_data']
+    compact = dict(analysis)
+    compact['yearly_data'] = {
+        'years': yearly['years'],
+        'columns': {name: _column_list(values) for name, values in yearly['columns'].items()}
+    }
+    return compact
+
+def compact_monthly(monthly):
+    """Monthly analysis with its metric arrays as plain lists and None in place of NaN."""
+    compact = dict(monthly)
+    compact['monthly_data'] = {name: _column_list(values) for name, values in monthly['monthly_data'].items()}
+    compact['sale'] = {name: None if value != value else value for name, value in monthly['sale'].items()}
+    return compact
+
+def nested_analysis(analysis):
+    """Analysis with columnar yearly_data turned back into {year: {metric: value}} dicts."""
+    nested = dict(analysis)
+    nested['yearly_data'] = yearly_columns_to_rows(analysis['yearly_data'])
+    return nested
+
+def encode_analysis(property_data, results, fmt, dumps=json.dumps):
+    """
+    Serialize an /analyze response.
+    Args:
+        property_data (dict): Analysis with columnar yearly_data.
+        results (dict): Frontend results object; None leaves it out.
+        fmt (str): One of available_formats().
+        dumps (callable): JSON encoder for the JSON formats.
+    Returns:
+        bytes: The encoded response body.
+    """
+    if fmt == 'arrow':
+        return _arrow_stream(property_data, results, dumps)
+    if fmt == 'nested':
+        property_data = nested_analysis(property_data)
+    else:
+        property_data = compact_analysis(property_data)
+    body = {'propertyData': property_data}
+    if results is not None:
+        body['results'] = results
+    return encode_body(body, fmt, dumps)
+
+def encode_body(body, fmt, dumps=json.dumps):
+    """Serialize a response body already in JSON-compatible form as JSON or msgpack."""
+    if fmt == 'msgpack':
+        return msgpack.packb(body)
+    return dumps(body).encode('utf-8')
+
+def _arrow_stream(property_data, results, dumps):
+    """
+    Arrow IPC stream of one table: a 'year' column and one float64 column per
+    metric. The rest of propertyData and the results object (if any) travel as
+    JSON in the schema metadata.
+    """
+    yearly = property_data['yearly_data']
+    table = pa.table({'year': pa.array(yearly['years'], type=pa.int32()),
+                      **{name: pa.array(values, type=pa.float64()) for name, values in yearly['columns'].items()}})
+    other = {key: value for key, value in property_data.items() if key != 'yearly_data'}
+    metadata = {'propertyData': dumps(other)}
+    if results is not None:
+        metadata['results'] = dumps(results)
+    table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def encode_stream(records, fmt, dumps=json.dumps):
+    """
+    Serialize records one at a time, as each one arrives.
+    Args:
+        records (iterable): (event, body) pairs; body is in JSON-compatible form.
+        fmt (str): 'ndjson' (one JSON body per line; the event is left out)
+            or 'sse' (Server-Sent Events: an 'event:' and a 'data:' line each).
+        dumps (callable): JSON encoder.
+    Returns:
+        generator: The encoded records, as bytes.
+    """
+    for event, body in records:
+        if fmt == 'sse':
+            yield f'event: {event}\ndata: {dumps(body)}\n\n'.encode('utf-8')
+        else:
+            yield (dumps(body) + '\n').encode('utf-8')
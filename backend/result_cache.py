@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+class ResultCache:
+    """
+    Thread-safe in-process cache with a size bound, least-recently-used
+    eviction and an optional time-to-live, counting hits and misses.
+    Keys can be any hashable value, e.g. a PropertyInputs.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, clock=time.monotonic):
+        """
+        Args:
+            max_size (int): Most entries kept; the least recently used is evicted beyond it.
+            ttl (float): Seconds an entry stays valid; None keeps entries until evicted.
+            clock (callable): Time source, in seconds.
+        """
+        if max_size < 1:
+            raise ValueError('max_size must be positive')
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the value stored under key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """Store value under key as the most recently used entry."""
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry; the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Current size and hit / miss / eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,107 @@
+import math
+import numpy as np
+from property_inputs import FORM_INPUT_PATHS, INTEGER_INPUTS, parse_property_inputs
+from projection_calculations import YEARLY_METRICS, project_investment
+from property_analysis import report_years
+
+DEFAULT_METRICS = ('irr_before_tax', 'cash_on_cash_return')
+DEFAULT_DELTA = 0.10
+
+def _parse_perturbations(inputs, base_inputs, delta, mode):
+    """
+    Validate the inputs of a sensitivity request and work out their low / high values.
+    Args:
+        inputs (list): Form paths (e.g. 'loan_info.interest_rate') or objects
+            {'path': ..., optional 'delta', optional 'mode'}.
+        base_inputs (dict): Point estimates for every projection input.
+        delta (float): Default perturbation size.
+        mode (str): Default perturbation mode, 'relative' (value * (1 +/- delta))
+            or 'absolute' (value +/- delta).
+    Returns:
+        list: (path, input name, low value, high value) per input.
+    """
+    if not isinstance(inputs, list) or not inputs:
+        raise ValueError('At least one input path is required')
+    perturbations = []
+    for item in inputs:
+        settings = item if isinstance(item, dict) else {'path': item}
+        path = settings.get('path')
+        if path not in FORM_INPUT_PATHS:
+            raise ValueError(f"Unknown input path '{path}'")
+        name = FORM_INPUT_PATHS[path]
+        size = float(settings.get('delta', delta))
+        how = settings.get('mode', mode)
+        base = float(base_inputs[name])
+        if how == 'relative':
+            low, high = base * (1 - size), base * (1 + size)
+        elif how == 'absolute':
+            low, high = base - size, base + size
+        else:
+            raise ValueError(f"Unknown perturbation mode '{how}' for '{path}'")
+        if name in INTEGER_INPUTS:
+            low, high = float(round(low)), float(round(high))
+        perturbations.append((path, name, low, high))
+    return perturbations
+
+def _json_value(value):
+    """Convert a NumPy value to a float, or None for NaN."""
+    value = float(value)
+    return None if math.isnan(value) else value
+
+def sensitivity_analysis(form_data, inputs, metrics=DEFAULT_METRICS, year=30,
+                         delta=DEFAULT_DELTA, mode='relative'):
+    """
+    Tornado analysis: how much each metric moves when each input is moved down
+    and up on its own.
+    The base case and every low / high scenario are stacked and projected in
+    one pass of the vectorized kernel, only as far as the year reported.
+    Args:
+        form_data (dict): Form data as accepted by analyze_property_investment.
+        inputs (list): Inputs to perturb, see _parse_perturbations.
+        metrics (list): yearly_data metrics to report.
+        year (int): Projection year the metrics are read from, between 1 and MAX_YEARS.
+        delta (float): Default perturbation size.
+        mode (str): Default perturbation mode, 'relative' or 'absolute'.
+    Returns:
+        dict: For every metric its base value and the tornado rows, ranked by
+        swing (|high - low|), largest first.
+    """
+    year, = report_years([year])
+    if isinstance(metrics, str) or not metrics:
+        raise ValueError('At least one metric is required')
+    metrics = list(metrics)
+    for metric in metrics:
+        if metric not in YEARLY_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'")
+    base_inputs = parse_property_inputs(form_data).projection_inputs()
+    perturbations = _parse_perturbations(inputs, base_inputs, delta, mode)
+
+    # Scenario 0 is the base case; scenarios 2i + 1 / 2i + 2 move input i down / up
+    scenarios = 1 + 2 * len(perturbations)
+    scenario_inputs = dict(base_inputs)
+    for index, (_, name, low, high) in enumerate(perturbations):
+        if np.ndim(scenario_inputs[name]) == 0:
+            scenario_inputs[name] = np.full(scenarios, base_inputs[name])
+        scenario_inputs[name][2 * index + 1] = low
+        scenario_inputs[name][2 * index + 2] = high
+    projection = project_investment(scenario_inputs, metrics=metrics, years=(year,))
+
+    results = {}
+    for metric in metrics:
+        values = np.broadcast_to(projection['yearly_data'][metric], (scenarios, 1))[:, 0]
+        rows = []
+        for index, (path, _, low, high) in enumerate(perturbations):
+            low_value, high_value = values[2 * index + 1], values[2 * index + 2]
+            rows.append({
+                'input': path,
+                'low_input': low,
+                'high_input': high,
+                'low': _json_value(low_value),
+                'high': _json_value(high_value),
+                'swing': _json_value(abs(high_value - low_value))
+            })
+        # Inputs whose swing cannot be computed (no IRR) go last
+        rows.sort(key=lambda row: -1 if row['swing'] is None else row['swing'], reverse=True)
+        results[metric] = {'base': _json_value(values[0]), 'tornado': rows}
+
+    return {'year': year, 'metrics': results}
@@ -0,0 +1,36 @@
+import os
+
+def env_int(name, default):
+    """Integer setting from the environment variable name, or default when it is unset or empty."""
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got '{value}'") from None
+
+def env_float(name, default):
+    """Number setting from the environment variable name, or default when it is unset or empty."""
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got '{value}'") from None
+
+def env_str(name, default):
+    """Text setting from the environment variable name, or default when it is unset or empty."""
+    return os.environ.get(name, '').strip() or default
+
+def env_flag(name, default=False):
+    """On/off setting ('1', 'true', 'yes', 'on' or '0', 'false', 'no', 'off') from the environment variable name."""
+    value = os.environ.get(name, '').strip().lower()
+    if not value:
+        return default
+    if value in ('1', 'true', 'yes', 'on'):
+        return True
+    if value in ('0', 'false', 'no', 'off'):
+        return False
+    raise ValueError(f"{name} must be on or off, got '{value}'")
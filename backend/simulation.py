@@ -0,0 +1,150 @@
+import numbers
+import warnings
+import numpy as np
+from property_inputs import parse_property_inputs
+from projection_calculations import PROJECTION_INPUTS, YEARLY_INPUTS, project_investment
+from property_analysis import MAX_YEARS
+
+# Yearly metrics summarized across paths
+SIMULATION_METRICS = ('cash_flow_before_tax', 'equity', 'irr_before_tax', 'total_profit_post_tax')
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Parameters each distribution needs; a missing 'mean' / 'mode' defaults to
+# the point estimate from the form data
+DISTRIBUTIONS = {
+    'normal': ('mean', 'std'),
+    'uniform': ('low', 'high'),
+    'triangular': ('low', 'mode', 'high')
+}
+
+def _parse_distributions(distributions, base_inputs):
+    """
+    Validate the distribution settings of a simulation request.
+    Args:
+        distributions (dict): Input name -> {'dist': ..., parameters, optional
+            'min' / 'max' clip bounds, optional 'per_year' for yearly rates}.
+        base_inputs (dict): Point estimates for every projection input.
+    Returns:
+        dict: Input name -> normalized settings.
+    """
+    if not isinstance(distributions, dict) or not distributions:
+        raise ValueError('At least one input distribution is required')
+    specs = {}
+    for name, settings in distributions.items():
+        if name not in PROJECTION_INPUTS or name == 'pay_cap_gains':
+            raise ValueError(f"Unknown simulation input '{name}'")
+        if not isinstance(settings, dict):
+            raise ValueError(f"Distribution for '{name}' must be an object")
+        dist = settings.get('dist', 'normal')
+        if dist not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{dist}' for '{name}'")
+        spec = {
+            'dist': dist,
+            'min': float(settings.get('min', -np.inf)),
+            'max': float(settings.get('max', np.inf)),
+            'per_year': name in YEARLY_INPUTS and bool(settings.get('per_year', True))
+        }
+        for param in DISTRIBUTIONS[dist]:
+            if param in settings:
+                spec[param] = float(settings[param])
+            elif param in ('mean', 'mode'):
+                spec[param] = float(base_inputs[name])
+            else:
+                raise ValueError(f"Distribution for '{name}' is missing '{param}'")
+        specs[name] = spec
+    return specs
+
+def _parse_percentiles(percentiles):
+    """Validate the percentiles to report: a list of numbers between 0 and 100."""
+    if not isinstance(percentiles, (list, tuple)) or not percentiles:
+        raise ValueError('percentiles must be a list of numbers')
+    for p in percentiles:
+        if isinstance(p, bool) or not isinstance(p, numbers.Real) or not 0 <= p <= 100:
+            raise ValueError(f'Invalid percentile {p!r}: percentiles must be numbers between 0 and 100')
+    return [float(p) for p in percentiles]
+
+def _draw(rng, spec, size):
+    """Draw values for one input from its distribution."""
+    if spec['dist'] == 'normal':
+        values = rng.normal(spec['mean'], spec['std'], size)
+    elif spec['dist'] == 'uniform':
+        values = rng.uniform(spec['low'], spec['high'], size)
+    else:
+        values = rng.triangular(spec['low'], spec['mode'], spec['high'], size)
+    return np.clip(values, spec['min'], spec['max'])
+
+def _json_list(values):
+    """Convert an array to a list with None in place of NaN."""
+    return [None if np.isnan(v) else v for v in values.tolist()]
+
+def simulate_property_investment(form_data, distributions, num_paths=10000, num_years=30,
+                                 percentiles=DEFAULT_PERCENTILES, seed=None, chunk_size=4096):
+    """
+    Monte Carlo simulation of a property investment.
+    Each path draws its own rates (a fresh draw every year for yearly rates)
+    and is projected by the same vectorized kernel as analyze_property_investment,
+    a chunk of paths x years at a time.
+    Args:
+        form_data (dict): Form data as accepted by analyze_property_investment; supplies
+            every input that is not simulated.
+        distributions (dict): Input name -> distribution settings, e.g.
+            {'appreciation': {'dist': 'normal', 'std': 0.02},
+             'vacancy_rate': {'dist': 'uniform', 'low': 0.02, 'high': 0.10, 'min': 0}}.
+        num_paths (int): Number of simulated paths.
+        num_years (int): Number of years to project, at most MAX_YEARS.
+        percentiles (list): Percentiles (0 to 100) reported for every metric and year.
+        seed (int): Seed for reproducible draws (for the same chunk_size).
+        chunk_size (int): Paths projected per kernel call; bounds memory use.
+    Returns:
+        dict: Percentile bands and means per year for every metric in SIMULATION_METRICS;
+        None where no path has a value (e.g. no IRR exists in that year).
+    """
+    num_paths = int(num_paths)
+    num_years = int(num_years)
+    if num_paths < 1:
+        raise ValueError('num_paths must be positive')
+    if not 1 <= num_years <= MAX_YEARS:
+        raise ValueError(f'Years must be between 1 and {MAX_YEARS}')
+    base_inputs = parse_property_inputs(form_data).projection_inputs()
+    specs = _parse_distributions(distributions, base_inputs)
+    percentiles = _parse_percentiles(percentiles)
+    rng = np.random.default_rng(seed)
+
+    collected = {metric: [] for metric in SIMULATION_METRICS}
+    for start in range(0, num_paths, chunk_size):
+        paths = min(chunk_size, num_paths - start)
+        path_inputs = dict(base_inputs)
+        yearly_inputs = {}
+        for name, spec in specs.items():
+            if spec['per_year']:
+                yearly_inputs[name] = _draw(rng, spec, (paths, num_years))
+            else:
+                path_inputs[name] = _draw(rng, spec, paths)
+        projection = project_investment(path_inputs, num_years, yearly_inputs, metrics=SIMULATION_METRICS)
+        for metric in SIMULATION_METRICS:
+            collected[metric].append(np.broadcast_to(projection['yearly_data'][metric], (paths, num_years)))
+
+    bands = {}
+    means = {}
+    for metric, chunks in collected.items():
+        values = np.concatenate(chunks)
+        # IRR is NaN on paths where it does not exist; those are left out
+        if np.isnan(values).any():
+            with warnings.catch_warnings():
+                # All-NaN years (no IRR on any path) are reported as NaN
+                warnings.simplefilter('ignore', RuntimeWarning)
+                table = np.nanpercentile(values, percentiles, axis=0)
+                mean = np.nanmean(values, axis=0)
+        else:
+            table = np.percentile(values, percentiles, axis=0)
+            mean = values.mean(axis=0)
+        bands[metric] = {f'p{p:g}': _json_list(row) for p, row in zip(percentiles, table)}
+        means[metric] = _json_list(mean)
+
+    return {
+        'num_paths': num_paths,
+        'years': list(range(1, num_years + 1)),
+        'percentiles': percentiles,
+        'bands': bands,
+        'mean': means
+    }
@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules are imported by name, as when running from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def client():
+    """Flask test client of the API; its work runs in the request thread (no pool workers)."""
+    from app import app
+    return app.test_client()
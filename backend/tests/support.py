@@ -0,0 +1,26 @@
+"""Helpers shared by the tests."""
+import math
+
+def assert_close(actual, expected, rel=1e-9, abs_tol=1e-6, path='value'):
+    """
+    Assert that two JSON-like values are equal, numbers within a tolerance
+    (NaN equals NaN). Vectorized and scalar code add floats in a different
+    order, so results agree to rounding, not bit for bit.
+    """
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict) and actual.keys() == expected.keys(), path
+        for key in expected:
+            assert_close(actual[key], expected[key], rel, abs_tol, f'{path}[{key!r}]')
+    elif isinstance(expected, (list, tuple)):
+        assert isinstance(actual, (list, tuple)) and len(actual) == len(expected), path
+        for index, (a, e) in enumerate(zip(actual, expected)):
+            assert_close(a, e, rel, abs_tol, f'{path}[{index}]')
+    elif isinstance(expected, float) or isinstance(actual, float):
+        if isinstance(expected, str) or isinstance(actual, str) or expected is None or actual is None:
+            assert actual == expected, f'{path}: {actual!r} != {expected!r}'
+        elif math.isnan(expected):
+            assert math.isnan(actual), f'{path}: {actual!r} != NaN'
+        else:
+            assert math.isclose(actual, expected, rel_tol=rel, abs_tol=abs_tol), f'{path}: {actual!r} != {expected!r}'
+    else:
+        assert actual == expected, f'{path}: {actual!r} != {expected!r}'
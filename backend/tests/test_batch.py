@@ -0,0 +1,112 @@
+import copy
+import json
+
+import app as app_module
+import pytest
+from property_inputs import SAMPLE_FORM_DATA
+from support import assert_close
+from worker_pool import PoolBusy
+
+def _properties(count):
+    properties = []
+    for i in range(count):
+        form_data = copy.deepcopy(SAMPLE_FORM_DATA)
+        form_data['purchase_info']['purchase_price'] = 200000 + 10000 * i
+        properties.append(form_data)
+    return properties
+
+def test_batch_matches_single_analyses(client):
+    properties = _properties(3)
+    batch = client.post('/analyze/batch', json={'properties': properties}).get_json()
+    assert batch['count'] == 3 and batch['errors'] == 0
+    for item, form_data in zip(batch['items'], properties):
+        single = client.post('/analyze', json=form_data).get_json()
+        assert_close(item['results'], single['results'])
+        assert_close(item['propertyData'], single['propertyData'])
+
+def test_bad_property_fails_only_its_item(client):
+    properties = _properties(2)
+    properties[1]['loan_info']['percent_down'] = 'abc'
+    batch = client.post('/analyze/batch', json=properties).get_json()
+    assert batch['errors'] == 1
+    assert 'results' in batch['items'][0]
+    assert batch['items'][1]['index'] == 1 and 'percent_down' in batch['items'][1]['error']
+
+def test_chunks_match_one_pass(client, monkeypatch):
+    properties = _properties(5)
+    whole = client.post('/analyze/batch', json=properties).get_json()
+    monkeypatch.setattr(app_module, 'ANALYSIS_CHUNK_SIZE', 2)
+    assert client.post('/analyze/batch', json=properties).get_json() == whole
+
+def test_buffered_batch_limit(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_BATCH_PROPERTIES', 2)
+    properties = _properties(3)
+    for fmt in ('json', 'nested', 'msgpack'):
+        response = client.post(f'/analyze/batch?format={fmt}', json=properties)
+        assert response.status_code == 400
+        assert 'At most 2 properties' in response.get_json()['error']
+    assert client.post('/analyze/batch', json=properties[:2]).status_code == 200
+
+def test_streamed_batch_has_no_limit(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_BATCH_PROPERTIES', 2)
+    response = client.post('/analyze/batch?format=ndjson', json=_properties(3))
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [record['index'] for record in records[:-1]] == [0, 1, 2]
+    assert records[-1] == {'count': 3, 'errors': 0}
+
+def test_batch_needs_a_list(client):
+    assert client.post('/analyze/batch', json={'properties': 'x'}).status_code == 400
+
+def _events(body):
+    """(event, data) pairs of a Server-Sent Events body."""
+    events = []
+    for block in body.split('\n\n')[:-1]:
+        event, data = block.split('\n')
+        events.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+    return events
+
+@pytest.mark.parametrize('headers, query', [({}, '?format=sse'), ({'Accept': 'text/event-stream'}, '')])
+def test_sse_batch_matches_the_buffered_batch(client, headers, query):
+    properties = _properties(3)
+    properties[1]['loan_info']['percent_down'] = 'abc'
+    buffered = client.post('/analyze/batch', json=properties).get_json()
+    response = client.post(f'/analyze/batch{query}', json=properties, headers=headers)
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    events = _events(response.get_data(as_text=True))
+    assert [event for event, _ in events] == ['item', 'item', 'item', 'summary']
+    assert [data for _, data in events[:-1]] == buffered['items']
+    assert events[-1][1] == {'count': 3, 'errors': 1}
+
+def test_items_are_sent_as_their_chunk_is_analyzed(client, monkeypatch):
+    calls = []
+
+    def counting_run(fn, *args, **kwargs):
+        calls.append(fn.__name__)
+        return fn(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, 'analysis_run', counting_run)
+    monkeypatch.setattr(app_module, 'STREAM_CHUNK_SIZE', 1)
+    response = client.post('/analyze/batch?format=ndjson', json=_properties(3), buffered=False)
+    records = iter(response.response)
+    assert json.loads(next(records))['index'] == 0
+    assert len(calls) == 1
+    assert [json.loads(record).get('index') for record in records] == [1, 2, None]
+    assert len(calls) == 3
+
+def test_busy_pool_ends_the_stream_with_an_error(client, monkeypatch):
+    calls = []
+
+    def busy_after_one_chunk(fn, *args, **kwargs):
+        calls.append(fn)
+        if len(calls) > 1:
+            raise PoolBusy('The server is busy; try again shortly')
+        return fn(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, 'analysis_run', busy_after_one_chunk)
+    monkeypatch.setattr(app_module, 'STREAM_CHUNK_SIZE', 2)
+    response = client.post('/analyze/batch?format=sse', json=_properties(3))
+    events = _events(response.get_data(as_text=True))
+    assert [event for event, _ in events] == ['item', 'item', 'error']
+    assert events[-1][1] == {'error': 'The server is busy; try again shortly', 'count': 2}
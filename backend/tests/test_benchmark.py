@@ -0,0 +1,42 @@
+import json
+
+import benchmark
+import pytest
+from benchmark import PAYLOADS, STAGES, benchmark_names, compare, run_benchmarks
+
+@pytest.mark.parametrize('payload', list(PAYLOADS))
+def test_every_stage_runs(payload):
+    case = benchmark._case(*PAYLOADS[payload])
+    for stage in STAGES:
+        STAGES[stage](case)()
+
+def test_names_and_selection():
+    assert len(benchmark_names()) == len(STAGES) * len(PAYLOADS)
+    run = run_benchmarks(['parse/cash'], repeat=2, min_time=0.001)
+    assert list(run['benchmarks']) == ['parse/cash']
+    timings = run['benchmarks']['parse/cash']
+    assert 0 < timings['min_us'] <= timings['median_us'] and timings['repeat'] == 2
+    assert run['meta']['python'] and run['meta']['numpy']
+
+def _run(**min_us):
+    return {'benchmarks': {name: {'min_us': value} for name, value in min_us.items()}}
+
+def test_compare():
+    comparison = compare(_run(a=120.0, b=80.0, c=101.0, d=10.0, e=5.0), _run(a=100.0, b=100.0, c=100.0, d=1.0))
+    assert {name: row['status'] for name, row in comparison.items()} == \
+        {'a': 'regression', 'b': 'improvement', 'c': 'ok', 'd': 'regression'}
+    assert comparison['a']['change'] == pytest.approx(0.2)
+    # Changes below min_delta_us are noise, however large relative to the time
+    assert compare(_run(d=2.5), _run(d=1.0))['d']['status'] == 'ok'
+
+def test_main_fails_on_a_regression(tmp_path, capsys):
+    output = tmp_path / 'run.json'
+    args = ['-k', 'parse/financed', '--repeat', '1', '--min-time', '0.001']
+    assert benchmark.main(args + ['--output', str(output)]) == 0
+    saved = json.loads(output.read_text())
+    assert benchmark.main(args + ['--baseline', str(output), '--threshold', '100']) == 0
+    saved['benchmarks']['parse/financed']['min_us'] /= 1000
+    output.write_text(json.dumps(saved))
+    assert benchmark.main(args + ['--baseline', str(output)]) == 1
+    assert 'regression' in capsys.readouterr().err
+    assert benchmark.main(['-k', 'nothing']) == 2
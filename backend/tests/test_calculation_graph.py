@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from projection_calculations import YEARLY_METRICS, metric_dependencies, project_investment
+from property_inputs import SAMPLE_FORM_DATA, parse_property_inputs
+
+VALUES = parse_property_inputs(SAMPLE_FORM_DATA).projection_inputs()
+FULL = project_investment(VALUES)['yearly_data']
+
+@pytest.mark.parametrize('metric', YEARLY_METRICS)
+def test_selected_metric_matches_the_full_projection(metric):
+    yearly = project_investment(VALUES, metrics=[metric])['yearly_data']
+    assert list(yearly) == [metric]
+    np.testing.assert_array_equal(yearly[metric], FULL[metric])
+
+def test_metrics_come_back_in_graph_order():
+    yearly = project_investment(VALUES, metrics=['irr_before_tax', 'gross_rent', 'noi'])['yearly_data']
+    assert list(yearly) == ['gross_rent', 'noi', 'irr_before_tax']
+
+def test_cap_rate_needs_no_loan_or_taxes():
+    needed = metric_dependencies(['cap_rate_annual'])
+    assert 'noi' in needed
+    assert not needed & {'interest_paid', 'mortgage_balance', 'depreciation', 'income_tax_due', 'irr_before_tax'}
+
+def test_dependencies_include_the_metrics_themselves():
+    needed = metric_dependencies(['irr_after_tax', 'gross_rent'])
+    assert {'irr_after_tax', 'gross_rent', 'cash_flow_after_tax', 'sale_proceeds'} <= needed
+
+def test_fields_on_analyze(client):
+    response = client.post('/analyze?fields=cash_on_cash_return,debt_coverage_ratio&years=3,7', json=SAMPLE_FORM_DATA)
+    assert response.status_code == 200
+    body = response.get_json()
+    yearly = body['propertyData']['yearly_data']
+    assert yearly['years'] == [3, 7]
+    assert set(yearly['columns']) == {'cash_on_cash_return', 'debt_coverage_ratio'}
+    np.testing.assert_allclose(yearly['columns']['cash_on_cash_return'], FULL['cash_on_cash_return'][[2, 6]])
+    # The results object is left out unless asked for
+    assert 'results' not in body
+    with_results = client.post('/analyze?fields=noi,results', json=SAMPLE_FORM_DATA).get_json()
+    assert 'results' in with_results
+
+def test_unknown_field(client):
+    assert client.post('/analyze?fields=unknown', json=SAMPLE_FORM_DATA).status_code == 400
@@ -0,0 +1,54 @@
+import glob
+import io
+import os
+import tempfile
+
+import app as app_module
+import pytest
+from property_inputs import SAMPLE_FORM_DATA
+from worker_pool import PoolBusy
+
+def _leftover_exports():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), 'export-*')))
+
+def test_pdf_export(client):
+    before = _leftover_exports()
+    response = client.post('/export/pdf?years=1,5', json=[SAMPLE_FORM_DATA, SAMPLE_FORM_DATA])
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    body = response.get_data()
+    assert body.startswith(b'%PDF') and body.rstrip().endswith(b'%%EOF')
+    assert _leftover_exports() <= before
+
+def test_xlsx_export(client):
+    openpyxl = pytest.importorskip('openpyxl')
+    pytest.importorskip('xlsxwriter')
+    bad = dict(SAMPLE_FORM_DATA, loan_info=dict(SAMPLE_FORM_DATA['loan_info'], percent_down='abc'))
+    response = client.post('/export/xlsx', json={'properties': [SAMPLE_FORM_DATA, bad]})
+    assert response.status_code == 200
+    workbook = openpyxl.load_workbook(io.BytesIO(response.get_data()), read_only=True)
+    assert workbook.sheetnames == ['Summary', 'Projections']
+    rows = list(workbook['Summary'].iter_rows(values_only=True))
+    # A header and one row per property; the bad one carries its error
+    assert len(rows) == 3
+    assert any('percent_down' in str(cell) for cell in rows[2])
+
+def test_unknown_format(client):
+    assert client.post('/export/docx', json=SAMPLE_FORM_DATA).status_code == 406
+
+def test_invalid_single_property(client):
+    bad = dict(SAMPLE_FORM_DATA, loan_info=dict(SAMPLE_FORM_DATA['loan_info'], percent_down='abc'))
+    response = client.post('/export/pdf', json=bad)
+    assert response.status_code == 400
+    assert 'loan_info.percent_down' in response.get_json()['fields']
+
+def test_full_pool_fails_before_sending(client, monkeypatch):
+    def busy(fn, *args, **kwargs):
+        raise PoolBusy('The server is busy; try again shortly')
+
+    before = _leftover_exports()
+    monkeypatch.setattr(app_module, 'analysis_run', busy)
+    response = client.post('/export/pdf', json=SAMPLE_FORM_DATA)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert _leftover_exports() <= before
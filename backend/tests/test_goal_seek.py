@@ -0,0 +1,45 @@
+import copy
+
+import pytest
+from goal_seek import goal_seek
+from property_analysis import MAX_YEARS, analyze_property_investment
+from property_inputs import SAMPLE_FORM_DATA
+
+def _metric(path, value, metric, year):
+    form_data = copy.deepcopy(SAMPLE_FORM_DATA)
+    section, name = path.split('.')
+    form_data[section][name] = value
+    return analyze_property_investment(form_data, fields=[metric], years=[year])['yearly_data'][year][metric]
+
+@pytest.mark.parametrize('metric, year, target, path', [
+    ('cash_on_cash_return', 1, 0.08, 'purchase_info.purchase_price'),
+    ('debt_coverage_ratio', 1, 1.25, 'purchase_info.rent_monthly'),
+    ('irr_before_tax', 10, 0.12, 'loan_info.interest_rate')
+])
+def test_solution_reaches_the_target(metric, year, target, path):
+    result = goal_seek(SAMPLE_FORM_DATA, metric, year, target, path)
+    assert result['achieved'] == pytest.approx(target, abs=1e-6)
+    # The solved input gives the target in a full analysis as well
+    assert _metric(path, result['value'], metric, year) == pytest.approx(target, abs=1e-6)
+
+def test_unreachable_target():
+    with pytest.raises(ValueError, match='does not reach'):
+        goal_seek(SAMPLE_FORM_DATA, 'cash_on_cash_return', 1, 5.0, 'purchase_info.purchase_price',
+                  bounds=(300000, 500000))
+
+def test_solve_endpoint(client):
+    response = client.post('/solve', json={'form_data': SAMPLE_FORM_DATA, 'metric': 'cash_on_cash_return',
+                                           'year': 1, 'target': 0.08, 'input': 'purchase_info.purchase_price'})
+    assert response.status_code == 200
+    assert response.get_json()['achieved'] == pytest.approx(0.08, abs=1e-6)
+
+@pytest.mark.parametrize('settings', [
+    {'year': 0}, {'year': MAX_YEARS + 1}, {'year': 3000}, {'metric': 'unknown'}, {'input': 'loan_info.unknown'},
+    {'input': 'loan_info.loan_term_years'}, {'bounds': [5, 1]}, {'target': 5.0}
+])
+def test_invalid_settings(client, settings):
+    payload = dict({'form_data': SAMPLE_FORM_DATA, 'metric': 'cash_on_cash_return', 'year': 1, 'target': 0.08,
+                    'input': 'purchase_info.purchase_price'}, **settings)
+    response = client.post('/solve', json=payload)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,68 @@
+import pytest
+from grid_sweep import grid_sweep
+from property_analysis import MAX_YEARS
+from property_inputs import SAMPLE_FORM_DATA
+
+AXES = [{'path': 'loan_info.percent_down', 'values': [0.1, 0.2, 0.3]},
+        {'path': 'loan_info.interest_rate', 'start': 0.04, 'stop': 0.06, 'num': 2}]
+
+def _sweep(client, **payload):
+    payload.setdefault('form_data', SAMPLE_FORM_DATA)
+    payload.setdefault('axes', AXES)
+    return client.post('/sweep', json=payload)
+
+def test_sweep_matrices():
+    result = grid_sweep(SAMPLE_FORM_DATA, AXES, metrics=['cash_on_cash_return'], years=[10, 1])
+    assert result['shape'] == [3, 2]
+    assert result['years'] == [1, 10]
+    matrix = result['metrics']['cash_on_cash_return'][10]
+    assert len(matrix) == 3 and all(len(row) == 2 for row in matrix)
+    # A larger down payment lowers the cash-on-cash return at the same rate
+    assert matrix[0][0] > matrix[2][0]
+
+def test_chunked_sweep_matches_whole_grid():
+    whole = grid_sweep(SAMPLE_FORM_DATA, AXES, years=[5])
+    chunked = grid_sweep(SAMPLE_FORM_DATA, AXES, years=[5], chunk_size=2)
+    assert chunked['metrics'] == whole['metrics']
+
+def test_sweep_endpoint(client):
+    response = _sweep(client, years=[1, 10])
+    assert response.status_code == 200
+    assert response.get_json()['shape'] == [3, 2]
+
+@pytest.mark.parametrize('years', ['15', 5, [0], [MAX_YEARS + 1], [5000], []])
+def test_invalid_years(client, years):
+    response = _sweep(client, years=years)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+@pytest.mark.parametrize('num', [10 ** 12, 0, -3, 2.5, '10', True])
+def test_invalid_num(client, num):
+    axes = [AXES[0], {'path': 'loan_info.interest_rate', 'start': 0.04, 'stop': 0.06, 'num': num}]
+    response = _sweep(client, axes=axes)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_grid_size_checked_before_building_axes():
+    # 10**12 points would need terabytes if the axis were built first
+    axes = [AXES[0], {'path': 'loan_info.interest_rate', 'start': 0.04, 'stop': 0.06, 'num': 10 ** 12}]
+    with pytest.raises(ValueError, match='grid points'):
+        grid_sweep(SAMPLE_FORM_DATA, axes, max_points=250000)
+
+def test_grid_over_max_points(client):
+    axes = [{'path': 'loan_info.percent_down', 'start': 0.05, 'stop': 0.5, 'num': 1000},
+            {'path': 'loan_info.interest_rate', 'start': 0.03, 'stop': 0.09, 'num': 1000}]
+    response = _sweep(client, axes=axes)
+    assert response.status_code == 400
+    assert 'grid points' in response.get_json()['error']
+
+@pytest.mark.parametrize('axes', [
+    [AXES[0]],
+    [AXES[0], AXES[0]],
+    [AXES[0], {'path': 'loan_info.unknown', 'values': [1]}],
+    [AXES[0], {'path': 'loan_info.interest_rate', 'values': []}],
+    [AXES[0], {'path': 'loan_info.interest_rate', 'values': '0.05'}],
+    [AXES[0], {'path': 'loan_info.interest_rate', 'start': 0.04}]
+])
+def test_invalid_axes(client, axes):
+    assert _sweep(client, axes=axes).status_code == 400
@@ -0,0 +1,122 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+
+import instrumentation
+import pytest
+from instrumentation import MetricsRegistry, finish_timings, record, server_timing, stage, start_timings, timed_run
+from worker_pool import WorkerPool
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A fresh process registry, with stage timing on for the test."""
+    registry = MetricsRegistry(buckets=(0.01, 0.1))
+    monkeypatch.setattr(instrumentation, 'registry', registry)
+    was_enabled = instrumentation.enabled()
+    instrumentation.enable()
+    yield registry
+    instrumentation.enable(was_enabled)
+
+def _timed(seconds):
+    record('work', seconds)
+    return seconds * 2
+
+def test_render():
+    registry = MetricsRegistry(buckets=(0.01, 0.1))
+    registry.describe('requests_total', 'Requests.')
+    registry.inc('requests_total', (('endpoint', '/analyze'), ('status', '200')))
+    registry.inc('requests_total', (('endpoint', '/analyze'), ('status', '200')), 2)
+    for seconds in (0.005, 0.05, 0.5):
+        registry.observe('latency_seconds', (('stage', 'a"b'),), seconds)
+    text = registry.render([('cache_entries', (('cache', 'x'),), 3, 'gauge'), ('ratio', (), None, 'gauge')])
+    assert text.splitlines() == [
+        '# HELP equity_engine_requests_total Requests.',
+        '# TYPE equity_engine_requests_total counter',
+        'equity_engine_requests_total{endpoint="/analyze",status="200"} 3',
+        '# TYPE equity_engine_latency_seconds histogram',
+        'equity_engine_latency_seconds_bucket{stage="a\\"b",le="0.01"} 1',
+        'equity_engine_latency_seconds_bucket{stage="a\\"b",le="0.1"} 2',
+        'equity_engine_latency_seconds_bucket{stage="a\\"b",le="+Inf"} 3',
+        'equity_engine_latency_seconds_sum{stage="a\\"b"} 0.555',
+        'equity_engine_latency_seconds_count{stage="a\\"b"} 3',
+        '# TYPE equity_engine_cache_entries gauge',
+        'equity_engine_cache_entries{cache="x"} 3',
+        '# TYPE equity_engine_ratio gauge',
+        'equity_engine_ratio NaN'
+    ]
+    registry.clear()
+    assert registry.render() == '\n'
+
+def test_stage_is_a_shared_no_op_when_off(monkeypatch):
+    monkeypatch.setattr(instrumentation, '_enabled', False)
+    assert stage('parse') is stage('projection')
+
+def test_request_timings(registry):
+    token = start_timings()
+    with stage('parse'):
+        pass
+    record('projection', 0.02)
+    record('projection', 0.03)
+    timings = finish_timings(token)
+    assert [name for name, _ in timings] == ['parse', 'projection', 'projection']
+    text = registry.render()
+    assert 'equity_engine_stage_duration_seconds_count{stage="projection"} 2' in text
+    assert 'equity_engine_stage_duration_seconds_bucket{stage="projection",le="0.01"} 0' in text
+    # Outside a request, stages go straight into the registry
+    record('report', 0.001)
+    assert 'equity_engine_stage_duration_seconds_count{stage="report"} 1' in registry.render()
+
+def test_each_thread_collects_its_own_timings(registry):
+    token = start_timings()
+    thread = threading.Thread(target=record, args=('other', 0.5))
+    thread.start()
+    thread.join()
+    assert finish_timings(token) == []
+    assert 'stage="other"' in registry.render()
+
+@pytest.mark.parametrize('processes', [0, 1])
+def test_timed_run_brings_back_pool_stages(registry, processes):
+    pool = WorkerPool(processes, 1)
+    try:
+        token = start_timings()
+        assert timed_run(pool.run)(_timed, 0.25) == 0.5
+        assert finish_timings(token) == [('work', 0.25)]
+    finally:
+        pool.shutdown()
+
+def test_server_timing():
+    timings = [('parse', 0.0001), ('analysis', 0.002), ('parse', 0.0002)]
+    assert server_timing(timings, 0.0035) == 'parse;dur=0.300, analysis;dur=2.000, total;dur=3.500'
+    assert server_timing([]) == ''
+
+def test_metrics_and_server_timing_endpoints():
+    # The settings are read at import, so the app runs in its own interpreter
+    script = textwrap.dedent('''
+        import json
+        from app import app
+        from property_inputs import SAMPLE_FORM_DATA
+        client = app.test_client()
+        response = client.post('/analyze', json=SAMPLE_FORM_DATA)
+        metrics = client.get('/metrics')
+        print(json.dumps({'server_timing': response.headers.get('Server-Timing'),
+                          'metrics_status': metrics.status_code, 'metrics': metrics.get_data(as_text=True)}))
+    ''')
+    env = dict(os.environ, METRICS_ENABLED='1', SERVER_TIMING='1', ANALYSIS_WORKERS='0')
+    output = subprocess.run([sys.executable, '-c', script], cwd=BACKEND, env=env, capture_output=True, text=True,
+                            check=True).stdout
+    result = json.loads(output.splitlines()[-1])
+    stages = [part.split(';')[0] for part in result['server_timing'].split(', ')]
+    assert {'parse', 'projection', 'results', 'encode'} <= set(stages) and stages[-1] == 'total'
+    assert result['metrics_status'] == 200
+    assert 'equity_engine_requests_total{endpoint="/analyze",method="POST",status="200"} 1' in result['metrics']
+    assert 'equity_engine_stage_duration_seconds_count{stage="projection"} 1' in result['metrics']
+    assert 'equity_engine_cache_hits_total{cache="analyze"}' in result['metrics']
+
+def test_metrics_are_off_by_default(client):
+    assert client.get('/metrics').status_code == 404
+    assert 'Server-Timing' not in client.post('/analyze', json={}).headers
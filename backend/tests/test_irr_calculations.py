@@ -0,0 +1,68 @@
+import numpy as np
+import numpy_financial as npf
+import pytest
+from irr_calculations import cash_flow_irr, hold_period_irr
+
+YEARS = 30
+
+def _series(seed):
+    """Initial investment, yearly cash flows and sale proceeds of a random property-like investment."""
+    rng = np.random.default_rng(seed)
+    initial = -rng.uniform(30e3, 200e3)
+    cash_flows = rng.normal(rng.uniform(-15e3, 25e3), 8e3, YEARS)
+    terminal = rng.uniform(-80e3, 600e3, YEARS)
+    return initial, cash_flows, terminal
+
+def _npf_hold_period_irr(initial, cash_flows, terminal):
+    """One npf.irr call per hold period, as analyze_property_investment used to do."""
+    rates = []
+    for year in range(1, len(cash_flows) + 1):
+        flows = np.concatenate([[initial], cash_flows[:year]])
+        flows[-1] += terminal[year - 1]
+        rates.append(npf.irr(flows))
+    return np.array(rates)
+
+def _assert_same_irr(actual, expected):
+    assert np.array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual[~np.isnan(expected)], expected[~np.isnan(expected)], rtol=0, atol=1e-8)
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('max_stacked_size', [20000, 0], ids=['stacked', 'year_by_year'])
+def test_hold_period_irr_matches_npf_irr(seed, max_stacked_size):
+    initial, cash_flows, terminal = _series(seed)
+    irr = hold_period_irr(initial, cash_flows, terminal, max_stacked_size=max_stacked_size)
+    _assert_same_irr(irr, _npf_hold_period_irr(initial, cash_flows, terminal))
+
+def test_many_series_at_once():
+    series = [_series(seed) for seed in range(20, 30)]
+    initial = np.array([s[0] for s in series])
+    irr = hold_period_irr(initial, np.array([s[1] for s in series]), np.array([s[2] for s in series]))
+    assert irr.shape == (10, YEARS)
+    for row, (initial, cash_flows, terminal) in zip(irr, series):
+        _assert_same_irr(row, _npf_hold_period_irr(initial, cash_flows, terminal))
+
+def test_selected_hold_years():
+    initial, cash_flows, terminal = _series(3)
+    every_year = hold_period_irr(initial, cash_flows, terminal)
+    hold_years = np.array([1, 7, 30])
+    selected = hold_period_irr(initial, cash_flows, terminal[hold_years - 1], hold_years=hold_years)
+    _assert_same_irr(selected, every_year[hold_years - 1])
+
+def test_no_irr_without_a_sign_change():
+    irr = hold_period_irr(-1000.0, np.full(5, -100.0), np.full(5, -50.0))
+    assert np.isnan(irr).all()
+
+@pytest.mark.parametrize('flows', [
+    [-1000, 300, 400, 500],
+    [-5000, 1000, -500, 3000, 3000],
+    [-100, 230, -132],
+    [-1000, 100, 100, 100],
+    [-100, -100, -100]
+])
+def test_cash_flow_irr_matches_npf_irr(flows):
+    expected = npf.irr(flows)
+    actual = cash_flow_irr(flows)
+    if np.isnan(expected):
+        assert np.isnan(actual)
+    else:
+        assert actual == pytest.approx(expected, abs=1e-8)
@@ -0,0 +1,227 @@
+import threading
+import time
+
+import app as app_module
+import pytest
+from job_queue import JobQueue, MemoryJobStore, QueueFull, SQLiteJobStore
+from property_inputs import SAMPLE_FORM_DATA
+
+class Clock:
+    """Wall clock the tests move by hand."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    return MemoryJobStore() if request.param == 'memory' else SQLiteJobStore(str(tmp_path / 'jobs.db'))
+
+@pytest.fixture
+def gate():
+    """Event a blocking job waits on; always released at the end of the test."""
+    event = threading.Event()
+    yield event
+    event.set()
+
+def _kinds(gate=None):
+    def echo(params, progress, run):
+        progress(1, 2)
+        return 'text/plain', run(str.encode, params['text'])
+
+    def fail(params, progress, run):
+        raise ValueError('Bad parameters')
+
+    def block(params, progress, run):
+        gate.wait(10)
+        return 'text/plain', b'done'
+
+    return {'echo': echo, 'fail': fail, 'block': block}
+
+def _wait(queue, job_id, statuses=('succeeded', 'failed')):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job is not None and job['status'] in statuses:
+            return job
+        time.sleep(0.005)
+    raise AssertionError(f'Job {job_id} never reached {statuses}')
+
+def test_job_lifecycle(store):
+    queue = JobQueue(_kinds(), store, runners=1)
+    job = queue.submit('echo', {'text': 'hello'})
+    assert job['status'] == 'queued' and job['result'] is None
+    done = _wait(queue, job['id'])
+    assert done['status'] == 'succeeded'
+    assert (done['result'], done['media_type'], done['progress']) == (b'hello', 'text/plain', 1.0)
+    assert done['created'] <= done['started'] <= done['finished'] < done['expires']
+    queue.shutdown(wait=True)
+    stats = queue.stats()
+    assert (stats['pending'], stats['succeeded'], stats['failed'], stats['stored']) == (0, 1, 0, 1)
+
+def test_running_job(store, gate):
+    queue = JobQueue(_kinds(gate), store, runners=1)
+    job = queue.submit('block', {})
+    assert _wait(queue, job['id'], ('running',))['started'] is not None
+    gate.set()
+    assert _wait(queue, job['id'])['result'] == b'done'
+    queue.shutdown(wait=True)
+
+def test_failed_job(store):
+    queue = JobQueue(_kinds(), store, runners=1)
+    job = _wait(queue, queue.submit('fail', {})['id'])
+    assert (job['status'], job['error'], job['result']) == ('failed', 'Bad parameters', None)
+    assert job['expires'] is not None
+    queue.shutdown(wait=True)
+    assert queue.stats()['failed'] == 1
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        JobQueue(_kinds()).submit('nope', {})
+
+def test_full_queue_is_rejected(store, gate):
+    queue = JobQueue(_kinds(gate), store, runners=1, max_pending=1)
+    job = queue.submit('block', {})
+    with pytest.raises(QueueFull):
+        queue.submit('echo', {'text': 'x'})
+    assert queue.stats()['rejected'] == 1
+    gate.set()
+    _wait(queue, job['id'])
+    assert _wait(queue, queue.submit('echo', {'text': 'x'})['id'])['status'] == 'succeeded'
+    queue.shutdown(wait=True)
+
+def test_finished_jobs_expire(store):
+    clock = Clock()
+    queue = JobQueue(_kinds(), store, runners=1, ttl=60, clock=clock)
+    job = _wait(queue, queue.submit('echo', {'text': 'a'})['id'])
+    assert job['expires'] == job['finished'] + 60
+    clock.now += 59
+    assert queue.get(job['id']) is not None
+    clock.now += 1
+    assert queue.get(job['id']) is None
+    # The next submit purges it from the store
+    _wait(queue, queue.submit('echo', {'text': 'b'})['id'])
+    assert store.get(job['id']) is None and store.count() == 1
+    queue.shutdown(wait=True)
+
+def test_orphaned_jobs_are_purged(store):
+    clock = Clock()
+    queue = JobQueue(_kinds(), store, runners=1, max_age=3600, clock=clock)
+    store.add({'id': 'orphan', 'kind': 'echo', 'status': 'running', 'progress': 0.0, 'created': clock.now,
+               'started': clock.now, 'finished': None, 'expires': None, 'error': None, 'media_type': None,
+               'result': None})
+    clock.now += 3599
+    _wait(queue, queue.submit('echo', {'text': 'a'})['id'])
+    assert store.get('orphan') is not None
+    clock.now += 2
+    _wait(queue, queue.submit('echo', {'text': 'b'})['id'])
+    assert store.get('orphan') is None
+    queue.shutdown(wait=True)
+
+def test_oldest_results_are_trimmed(store):
+    clock = Clock()
+    queue = JobQueue(_kinds(), store, runners=1, clock=clock, max_results=2)
+    ids = []
+    for text in 'abc':
+        ids.append(_wait(queue, queue.submit('echo', {'text': text})['id'])['id'])
+        clock.now += 1
+    queue.shutdown(wait=True)
+    assert store.get(ids[0]) is None
+    assert [store.get(job_id)['result'] for job_id in ids[1:]] == [b'b', b'c']
+
+def test_results_are_trimmed_by_size(store):
+    clock = Clock()
+    queue = JobQueue(_kinds(), store, runners=1, clock=clock, max_result_bytes=25)
+    ids = []
+    for text in ('0123456789', 'abcdefghij', 'ABCDEFGHIJ'):
+        ids.append(_wait(queue, queue.submit('echo', {'text': text})['id'])['id'])
+        clock.now += 1
+    too_large = _wait(queue, queue.submit('echo', {'text': 'x' * 26})['id'])
+    queue.shutdown(wait=True)
+    assert too_large['status'] == 'failed' and too_large['result'] is None
+    assert store.get(ids[0]) is None
+    assert store.get(ids[1]) is not None and store.get(ids[2]) is not None
+
+def test_shutdown_fails_unfinished_jobs(store, gate):
+    queue = JobQueue(_kinds(gate), store, runners=1)
+    running = queue.submit('block', {})
+    _wait(queue, running['id'], ('running',))
+    queued = queue.submit('echo', {'text': 'never'})
+    queue.shutdown()
+    job = store.get(queued['id'])
+    assert job['status'] == 'failed'
+    assert job['error'] == 'The server stopped before the job finished'
+    assert job['expires'] is not None
+
+def test_sqlite_store_is_shared(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    queue = JobQueue(_kinds(), SQLiteJobStore(path), runners=1)
+    job = _wait(queue, queue.submit('echo', {'text': 'shared'})['id'])
+    assert SQLiteJobStore(path).get(job['id'])['result'] == b'shared'
+    queue.shutdown(wait=True)
+
+# --------------- /jobs endpoints ---------------
+def _poll(client, location):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        status = client.get(location).get_json()
+        if status['status'] in ('succeeded', 'failed'):
+            return status
+        time.sleep(0.005)
+    raise AssertionError(f'{location} never finished')
+
+def test_analyze_job(client):
+    response = client.post('/jobs', json={'kind': 'analyze', 'params': {'form_data': SAMPLE_FORM_DATA}})
+    assert response.status_code == 202
+    assert response.get_json()['status'] == 'queued'
+    status = _poll(client, response.headers['Location'])
+    assert status['status'] == 'succeeded'
+    direct = client.post('/analyze', json=SAMPLE_FORM_DATA).get_json()
+    assert status['result'] == direct
+    result = client.get(status['result_url'])
+    assert result.status_code == 200 and result.content_type == 'application/json'
+    assert result.get_json() == direct
+
+def test_report_job_is_downloaded(client):
+    response = client.post('/jobs', json={'kind': 'report', 'params': {'form_data': SAMPLE_FORM_DATA,
+                                                                        'format': 'csv'}})
+    status = _poll(client, response.headers['Location'])
+    assert status['status'] == 'succeeded' and 'result' not in status
+    result = client.get(status['result_url'])
+    assert result.headers['Content-Disposition'] == 'attachment; filename="property-report.csv"'
+
+def test_failed_job_endpoint(client):
+    params = {'form_data': SAMPLE_FORM_DATA, 'distributions': {'appreciation': {'dist': 'normal', 'std': 0.01}},
+              'percentiles': '59'}
+    response = client.post('/jobs', json={'kind': 'simulate', 'params': params})
+    status = _poll(client, response.headers['Location'])
+    assert status['status'] == 'failed'
+    assert 'percentiles' in status['error']
+    result = client.get(f"/jobs/{status['id']}/result")
+    assert result.status_code == 409 and result.get_json()['status'] == 'failed'
+
+def test_result_before_the_job_finishes(client, monkeypatch, gate):
+    monkeypatch.setattr(app_module, 'job_queue', JobQueue(_kinds(gate), runners=1))
+    location = client.post('/jobs', json={'kind': 'block'}).headers['Location']
+    response = client.get(f'{location}/result')
+    assert response.status_code == 409
+    assert response.get_json()['status'] in ('queued', 'running')
+    gate.set()
+    assert _poll(client, location)['status'] == 'succeeded'
+    assert client.get(f'{location}/result').data == b'done'
+
+def test_full_job_queue_returns_503(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'job_queue', JobQueue(_kinds(), max_pending=0))
+    response = client.post('/jobs', json={'kind': 'echo', 'params': {'text': 'x'}})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+@pytest.mark.parametrize('payload', [[], {'kind': 'nope'}, {'kind': 'analyze', 'params': 'x'}])
+def test_invalid_job_requests(client, payload):
+    assert client.post('/jobs', json=payload).status_code == 400
+
+def test_unknown_job(client):
+    assert client.get('/jobs/nope').status_code == 404
+    assert client.get('/jobs/nope/result').status_code == 404
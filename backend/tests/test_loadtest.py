@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+from app import app
+from loadtest import HISTOGRAM_BUCKETS_MS, check_limits, format_summary, generate_corpus, percentile, run_load, \
+    summarize
+from property_inputs import parse_property_inputs
+from werkzeug.serving import make_server
+
+@pytest.fixture
+def server():
+    """The API on a free local port, served from a background thread."""
+    httpd = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+    thread.join()
+
+def test_corpus_is_reproducible_and_valid():
+    corpus = generate_corpus(50, seed=3)
+    assert corpus == generate_corpus(50, seed=3)
+    assert corpus != generate_corpus(50, seed=4)
+    for form_data in corpus:
+        parse_property_inputs(form_data)
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert [percentile(values, q) for q in (1, 50, 95, 99, 100)] == [1, 50, 95, 99, 100]
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) is None
+
+def test_summarize():
+    # (start, latency in seconds, status, error, bytes)
+    records = [(0.0, 0.0015, 200, None, 100), (0.1, 0.004, 200, None, 100), (0.2, 0.3, 503, 'HTTP 503', 20),
+               (0.3, 90.0, None, 'TimeoutError', 0)]
+    summary = summarize({'records': records, 'elapsed': 2.0}, {'url': 'http://x/analyze'})
+    assert (summary['requests'], summary['errors'], summary['error_rate']) == (4, 2, 0.5)
+    assert summary['throughput_rps'] == 2.0 and summary['bytes_received'] == 220
+    assert summary['status'] == {'200': 2, '503': 1, 'none': 1}
+    assert summary['error_kinds'] == {'HTTP 503': 1, 'TimeoutError': 1}
+    assert summary['latency_ms']['min'] == 1.5 and summary['latency_ms']['max'] == 90000.0
+    counts = {bucket['le_ms']: bucket['count'] for bucket in summary['histogram'] if bucket['count']}
+    assert counts == {2: 1, 5: 1, 500: 1, 'inf': 1}
+    assert len(summary['histogram']) == len(HISTOGRAM_BUCKETS_MS) + 1
+    text = format_summary(summary)
+    assert 'Requests      4 (2 errors, 50.00%)' in text and 'TimeoutError: 1' in text
+
+def test_check_limits():
+    summary = summarize({'records': [(0.0, 0.010, 200, None, 10), (0.0, 0.200, 200, None, 10)], 'elapsed': 1.0})
+    assert check_limits(summary, max_p95=500, max_error_rate=0, min_throughput=1) == []
+    failures = check_limits(summary, max_p95=100, max_p99=100, min_throughput=5)
+    assert failures == ['p95 latency 200.0 ms > 100 ms', 'p99 latency 200.0 ms > 100 ms',
+                        'throughput 2.0/s < 5/s']
+    assert check_limits(summarize({'records': [], 'elapsed': 0.0})) == ['no requests completed']
+
+def test_run_load(server):
+    run = run_load(f'{server}/analyze', generate_corpus(5), concurrency=2, requests=12, unique=True)
+    summary = summarize(run)
+    assert summary['requests'] == 12
+    assert summary['status'] == {'200': 12} and summary['errors'] == 0
+    assert summary['bytes_received'] > 0
+
+def test_run_load_records_errors(server):
+    summary = summarize(run_load(f'{server}/analyze', [{'loan_info': {'percent_down': 'abc'}}], concurrency=1,
+                                 requests=3))
+    assert summary['status'] == {'400': 3} and summary['error_kinds'] == {'HTTP 400': 3}
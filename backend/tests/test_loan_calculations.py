@@ -0,0 +1,117 @@
+import numpy as np
+import numpy_financial as npf
+import pytest
+from loan_calculations import (_amortization_arrays, _loan_year_arrays, amortization_cache_stats,
+                               amortization_schedule, amortization_table, calculate_cumipmt, calculate_cumprinc,
+                               loan_years, yearly_amortization)
+
+# (annual rate, periods, loan amount as passed: negative, Excel-style)
+LOANS = [(0.04, 360, -320000.0), (0.075, 180, -250000.0), (0.0, 120, -60000.0), (0.12, 60, -15000.0)]
+
+def _loop_schedule(rate, nper, pv, num_periods, when=0):
+    """The original month-by-month replay (calculate_cumipmt / calculate_cumprinc before the closed form)."""
+    monthly_rate = rate / 12
+    payment = npf.pmt(monthly_rate, nper, pv)
+    balance = -pv
+    interest_paid, principal_paid, balances = [], [], []
+    for period in range(1, num_periods + 1):
+        interest = 0 if when == 1 and period == 1 else balance * monthly_rate
+        principal = payment - interest
+        balance -= principal
+        if balance < 0:
+            principal += balance
+            balance = 0
+        interest_paid.append(interest)
+        principal_paid.append(principal)
+        balances.append(balance)
+    return np.array(interest_paid), np.array(principal_paid), np.array(balances)
+
+@pytest.mark.parametrize('rate, nper, pv', LOANS)
+@pytest.mark.parametrize('when', [0, 1])
+def test_schedule_matches_month_by_month_replay(rate, nper, pv, when):
+    # Past the term as well, where nothing is owed any more
+    interest, principal, balance = _loop_schedule(rate, nper, pv, nper + 24, when)
+    schedule = amortization_schedule(rate, nper, pv, nper + 24, when)
+    np.testing.assert_allclose(schedule['interest'], interest, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(schedule['principal'], principal, rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(schedule['balance'], balance, rtol=1e-9, atol=1e-6)
+
+@pytest.mark.parametrize('rate, nper, pv', [loan for loan in LOANS if loan[0] > 0])
+def test_schedule_matches_numpy_financial(rate, nper, pv):
+    periods = np.arange(1, nper + 1)
+    schedule = amortization_schedule(rate, nper, pv)
+    assert schedule['payment'] == pytest.approx(npf.pmt(rate / 12, nper, pv))
+    np.testing.assert_allclose(schedule['interest'], npf.ipmt(rate / 12, periods, nper, pv), rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(schedule['principal'], npf.ppmt(rate / 12, periods, nper, pv), rtol=1e-9, atol=1e-6)
+    assert schedule['balance'][-1] == pytest.approx(0, abs=1e-6)
+
+@pytest.mark.parametrize('rate, nper, pv', LOANS)
+def test_cumulative_interest_and_principal(rate, nper, pv):
+    interest, principal, _ = _loop_schedule(rate, nper, pv, nper)
+    for start, end in [(1, 12), (13, 24), (49, 60), (nper - 11, nper)]:
+        assert calculate_cumipmt(rate, nper, pv, start, end) == pytest.approx(interest[start - 1:end].sum(), abs=1e-6)
+        assert calculate_cumprinc(rate, nper, pv, start, end) == pytest.approx(principal[start - 1:end].sum(),
+                                                                                abs=1e-6)
+
+def test_array_loans_match_one_at_a_time():
+    rates = np.array([loan[0] for loan in LOANS])
+    terms = np.array([loan[1] for loan in LOANS])
+    amounts = np.array([loan[2] for loan in LOANS])
+    together = _amortization_arrays(rates, terms, amounts, 360)
+    for i, (rate, nper, pv) in enumerate(LOANS):
+        alone = amortization_schedule(rate, nper, pv, 360)
+        for name in ('interest', 'principal', 'balance'):
+            np.testing.assert_allclose(together[name][i], alone[name], rtol=1e-9, atol=1e-6)
+
+def test_yearly_amortization():
+    schedule = amortization_schedule(0.04, 360, -320000.0)
+    yearly = yearly_amortization(schedule)
+    assert yearly['interest'].shape == (30,)
+    np.testing.assert_allclose(yearly['interest'][0], schedule['interest'][:12].sum())
+    np.testing.assert_allclose(yearly['cum_principal'][-1], 320000.0)
+    np.testing.assert_allclose(yearly['balance'], schedule['balance'][11::12])
+    np.testing.assert_allclose(yearly['payments'], 12 * schedule['payment'])
+
+@pytest.mark.parametrize('rate, nper, pv', LOANS)
+def test_loan_years_match_the_yearly_schedule(rate, nper, pv):
+    yearly = yearly_amortization(amortization_schedule(rate, nper, pv, 480))
+    years = np.array([40, 1, 7, 15, 30])
+    for name in ('interest', 'principal', 'payments', 'balance'):
+        expected = yearly[name][years - 1]
+        np.testing.assert_allclose(loan_years(rate, nper, pv, years)[name], expected, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(_loan_year_arrays(rate, nper, pv, years)[name], expected, rtol=1e-9,
+                                   atol=1e-6)
+
+def test_nothing_is_paid_after_the_term():
+    yearly = loan_years(0.05, 120, -100000.0, [10, 11, 40])
+    assert yearly['payments'][0] > 0
+    np.testing.assert_array_equal(yearly['payments'][1:], 0)
+    np.testing.assert_allclose(yearly['balance'], 0, atol=1e-6)
+
+def test_cached_table_matches_the_direct_schedule():
+    before = amortization_cache_stats()
+    first = amortization_schedule(0.0537, 300, -180000.0, 360)
+    again = amortization_schedule(0.0537, 300, -90000.0, 360)
+    after = amortization_cache_stats()
+    assert after['misses'] == before['misses'] + 1
+    assert after['hits'] == before['hits'] + 1
+    direct = _amortization_arrays(0.0537, 300, -180000.0, 360)
+    for name in ('interest', 'principal', 'balance'):
+        np.testing.assert_allclose(first[name], direct[name], rtol=1e-12, atol=1e-9, err_msg=name)
+        np.testing.assert_allclose(again[name], first[name] / 2, rtol=1e-12, atol=1e-9, err_msg=name)
+    with pytest.raises(ValueError):
+        amortization_table(0.0537, 300)['interest'][0] = 0
+
+@pytest.mark.parametrize('nper', [120.6, 359.5])
+def test_fractional_terms_are_not_rounded(nper):
+    before = amortization_cache_stats()
+    schedule = amortization_schedule(0.05, nper, -100000.0)
+    assert schedule['payment'] == pytest.approx(npf.pmt(0.05 / 12, nper, -100000.0), rel=1e-12)
+    yearly = loan_years(0.05, nper, -100000.0, [1, 10])
+    np.testing.assert_allclose(yearly['payments'][0], 12 * npf.pmt(0.05 / 12, nper, -100000.0), rtol=1e-12)
+    after = amortization_cache_stats()
+    assert (after['hits'], after['misses']) == (before['hits'], before['misses'])
+
+def test_amortization_table_rejects_fractional_terms():
+    with pytest.raises(ValueError):
+        amortization_table(0.05, 120.6)
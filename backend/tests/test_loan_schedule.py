@@ -0,0 +1,118 @@
+import numpy as np
+import numpy_financial as npf
+import pytest
+from loan_calculations import amortization_schedule, arm_resets, loan_schedule, yearly_amortization
+from projection_calculations import project_investment
+from property_inputs import SAMPLE_FORM_DATA, parse_property_inputs
+
+def _replay(principal, rate, term, num_periods, io_periods=0, reset_periods=(), reset_rates=(), balloon=0,
+            extra=0.0):
+    """Month-by-month reference: recalculate the payment at each segment start and step the balance."""
+    monthly_rate = rate / 12
+    due = balloon if 0 < balloon < term else term
+    balance = principal
+    payment = None
+    rows = []
+    for period in range(1, num_periods + 1):
+        elapsed = period - 1
+        new_segment = elapsed == 0 or (elapsed == io_periods and io_periods > 0)
+        for reset, reset_rate in zip(reset_periods, reset_rates):
+            if reset == elapsed:
+                monthly_rate = reset_rate / 12
+                new_segment = True
+        if balance <= 0 or period > due:
+            rows.append((0.0, 0.0, 0.0))
+            continue
+        interest = balance * monthly_rate
+        if elapsed < io_periods:
+            principal_paid = extra
+        else:
+            if new_segment or payment is None:
+                payment = float(npf.pmt(monthly_rate, term - elapsed, -balance)) if monthly_rate else \
+                    balance / (term - elapsed)
+            principal_paid = payment - interest + extra
+        principal_paid = balance if period == due else min(principal_paid, balance)
+        balance -= principal_paid
+        rows.append((interest, principal_paid, balance))
+    interest, principal_paid, balance = (np.array(column) for column in zip(*rows))
+    return {'interest': interest, 'principal': principal_paid, 'balance': balance}
+
+def _assert_schedules_match(schedule, expected):
+    for name in ('interest', 'principal', 'balance'):
+        np.testing.assert_allclose(schedule[name], expected[name], rtol=1e-9, atol=1e-6, err_msg=name)
+    np.testing.assert_allclose(schedule['payment'], schedule['interest'] + schedule['principal'])
+
+CASES = {
+    'interest_only': dict(io_periods=60),
+    'interest_only_throughout': dict(io_periods=360),
+    'balloon': dict(balloon=84),
+    'extra_principal': dict(extra=500.0),
+    'interest_only_then_extra': dict(io_periods=24, extra=250.0),
+    'balloon_with_extra': dict(balloon=120, extra=1000.0)
+}
+
+@pytest.mark.parametrize('case', list(CASES))
+@pytest.mark.parametrize('rate', [0.065, 0.0])
+def test_options_match_month_by_month_replay(case, rate):
+    options = CASES[case]
+    schedule = loan_schedule(300000.0, rate, 360, 360, interest_only_periods=options.get('io_periods', 0),
+                             balloon_period=options.get('balloon', 0), extra_principal=options.get('extra', 0.0))
+    _assert_schedules_match(schedule, _replay(300000.0, rate, 360, 360, **options))
+
+def test_arm_matches_month_by_month_replay():
+    reset_periods, reset_rates = arm_resets(0.05, 60, 12, 0.0075, 0.08, 360)
+    schedule = loan_schedule(400000.0, 0.05, 360, 360, reset_periods=reset_periods, reset_rates=reset_rates)
+    _assert_schedules_match(schedule, _replay(400000.0, 0.05, 360, 360, reset_periods=reset_periods.tolist(),
+                                              reset_rates=reset_rates.tolist()))
+
+def test_arm_with_interest_only_and_extra_principal():
+    reset_periods, reset_rates = arm_resets(0.045, 36, 6, 0.005, 0, 360)
+    schedule = loan_schedule(250000.0, 0.045, 360, 360, interest_only_periods=48, reset_periods=reset_periods,
+                             reset_rates=reset_rates, extra_principal=300.0)
+    _assert_schedules_match(schedule, _replay(250000.0, 0.045, 360, 360, io_periods=48,
+                                              reset_periods=reset_periods.tolist(),
+                                              reset_rates=reset_rates.tolist(), extra=300.0))
+
+def test_arm_resets():
+    reset_periods, reset_rates = arm_resets(0.05, 60, 12, 0.01, 0.075, 120)
+    assert reset_periods.tolist() == [60, 72, 84, 96, 108]
+    np.testing.assert_allclose(reset_rates, [0.06, 0.07, 0.075, 0.075, 0.075])
+    fixed_periods, fixed_rates = arm_resets(0.05, 0, 12, 0.01, 0, 120)
+    assert fixed_periods.size == 0 and fixed_rates.size == 0
+    _, falling = arm_resets(0.01, 12, 12, -0.004, 0, 60)
+    np.testing.assert_allclose(falling, [0.006, 0.002, 0.0, 0.0])
+
+@pytest.mark.parametrize('rate, term', [(0.04, 360), (0.075, 180), (0.0, 120)])
+def test_without_options_matches_amortization_schedule(rate, term):
+    schedule = loan_schedule(200000.0, rate, term, 360)
+    expected = amortization_schedule(rate, term, -200000.0, 360)
+    for name in ('interest', 'principal', 'balance'):
+        np.testing.assert_allclose(schedule[name], expected[name], rtol=1e-9, atol=1e-6, err_msg=name)
+
+def test_array_loans_match_one_at_a_time():
+    principal = np.array([300000.0, 150000.0, 500000.0])
+    rate = np.array([0.065, 0.03, 0.07])
+    io_periods = np.array([60, 0, 12])
+    balloon = np.array([0, 84, 0])
+    extra = np.array([0.0, 200.0, 1000.0])
+    reset_periods, reset_rates = arm_resets(rate, np.array([0, 60, 36]), 12, 0.0025, 0.09, 360)
+    together = loan_schedule(principal, rate, 360, 360, io_periods, reset_periods, reset_rates, balloon, extra)
+    for i in range(3):
+        alone = loan_schedule(principal[i], rate[i], 360, 360, io_periods[i], reset_periods[i], reset_rates[i],
+                              balloon[i], extra[i])
+        for name in ('interest', 'principal', 'balance'):
+            np.testing.assert_allclose(together[name][i], alone[name], rtol=1e-12, atol=1e-9, err_msg=name)
+
+def test_loan_options_in_the_projection():
+    form_data = dict(SAMPLE_FORM_DATA, loan_info=dict(SAMPLE_FORM_DATA['loan_info'], interest_only_years=5,
+                                                       balloon_years=10, extra_principal_mo=200))
+    inputs = parse_property_inputs(form_data)
+    values = inputs.projection_inputs()
+    yearly = project_investment(values, num_years=30)['yearly_data']
+    loan_amount = values['purchase_price'] * (1 - values['percent_down'])
+    expected = yearly_amortization(loan_schedule(loan_amount, values['interest_rate'], values['loan_term_years'] * 12,
+                                                 360, interest_only_periods=60, balloon_period=120,
+                                                 extra_principal=200))
+    np.testing.assert_allclose(yearly['interest_paid'], expected['interest'], rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(yearly['mortgage_balance'], expected['balance'], rtol=1e-9, atol=1e-6)
+    assert yearly['mortgage_balance'][9] == 0
@@ -0,0 +1,84 @@
+import numpy as np
+import numpy_financial as npf
+import pytest
+from irr_calculations import xirr
+from monthly_projection import MONTHLY_METRICS, month_end_dates, project_monthly, yearly_rollup
+from projection_calculations import project_investment
+from property_inputs import SAMPLE_FORM_DATA, parse_property_inputs
+from support import assert_close
+
+VALUES = parse_property_inputs(SAMPLE_FORM_DATA).projection_inputs()
+
+def test_rollup_matches_the_yearly_projection():
+    yearly = yearly_rollup(project_monthly(VALUES, 360)['monthly_data'])
+    expected = project_investment(VALUES, num_years=30)['yearly_data']
+    for name in MONTHLY_METRICS:
+        if name in expected:
+            assert_close(yearly[name].tolist(), np.asarray(expected[name], dtype=float).tolist(), rel=1e-9, path=name)
+
+def test_partial_last_year_rolls_up_the_months_it_has():
+    monthly = project_monthly(VALUES, 18)['monthly_data']
+    yearly = yearly_rollup(monthly)
+    assert yearly['gross_rent'].shape == (2,)
+    assert yearly['gross_rent'][1] == pytest.approx(monthly['gross_rent'][12:].sum())
+    assert yearly['mortgage_balance'][1] == monthly['mortgage_balance'][17]
+
+def test_mid_year_sale():
+    projection = project_monthly(VALUES, 360, sale_month=18)
+    monthly, sale = projection['monthly_data'], projection['sale']
+    assert sale['month'] == 18
+    assert sale['sale_proceeds'] == monthly['sale_proceeds'][17]
+    cash_invested = (VALUES['purchase_price'] * VALUES['percent_down'] + VALUES['initial_improvements'] +
+                     VALUES['closing_cost'])
+    flows = np.concatenate([[-cash_invested], monthly['cash_flow_before_tax'][:18]])
+    flows[-1] += monthly['sale_proceeds'][17]
+    assert sale['irr_monthly_before_tax'] == pytest.approx(npf.irr(flows), rel=1e-8)
+    assert sale['irr_before_tax'] == pytest.approx((1 + npf.irr(flows)) ** 12 - 1, rel=1e-8)
+
+def test_mid_year_sale_is_taxed_on_the_months_held():
+    monthly = project_monthly(VALUES, 18)['monthly_data']
+    second_year = monthly['taxable_income'][12:].sum() * VALUES['income_tax_rate']
+    assert monthly['income_tax_due'][12:].sum() == pytest.approx(max(second_year, 0))
+
+def test_sale_xirr_uses_the_month_end_dates():
+    projection = project_monthly(VALUES, 24, start_date='2025-01-31')
+    assert np.isfinite(projection['sale']['xirr_before_tax'])
+    assert projection['sale']['xirr_before_tax'] == pytest.approx(projection['sale']['irr_before_tax'], rel=0.05)
+
+def test_month_end_dates_clamp_to_the_last_day():
+    dates = month_end_dates('2024-01-31', 3)
+    assert dates.tolist() == np.array(['2024-01-31', '2024-02-29', '2024-03-31', '2024-04-30'],
+                                      dtype='datetime64[D]').tolist()
+
+@pytest.mark.parametrize('num_months, sale_month', [(0, None), (481, None), (24, 25), (24, 0)])
+def test_invalid_months(num_months, sale_month):
+    with pytest.raises(ValueError):
+        project_monthly(VALUES, num_months, sale_month)
+
+def test_xirr_matches_excel():
+    dates = ['2008-01-01', '2008-03-01', '2008-10-30', '2009-02-15', '2009-04-01']
+    assert xirr([-10000, 2750, 4250, 3250, 2750], dates) == pytest.approx(0.373362535, abs=1e-8)
+
+def test_xirr_on_evenly_spaced_dates_matches_irr():
+    flows = np.array([[-1000, 300, 400, 500, 200], [-500, 100, 100, 100, 100], [-100, 50, 60, 0, 0]], dtype=float)
+    dates = np.datetime64('2020-01-01') + np.arange(5) * 365
+    rates = xirr(flows, dates)
+    assert_close(rates.tolist(), [float(npf.irr(row)) for row in flows], rel=1e-8)
+
+def test_xirr_without_a_sign_change_is_nan():
+    assert np.isnan(xirr([100, 200], ['2020-01-01', '2021-01-01']))
+
+def test_xirr_rejects_dates_out_of_order():
+    with pytest.raises(ValueError):
+        xirr([-100, 110], ['2021-01-01', '2020-01-01'])
+
+def test_monthly_endpoint(client):
+    response = client.post('/analyze/monthly', json={'form_data': SAMPLE_FORM_DATA, 'months': 24, 'sale_month': 18})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert len(body['monthly_data']['noi']) == 24
+    assert body['sale']['month'] == 18
+
+def test_monthly_endpoint_rejects_bad_months(client):
+    response = client.post('/analyze/monthly', json={'form_data': SAMPLE_FORM_DATA, 'months': 24, 'sale_month': 30})
+    assert response.status_code == 400
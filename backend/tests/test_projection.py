@@ -0,0 +1,71 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from projection_calculations import YEARLY_METRICS, project_investment
+from property_analysis import MAX_YEARS, analyze_property_investment, report_years
+from property_inputs import SAMPLE_FORM_DATA, parse_property_inputs
+from support import assert_close
+
+# Results of the original per-year implementation (before the vectorized
+# kernel) for a set of payloads, at a sample of years. Loan payments now stop
+# once the loan is paid off, so the 15-year loan is only compared up to year 15.
+with open(os.path.join(os.path.dirname(__file__), 'data', 'baseline_analyses.json')) as f:
+    BASELINE = json.load(f)
+
+@pytest.mark.parametrize('name', list(BASELINE))
+def test_matches_the_original_implementation(name):
+    case = BASELINE[name]
+    analysis = analyze_property_investment(case['form_data'])
+    assert_close(analysis['derived_values'], case['derived_values'], path='derived_values')
+    for year, row in case['yearly_data'].items():
+        assert_close(analysis['yearly_data'][int(year)], row, path=f'yearly_data[{year}]')
+
+def test_paid_off_loan_stops_payments():
+    analysis = analyze_property_investment(BASELINE['fifteen_year_loan']['form_data'])
+    assert analysis['yearly_data'][15]['mortgage_balance'] == pytest.approx(0, abs=1e-6)
+    assert analysis['yearly_data'][16]['loan_payments'] == 0
+    assert analysis['yearly_data'][16]['debt_coverage_ratio'] == 'N/A'
+
+VALUES = parse_property_inputs(SAMPLE_FORM_DATA).projection_inputs()
+
+@pytest.mark.parametrize('years', [[3, 7], [1], [30], [12, 25, 29]])
+def test_selected_years_match_the_full_projection(years):
+    full = project_investment(VALUES, num_years=30)['yearly_data']
+    selected = project_investment(VALUES, years=years)['yearly_data']
+    for name in YEARLY_METRICS:
+        np.testing.assert_array_equal(selected[name], full[name][np.asarray(years) - 1], err_msg=name)
+
+def test_year_40_alone_matches_the_long_horizon():
+    full = project_investment(VALUES, num_years=MAX_YEARS)['yearly_data']
+    alone = project_investment(VALUES, years=[40])['yearly_data']
+    for name in YEARLY_METRICS:
+        np.testing.assert_allclose(alone[name], full[name][39:40], rtol=1e-12, err_msg=name)
+
+def test_horizon_and_years_on_analyze():
+    analysis = analyze_property_investment(SAMPLE_FORM_DATA, years=[7, 3, 7])
+    assert list(analysis['yearly_data']) == [3, 7]
+    assert len(analyze_property_investment(SAMPLE_FORM_DATA, horizon=40)['yearly_data']) == 40
+
+def test_report_years():
+    assert report_years() == list(range(1, 31))
+    assert report_years([7, 3, 3]) == [3, 7]
+    assert report_years(horizon=5) == [1, 2, 3, 4, 5]
+
+@pytest.mark.parametrize('years', [[], [0], [MAX_YEARS + 1], ['x']])
+def test_report_years_rejects_bad_years(years):
+    with pytest.raises(ValueError):
+        report_years(years)
+
+@pytest.mark.parametrize('years', [[], [0, 1], [3, 2], [2, 2]])
+def test_project_investment_rejects_bad_years(years):
+    with pytest.raises(ValueError):
+        project_investment(VALUES, years=years)
+
+def test_years_on_the_endpoint(client):
+    response = client.post('/analyze?years=40,5', json=SAMPLE_FORM_DATA)
+    assert response.status_code == 200
+    assert response.get_json()['propertyData']['yearly_data']['years'] == [5, 40]
+    assert client.post('/analyze?years=0', json=SAMPLE_FORM_DATA).status_code == 400
+    assert client.post(f'/analyze?horizon={MAX_YEARS + 1}', json=SAMPLE_FORM_DATA).status_code == 400
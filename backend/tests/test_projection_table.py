@@ -0,0 +1,49 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from data_processing import PROJECTION_ROWS, create_projection_dataframe, projection_matrix
+from property_analysis import analyze_property_investment
+from support import assert_close
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+with open(os.path.join(DATA, 'baseline_analyses.json')) as f:
+    BASELINE = json.load(f)
+# Projection tables of the original cell-by-cell create_projection_dataframe
+# for the baseline payloads, 'N/A' as null
+with open(os.path.join(DATA, 'projection_tables.json')) as f:
+    TABLES = json.load(f)
+
+def _table_args(analysis):
+    return analysis['yearly_data'], analysis['derived_values'], analysis['rates'], analysis['tax_info']
+
+@pytest.mark.parametrize('name', list(TABLES))
+def test_dataframe_matches_the_original_table(name):
+    expected = TABLES[name]
+    df = create_projection_dataframe(*_table_args(analyze_property_investment(BASELINE[name]['form_data'])))
+    assert list(df.index) == list(expected['rows'])
+    assert list(df.columns) == [f'Year {year}' for year in expected['years']]
+    assert (df.dtypes == np.float64).all()
+    for label, values in expected['rows'].items():
+        assert_close([None if np.isnan(v) else v for v in df.loc[label].tolist()], values, path=label)
+
+@pytest.mark.parametrize('layout', ['nested', 'columns'])
+def test_matrix_for_every_year(layout):
+    analysis = analyze_property_investment(BASELINE['financed']['form_data'], layout=layout)
+    table = projection_matrix(*_table_args(analysis), proj_years=range(1, 31))
+    assert table['values'].shape == (len(PROJECTION_ROWS), 30)
+    assert table['values'].dtype == np.float64
+    np.testing.assert_array_equal(table['missing'], np.isnan(table['values']))
+    five = projection_matrix(*_table_args(analysis), proj_years=[1, 5, 10, 20, 30])
+    np.testing.assert_array_equal(five['values'], table['values'][:, [0, 4, 9, 19, 29]])
+    assert five['labels'] == table['labels']
+
+def test_matrix_and_dataframe_agree():
+    analysis = analyze_property_investment(BASELINE['cash']['form_data'])
+    table = projection_matrix(*_table_args(analysis), proj_years=[2, 3])
+    df = create_projection_dataframe(*_table_args(analysis), proj_years=[2, 3])
+    pd.testing.assert_frame_equal(df, pd.DataFrame(table['values'], index=table['labels'],
+                                                   columns=['Year 2', 'Year 3']))
+    assert table['missing'].any()
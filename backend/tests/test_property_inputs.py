@@ -0,0 +1,36 @@
+import copy
+import pickle
+
+import pytest
+import property_analysis
+from property_inputs import SAMPLE_FORM_DATA, InputError, PropertyInputs, parse_property_inputs
+
+def test_parses_sample_form_data():
+    inputs = parse_property_inputs(SAMPLE_FORM_DATA)
+    assert isinstance(inputs, PropertyInputs)
+    assert parse_property_inputs(None) == inputs
+    # Frozen and hashable, so it can key caches
+    assert hash(inputs) == hash(parse_property_inputs(copy.deepcopy(SAMPLE_FORM_DATA)))
+    with pytest.raises(AttributeError):
+        inputs.interest_rate = 0
+
+def test_reports_every_invalid_field():
+    form_data = copy.deepcopy(SAMPLE_FORM_DATA)
+    form_data['loan_info']['percent_down'] = 'abc'
+    form_data['loan_info']['interest_rate'] = 'high'
+    with pytest.raises(InputError) as raised:
+        parse_property_inputs(form_data)
+    assert set(raised.value.errors) == {'loan_info.percent_down', 'loan_info.interest_rate'}
+    # Survives the trip back from a pool process
+    assert pickle.loads(pickle.dumps(raised.value)).errors == raised.value.errors
+
+def test_rejects_sections_that_are_not_objects():
+    with pytest.raises(InputError) as raised:
+        parse_property_inputs(dict(SAMPLE_FORM_DATA, loan_info=[]))
+    assert 'loan_info' in raised.value.errors
+
+def test_property_analysis_reexports_the_input_model():
+    for name in ('InputError', 'PropertyInputs', 'parse_property_inputs', 'safe_float', 'safe_int'):
+        assert name in property_analysis.__all__
+    assert property_analysis.safe_float('', 3) == 3
+    assert property_analysis.safe_int('4.7') == 4
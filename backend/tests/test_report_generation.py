@@ -0,0 +1,77 @@
+import csv
+import io
+import os
+import re
+
+import pytest
+from property_analysis import analyze_property_investment
+from report_generation import CSV_COLUMNS, REPORT_FORMATS, generate_investment_report, render_investment_report, \
+    write_investment_reports
+
+# main.py's report from the original print()-based generate_investment_report
+with open(os.path.join(os.path.dirname(__file__), 'data', 'report.txt'), encoding='utf-8') as f:
+    ORIGINAL_REPORT = f.read()
+
+CASH_PURCHASE = {'loan_info': {'percent_down': 1.0}}
+
+def _unsigned_zeros(report):
+    """The report with '-0' cells written as '0': the original printed the sign of some zero values."""
+    return re.sub(r' -0(?=\t|\n)', '  0', report)
+
+def test_text_report_matches_the_original():
+    report = render_investment_report(analyze_property_investment())
+    assert _unsigned_zeros(report) == _unsigned_zeros(ORIGINAL_REPORT)
+
+def test_generate_writes_the_report_once():
+    writes = []
+
+    class File:
+        def write(self, text):
+            writes.append(text)
+
+    generate_investment_report(analyze_property_investment(), file=File())
+    assert len(writes) == 1
+    assert _unsigned_zeros(writes[0]) == _unsigned_zeros(ORIGINAL_REPORT)
+
+def test_columnar_analysis_renders_the_same_report():
+    for fmt in REPORT_FORMATS:
+        assert render_investment_report(analyze_property_investment(layout='columns'), fmt) == \
+            render_investment_report(analyze_property_investment(), fmt)
+
+def test_na_values_are_rendered():
+    report = render_investment_report(analyze_property_investment(CASH_PURCHASE))
+    row = next(line for line in report.splitlines() if line.startswith('\tDebt Coverage Ratio'))
+    assert row.split('\t')[2:] == ['N/A'.rjust(12)] * 5
+
+@pytest.mark.parametrize('fmt, row', [
+    ('markdown', '| Gross Rent | $55,200 | $59,750 | $65,969 | $80,416 | $98,027 |'),
+    ('html', '<tr><th>Gross Rent</th><td>$55,200</td><td>$59,750</td><td>$65,969</td><td>$80,416</td>'
+             '<td>$98,027</td></tr>')
+])
+def test_markup_formats(fmt, row):
+    report = render_investment_report(analyze_property_investment(), fmt)
+    assert row in report.splitlines()
+
+def test_csv_format():
+    rows = list(csv.reader(io.StringIO(render_investment_report(analyze_property_investment(), 'csv'))))
+    assert all(len(row) == len(CSV_COLUMNS) for row in rows)
+    gross_rent = [row[3:] for row in rows if row[1] == 'Rental Income' and row[2] == 'Gross Rent']
+    assert gross_rent == [['Year 1', '$55,200'], ['Year 5', '$59,750'], ['Year 10', '$65,969'],
+                          ['Year 20', '$80,416'], ['Year 30', '$98,027']]
+
+def test_selected_years():
+    report = render_investment_report(analyze_property_investment(), proj_years=[2, 3])
+    assert '\t\t\t\t         Year 2\t         Year 3\n' in report
+
+def test_write_many_reports():
+    analyses = [analyze_property_investment(), analyze_property_investment(CASH_PURCHASE)]
+    out = io.StringIO()
+    assert write_investment_reports(analyses, out, 'csv') == 2
+    lines = out.getvalue().splitlines()
+    assert lines[0] == ','.join(CSV_COLUMNS)
+    assert lines.count(lines[0]) == 1
+    assert out.getvalue() == lines[0] + '\n' + ''.join(render_investment_report(a, 'csv') for a in analyses)
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        render_investment_report(analyze_property_investment(), 'pdf')
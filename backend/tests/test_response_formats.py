@@ -0,0 +1,87 @@
+import copy
+import json
+
+import numpy as np
+import pytest
+import response_formats
+from property_analysis import analyze_property_investment
+from property_inputs import SAMPLE_FORM_DATA
+from response_formats import FormatError, encode_stream, negotiate_format
+from support import assert_close
+from werkzeug.datastructures import MIMEAccept
+
+# A cash purchase: no debt, so the debt ratios are missing ('N/A' / NaN / null)
+CASH = copy.deepcopy(SAMPLE_FORM_DATA)
+CASH['loan_info']['percent_down'] = 1
+
+def _nested_as_columns(nested):
+    """Columns of a nested yearly_data, with 'N/A' as None as in the compact JSON."""
+    years = list(nested)
+    metrics = nested[years[0]]
+    return {metric: [None if nested[year][metric] == 'N/A' else nested[year][metric] for year in years]
+            for metric in metrics}
+
+@pytest.mark.parametrize('form_data', [SAMPLE_FORM_DATA, CASH], ids=['financed', 'cash'])
+def test_layouts_agree(form_data):
+    nested = analyze_property_investment(form_data)['yearly_data']
+    columns = analyze_property_investment(form_data, layout='columns')['yearly_data']
+    assert columns['years'] == list(nested)
+    expected = _nested_as_columns(nested)
+    for metric, values in columns['columns'].items():
+        # The columnar layout holds the nested layout's 'N/A' as NaN
+        actual = [None if np.isnan(value) else value for value in np.asarray(values, dtype=float).tolist()]
+        assert_close(actual, expected[metric], path=metric)
+
+def test_json_and_nested_responses_agree(client):
+    compact = client.post('/analyze', json=CASH).get_json()
+    nested = client.post('/analyze?format=nested', json=CASH).get_json()
+    assert compact['results'] == nested['results']
+    yearly = compact['propertyData']['yearly_data']
+    assert yearly['years'] == [int(year) for year in nested['propertyData']['yearly_data']]
+    assert_close(yearly['columns'], _nested_as_columns(nested['propertyData']['yearly_data']))
+    assert yearly['columns']['debt_coverage_ratio'][0] is None
+
+def test_msgpack_response(client):
+    msgpack = pytest.importorskip('msgpack')
+    response = client.post('/analyze', json=SAMPLE_FORM_DATA, headers={'Accept': 'application/msgpack'})
+    assert response.mimetype == 'application/msgpack'
+    body = msgpack.unpackb(response.get_data())
+    assert body == client.post('/analyze', json=SAMPLE_FORM_DATA).get_json()
+
+def test_arrow_response(client):
+    pa = pytest.importorskip('pyarrow')
+    response = client.post('/analyze?format=arrow', json=SAMPLE_FORM_DATA)
+    table = pa.ipc.open_stream(response.get_data()).read_all()
+    body = client.post('/analyze', json=SAMPLE_FORM_DATA).get_json()
+    yearly = body['propertyData']['yearly_data']
+    assert table.column('year').to_pylist() == yearly['years']
+    for metric, values in yearly['columns'].items():
+        assert table.column(metric).to_pylist() == values
+    metadata = table.schema.metadata
+    assert json.loads(metadata[b'results']) == body['results']
+    assert 'yearly_data' not in json.loads(metadata[b'propertyData'])
+
+def test_unknown_format(client):
+    assert client.post('/analyze?format=xml', json=SAMPLE_FORM_DATA).status_code == 406
+
+def test_negotiate_format(monkeypatch):
+    assert negotiate_format() == 'json'
+    assert negotiate_format('nested') == 'nested'
+    assert negotiate_format(None, MIMEAccept([('application/x-msgpack', 1)])) == 'msgpack'
+    assert negotiate_format(None, MIMEAccept([('text/html', 1)])) == 'json'
+    # Streaming formats only where the endpoint offers them
+    assert negotiate_format(None, MIMEAccept([('application/x-ndjson', 1)])) == 'json'
+    assert negotiate_format('ndjson', formats=['json', 'ndjson']) == 'ndjson'
+    with pytest.raises(FormatError):
+        negotiate_format('ndjson')
+    with pytest.raises(FormatError):
+        negotiate_format('xml')
+    monkeypatch.setattr(response_formats, 'msgpack', None)
+    with pytest.raises(FormatError, match='not available'):
+        negotiate_format('msgpack')
+
+def test_encode_stream():
+    records = [('item', {'index': 0}), ('summary', {'count': 1})]
+    assert b''.join(encode_stream(records, 'ndjson')) == b'{"index": 0}\n{"count": 1}\n'
+    assert b''.join(encode_stream(records, 'sse')) == \
+        b'event: item\ndata: {"index": 0}\n\nevent: summary\ndata: {"count": 1}\n\n'
@@ -0,0 +1,62 @@
+import copy
+
+import app as app_module
+import pytest
+from property_inputs import SAMPLE_FORM_DATA
+from result_cache import ResultCache
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = ResultCache(max_size=10, ttl=60, clock=clock)
+    cache.put('a', 1)
+    clock.now = 59
+    assert cache.get('a') == 1
+    clock.now = 60
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+def test_counters():
+    cache = ResultCache(max_size=10)
+    cache.put('a', 1)
+    cache.get('a')
+    cache.get('b')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+    cache.clear()
+    assert cache.stats()['size'] == 0 and cache.stats()['hits'] == 1
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        ResultCache(max_size=0)
+
+def test_analyze_responses_are_cached_by_parsed_inputs(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'analyze_cache', ResultCache(16))
+    first = client.post('/analyze', json=SAMPLE_FORM_DATA)
+    assert first.headers['X-Cache'] == 'MISS'
+    # The same inputs written differently (a number as a string) parse to the same key
+    form_data = copy.deepcopy(SAMPLE_FORM_DATA)
+    form_data['purchase_info']['purchase_price'] = '400000'
+    second = client.post('/analyze', json=form_data)
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_data() == first.get_data()
+    # Another format or field selection is another entry
+    assert client.post('/analyze?fields=cash_on_cash_return', json=SAMPLE_FORM_DATA).headers['X-Cache'] == 'MISS'
+    form_data['purchase_info']['purchase_price'] = 410000
+    assert client.post('/analyze', json=form_data).headers['X-Cache'] == 'MISS'
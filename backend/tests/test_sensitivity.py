@@ -0,0 +1,55 @@
+import copy
+
+import pytest
+from property_analysis import MAX_YEARS, analyze_property_investment
+from property_inputs import SAMPLE_FORM_DATA
+from sensitivity import sensitivity_analysis
+
+INPUTS = ['loan_info.interest_rate', 'purchase_info.rent_monthly', 'owner_paid_expenses.vacancy_rate']
+
+def _with(path, value):
+    form_data = copy.deepcopy(SAMPLE_FORM_DATA)
+    section, name = path.split('.')
+    form_data[section][name] = value
+    return form_data
+
+def _metric(form_data, metric, year):
+    return analyze_property_investment(form_data, fields=[metric], years=[year])['yearly_data'][year][metric]
+
+def test_scenarios_match_separate_analyses():
+    result = sensitivity_analysis(SAMPLE_FORM_DATA, INPUTS, metrics=['cash_on_cash_return'], year=10)
+    assert result['year'] == 10
+    metric = result['metrics']['cash_on_cash_return']
+    assert metric['base'] == pytest.approx(_metric(SAMPLE_FORM_DATA, 'cash_on_cash_return', 10))
+    for row in metric['tornado']:
+        assert row['low'] == pytest.approx(_metric(_with(row['input'], row['low_input']), 'cash_on_cash_return', 10))
+        assert row['high'] == pytest.approx(_metric(_with(row['input'], row['high_input']), 'cash_on_cash_return', 10))
+
+def test_rows_ranked_by_swing():
+    rows = sensitivity_analysis(SAMPLE_FORM_DATA, INPUTS)['metrics']['irr_before_tax']['tornado']
+    swings = [row['swing'] for row in rows]
+    assert swings == sorted(swings, reverse=True)
+
+def test_perturbation_modes():
+    inputs = [{'path': 'loan_info.interest_rate', 'delta': 0.01, 'mode': 'absolute'}, 'purchase_info.rent_monthly']
+    rows = {row['input']: row for row in
+            sensitivity_analysis(SAMPLE_FORM_DATA, inputs, delta=0.2)['metrics']['cash_on_cash_return']['tornado']}
+    assert (rows['loan_info.interest_rate']['low_input'], rows['loan_info.interest_rate']['high_input']) == \
+        pytest.approx((0.03, 0.05))
+    assert (rows['purchase_info.rent_monthly']['low_input'], rows['purchase_info.rent_monthly']['high_input']) == \
+        pytest.approx((3680, 5520))
+
+def test_sensitivity_endpoint(client):
+    response = client.post('/sensitivity', json={'form_data': SAMPLE_FORM_DATA, 'inputs': INPUTS, 'year': 5})
+    assert response.status_code == 200
+    assert response.get_json()['year'] == 5
+
+@pytest.mark.parametrize('settings', [
+    {'year': 0}, {'year': MAX_YEARS + 1}, {'year': 3000}, {'inputs': []}, {'inputs': ['loan_info.unknown']},
+    {'metrics': 'irr_before_tax'}, {'metrics': ['unknown']}, {'mode': 'percent'}
+])
+def test_invalid_settings(client, settings):
+    payload = dict({'form_data': SAMPLE_FORM_DATA, 'inputs': INPUTS}, **settings)
+    response = client.post('/sensitivity', json=payload)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
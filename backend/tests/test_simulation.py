@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from property_analysis import MAX_YEARS, analyze_property_investment
+from property_inputs import SAMPLE_FORM_DATA
+from simulation import SIMULATION_METRICS, simulate_property_investment
+
+DISTRIBUTIONS = {
+    'appreciation': {'dist': 'normal', 'std': 0.02},
+    'vacancy_rate': {'dist': 'uniform', 'low': 0.02, 'high': 0.10, 'min': 0}
+}
+
+def _simulate(client, **payload):
+    payload.setdefault('form_data', SAMPLE_FORM_DATA)
+    payload.setdefault('distributions', DISTRIBUTIONS)
+    payload.setdefault('paths', 200)
+    payload.setdefault('years', 10)
+    return client.post('/simulate', json=payload)
+
+def test_seeded_simulation_is_reproducible():
+    first = simulate_property_investment(SAMPLE_FORM_DATA, DISTRIBUTIONS, num_paths=500, num_years=10, seed=7)
+    second = simulate_property_investment(SAMPLE_FORM_DATA, DISTRIBUTIONS, num_paths=500, num_years=10, seed=7)
+    assert first == second
+    assert first['years'] == list(range(1, 11))
+
+def test_percentile_bands_are_ordered():
+    result = simulate_property_investment(SAMPLE_FORM_DATA, DISTRIBUTIONS, num_paths=1000, num_years=10, seed=1)
+    for metric in ('equity', 'cash_flow_before_tax'):
+        bands = np.array([result['bands'][metric][f'p{p}'] for p in (5, 25, 50, 75, 95)])
+        assert (np.diff(bands, axis=0) >= 0).all()
+
+def test_zero_spread_matches_the_analysis():
+    # Every path draws the point estimate, so each band is the deterministic projection
+    distributions = {'appreciation': {'dist': 'normal', 'std': 0}}
+    result = simulate_property_investment(SAMPLE_FORM_DATA, distributions, num_paths=64, num_years=30,
+                                          percentiles=[50], seed=3)
+    columns = analyze_property_investment(SAMPLE_FORM_DATA, layout='columns')['yearly_data']['columns']
+    for metric in SIMULATION_METRICS:
+        np.testing.assert_allclose(np.array(result['bands'][metric]['p50'], dtype=float),
+                                   np.asarray(columns[metric], dtype=float), rtol=1e-9, atol=1e-6)
+
+def test_simulate_endpoint(client):
+    response = _simulate(client, percentiles=[10, 90], seed=1)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['percentiles'] == [10, 90]
+    assert set(result['bands']['equity']) == {'p10', 'p90'}
+
+@pytest.mark.parametrize('percentiles', ['59', 50, [], [101], [-1], ['50'], [True], [None]])
+def test_invalid_percentiles(client, percentiles):
+    response = _simulate(client, percentiles=percentiles)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+@pytest.mark.parametrize('settings', [
+    {'years': 0}, {'years': MAX_YEARS + 1}, {'years': 5000}, {'paths': 0},
+    {'paths': 100000, 'years': 100},
+    {'distributions': {}}, {'distributions': {'unknown': {'std': 1}}},
+    {'distributions': {'appreciation': {'dist': 'cauchy'}}},
+    {'distributions': {'vacancy_rate': {'dist': 'uniform', 'low': 0.02}}}
+])
+def test_invalid_settings(client, settings):
+    response = _simulate(client, **settings)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
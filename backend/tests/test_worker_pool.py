@@ -0,0 +1,52 @@
+import os
+import time
+
+import pytest
+from worker_pool import PoolBusy, PoolTimeout, WorkerPool
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(1, 2, timeout=30, preload=('math',))
+    yield pool
+    pool.shutdown()
+
+def test_inline_pool_runs_in_the_calling_process():
+    pool = WorkerPool(0, 1)
+    assert pool.run(os.getpid) == os.getpid()
+    with pytest.raises(ValueError):
+        pool.run(int, 'x')
+    assert pool.stats()['completed'] == 2 and pool.stats()['pending'] == 0
+
+def test_full_queue_is_rejected():
+    pool = WorkerPool(0, 1)
+    # The outer call holds the only slot while the inner one asks for another
+    with pytest.raises(PoolBusy):
+        pool.run(pool.run, os.getpid)
+    assert pool.stats()['rejected'] == 1
+    assert pool.run(os.getpid) == os.getpid()
+
+def test_runs_in_a_pool_process(pool):
+    assert pool.run(os.getpid) != os.getpid()
+    assert pool.run(sum, [1, 2, 3]) == 6
+
+def test_exceptions_are_raised_in_the_caller(pool):
+    with pytest.raises(ValueError):
+        pool.run(int, 'x')
+    assert pool.stats()['pending'] == 0
+
+def test_timeout():
+    pool = WorkerPool(1, 2, timeout=0.2, preload=('time',))
+    try:
+        started = time.perf_counter()
+        with pytest.raises(PoolTimeout):
+            pool.run(time.sleep, 5)
+        assert time.perf_counter() - started < 4
+        assert pool.stats()['timeouts'] == 1
+    finally:
+        pool.shutdown()
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        WorkerPool(-1, 1)
+    with pytest.raises(ValueError):
+        WorkerPool(1, 0)
@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+# Modules the pool processes import once, before any work is handed to them
+PRELOAD_MODULES = ('numpy', 'numpy_financial', 'property_analysis', 'simulation', 'sensitivity', 'grid_sweep',
+                   'goal_seek', 'document_export')
+
+class PoolBusy(RuntimeError):
+    """Every slot of the pool queue is taken; the caller should retry later."""
+
+class PoolTimeout(TimeoutError):
+    """The work did not finish within the pool timeout."""
+
+class WorkerPool:
+    """
+    Bounded process pool for CPU-heavy calls, so request threads only wait
+    on results and light endpoints (such as /health) stay responsive.
+    At most queue_depth calls are running or waiting at once; beyond that
+    run() raises PoolBusy at once instead of queueing without bound. A call
+    keeps its slot until it finishes, even after its caller timed out.
+    The processes are started on first use in the process that uses the
+    pool, so a pool created before a server forks its workers is never
+    shared between them.
+    """
+
+    def __init__(self, workers, queue_depth, timeout=None, start_method=None, preload=PRELOAD_MODULES):
+        """
+        Args:
+            workers (int): Pool processes; 0 runs every call in the calling thread.
+            queue_depth (int): Calls running or waiting at once.
+            timeout (float): Seconds a caller waits for a result; None waits indefinitely.
+            start_method (str): multiprocessing start method; defaults to 'forkserver'
+                where available (forking a threaded server is unsafe), else 'spawn'.
+            preload (tuple): Modules imported by the fork server before it starts processes.
+        """
+        if workers < 0:
+            raise ValueError('workers must not be negative')
+        if queue_depth < 1:
+            raise ValueError('queue_depth must be positive')
+        if start_method is None:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.start_method = start_method
+        self.preload = list(preload)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _pool(self):
+        """The process pool of the current process, started on first use."""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                context = multiprocessing.get_context(self.start_method)
+                if self.start_method == 'forkserver':
+                    context.set_forkserver_preload(self.preload)
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=context)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _release(self, future=None):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Call fn(*args, **kwargs) in a pool process and return its result.
+        Exceptions raised by fn are raised here. fn, its arguments and its
+        result must be picklable.
+        Raises:
+            PoolBusy: queue_depth calls are already running or waiting.
+            PoolTimeout: No result within the timeout.
+        """
+        with self._lock:
+            if self.pending >= self.queue_depth:
+                self.rejected += 1
+                raise PoolBusy('The server is busy; try again shortly')
+            self.pending += 1
+        if self.workers == 0:
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._release()
+
+        try:
+            future = self._pool().submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            # A process died (e.g. out of memory); start a new pool for the next call
+            self._release()
+            with self._lock:
+                self._executor = None
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f'No result within {self.timeout:g} seconds') from None
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            raise
+
+    def stats(self):
+        """Settings and counters, e.g. for a health check."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_depth': self.queue_depth,
+                'timeout': self.timeout,
+                'pending': self.pending,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts
+            }
+
+    def shutdown(self):
+        """Stop the pool processes of the current process, cancelling waiting calls."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
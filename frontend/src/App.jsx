@@ -10,7 +10,8 @@ function App() {
   const handleFormSubmit = async (data) => {
     try {
       setFormData(data)
-      const res = await fetch('http://127.0.0.1:8000/analyze', {
+      // Nested yearly_data ({year: {metric: value}}) is what ExportSection reads
+      const res = await fetch('http://127.0.0.1:8000/analyze?format=nested', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(data)